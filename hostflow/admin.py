@@ -1,50 +1,294 @@
-from django.contrib import admin
+"""
+HostFlow Admin
+──────────────
+Changelists are built to stay fast on tables with millions of rows:
+
+* every FK shown in ``list_display`` is fetched with ``list_select_related``,
+  so a page is a fixed number of queries however many rows it shows;
+* FK inputs are raw id / autocomplete boxes, never full <select>s;
+* ``show_full_result_count`` is off, and unfiltered counts come from the
+  planner's estimate (``pg_class.reltuples``) on PostgreSQL;
+* the append-only log tables (notifications, audit log, ticket comments)
+  page with a ``pk`` cursor instead of OFFSET and never count at all.
+"""
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+
 from .models import (
     User, Property, Unit, Lease, Payment,
-    MaintenanceTicket, TicketComment, Notification, AuditLog
+    MaintenanceTicket, TicketComment, Notification, AuditLog, Booking, DeletionJob, Task,
+    NotificationPreference, MessageDelivery, Statement, RentRevision, RentHistory,
+    PaymentCapture,
 )
+from . import deletion
+
+ESTIMATE_THRESHOLD = 10000
+CURSOR_VAR = 'cursor'
+
+
+# ── Pagination ─────────────────────────────────────────────────────────────────
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the planner's row estimate for unfiltered PostgreSQL changelists.
+
+    Small tables, filtered lists and other backends get an exact COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATE_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class CursorChangeList(ChangeList):
+    """Newest-first keyset pagination: ``?cursor=<pk>`` shows rows below that pk."""
+
+    def __init__(self, request, *args, **kwargs):
+        cursor = request.GET.get(CURSOR_VAR, '')
+        self.cursor = int(cursor) if cursor.isdigit() else None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+
+    def get_results(self, request):
+        queryset = self.queryset
+        if self.cursor is not None:
+            queryset = queryset.filter(pk__lt=self.cursor)
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        self.result_list = rows
+        self.result_count = len(rows)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = has_next or self.cursor is not None
+        self.paginator = None
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR]) if self.cursor is not None else None
+        self.next_page_url = self.get_query_string({CURSOR_VAR: rows[-1].pk}) if has_next else None
+
+
+class ScaledAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LogAdmin(ScaledAdmin):
+    """Append-only tables: newest first, cursor paging, no sortable columns."""
+    change_list_template = 'admin/hostflow/cursor_change_list.html'
+    ordering = ('-pk',)
+    sortable_by = ()
+    list_per_page = 50
+    date_hierarchy = 'created_at'
+
+    def get_changelist(self, request, **kwargs):
+        return CursorChangeList
+
+
+class QueuedDeletionMixin:
+    """Drops the built-in "delete selected" action, which cascades inside the request.
+
+    The admin's own action queues a DeletionJob instead (see deletion.py).
+    """
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+# ── Models ─────────────────────────────────────────────────────────────────────
+
+class NotificationPreferenceInline(admin.StackedInline):
+    model = NotificationPreference
+    can_delete = False
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(QueuedDeletionMixin, BaseUserAdmin):
     list_display  = ('username', 'email', 'role', 'phone', 'is_active')
     list_filter   = ('role',)
     fieldsets     = BaseUserAdmin.fieldsets + (
         ('HostFlow', {'fields': ('role', 'phone')}),
     )
+    inlines = [NotificationPreferenceInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['delete_landlords_in_background']
+
+    @admin.action(description="Delete selected landlords in the background", permissions=['delete'])
+    def delete_landlords_in_background(self, request, queryset):
+        jobs = [deletion.schedule_landlord_deletion(user, requested_by=request.user)
+                for user in queryset.filter(role='landlord')]
+        self.message_user(request, f"Queued {len(jobs)} landlord deletion(s).", messages.SUCCESS)
 
 
 @admin.register(Property)
-class PropertyAdmin(admin.ModelAdmin):
-    list_display = ('name', 'city', 'owner')
+class PropertyAdmin(QueuedDeletionMixin, ScaledAdmin):
+    list_display = ('name', 'city', 'owner', 'unit_count', 'occupied_count')
     list_filter  = ('city',)
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+    search_fields = ('name',)
+    actions = ['delete_in_background']
+
+    @admin.action(description="Delete selected properties in the background", permissions=['delete'])
+    def delete_in_background(self, request, queryset):
+        jobs = [deletion.schedule_property_deletion(prop, requested_by=request.user) for prop in queryset]
+        self.message_user(request, f"Queued {len(jobs)} property deletion(s).", messages.SUCCESS)
 
 
 @admin.register(Unit)
-class UnitAdmin(admin.ModelAdmin):
+class UnitAdmin(ScaledAdmin):
     list_display = ('unit_number', 'property', 'rent_amount', 'status')
     list_filter  = ('status', 'rent_type')
+    list_select_related = ('property',)
+    autocomplete_fields = ('property',)
 
 
 @admin.register(Lease)
-class LeaseAdmin(admin.ModelAdmin):
+class LeaseAdmin(ScaledAdmin):
     list_display = ('tenant', 'unit', 'start_date', 'end_date', 'status')
     list_filter  = ('status',)
+    list_select_related = ('tenant', 'unit__property')
+    raw_id_fields = ('unit', 'tenant')
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(ScaledAdmin):
     list_display = ('lease', 'amount_due', 'amount_paid', 'due_date', 'status')
     list_filter  = ('status',)
+    list_select_related = ('lease__tenant', 'lease__unit__property')
+    raw_id_fields = ('lease',)
+    date_hierarchy = 'due_date'
+
+
+@admin.register(PaymentCapture)
+class PaymentCaptureAdmin(LogAdmin):
+    list_display = ('key', 'payment', 'amount', 'source', 'captured_by', 'created_at')
+    list_filter  = ('source',)
+    list_select_related = ('payment__lease__tenant', 'captured_by')
+    raw_id_fields = ('payment', 'captured_by')
+    search_fields = ('=key',)
+
+
+@admin.register(Booking)
+class BookingAdmin(ScaledAdmin):
+    list_display = ('unit', 'guest_name', 'check_in', 'check_out', 'status')
+    list_filter  = ('status',)
+    list_select_related = ('unit__property',)
+    raw_id_fields = ('unit', 'guest')
 
 
 @admin.register(MaintenanceTicket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(ScaledAdmin):
     list_display = ('title', 'unit', 'priority', 'status', 'created_at')
     list_filter  = ('status', 'priority')
+    list_select_related = ('unit__property',)
+    raw_id_fields = ('unit', 'submitted_by')
+
+
+@admin.register(TicketComment)
+class TicketCommentAdmin(LogAdmin):
+    list_display = ('ticket', 'author', 'created_at')
+    list_select_related = ('ticket', 'author')
+    raw_id_fields = ('ticket', 'author')
+    date_hierarchy = None
+
+
+@admin.register(Notification)
+class NotificationAdmin(LogAdmin):
+    list_display = ('title', 'recipient', 'is_read', 'created_at')
+    list_filter  = ('is_read',)
+    list_select_related = ('recipient',)
+    raw_id_fields = ('recipient',)
+
+
+@admin.register(MessageDelivery)
+class MessageDeliveryAdmin(LogAdmin):
+    list_display = ('channel', 'to', 'reference', 'status', 'error_code', 'created_at', 'updated_at')
+    list_filter  = ('channel', 'status')
+    list_select_related = ('recipient',)
+    raw_id_fields = ('recipient',)
+    search_fields = ('provider_id', 'reference')
+
+
+@admin.register(Statement)
+class StatementAdmin(ScaledAdmin):
+    list_display = ('lease', 'month', 'opening_balance', 'charges', 'late_fees', 'payments', 'closing_balance')
+    list_filter  = ('month',)
+    list_select_related = ('lease__tenant', 'lease__unit')
+    raw_id_fields = ('lease',)
+
+
+@admin.register(RentRevision)
+class RentRevisionAdmin(LogAdmin):
+    list_display = ('owner', 'kind', 'value', 'effective_from', 'unit_count', 'note', 'created_at')
+    list_filter  = ('kind',)
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner',)
+
+
+@admin.register(RentHistory)
+class RentHistoryAdmin(LogAdmin):
+    list_display = ('unit', 'previous_amount', 'rent_amount', 'effective_from', 'applied', 'revision')
+    list_filter  = ('applied',)
+    list_select_related = ('unit__property', 'revision')
+    raw_id_fields = ('unit', 'revision')
+
+
+@admin.register(AuditLog)
+class AuditLogAdmin(LogAdmin):
+    list_display = ('action', 'model_name', 'object_id', 'performed_by', 'created_at')
+    list_select_related = ('performed_by',)
+    raw_id_fields = ('performed_by',)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('label', 'kind', 'status', 'step', 'deleted_rows', 'total_rows', 'created_at', 'finished_at')
+    list_filter  = ('status', 'kind')
+    list_select_related = ('requested_by',)
+    readonly_fields = [f.name for f in DeletionJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter  = ('status', 'queue')
+    readonly_fields = [f.name for f in Task._meta.fields]
+    actions = ['requeue']
 
+    def has_add_permission(self, request):
+        return False
 
-admin.site.register(TicketComment)
-admin.site.register(Notification)
-admin.site.register(AuditLog)
+    @admin.action(description='Requeue selected tasks')
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f"Requeued {count} task(s).", messages.SUCCESS)
@@ -0,0 +1,299 @@
+"""
+HostFlow JSON API
+─────────────────
+A versioned, read-only JSON API for the mobile app under ``/api/v1/``:
+
+    POST /api/v1/token/                                   username + password → bearer token
+    GET  /api/v1/payments/?status=overdue&fields=id,amount_due,due_date&include=lease
+    GET  /api/v1/payments/42/
+
+* Requests carry ``Authorization: Bearer <token>``, an HS256 JWT signed with
+  a key derived from SECRET_KEY. ApiTokenMiddleware turns it into the user
+  with one primary key lookup. /api/ requests never look at the session
+  cookie, so no session row is read, and cookie-borne CSRF does not apply
+  to them. Like a session, a token carries a digest of the user's password
+  hash: changing or resetting the password revokes every token issued
+  before.
+* Rows come straight from ``values()`` as dicts; no model instance is
+  built. ``?fields=`` narrows the columns, and with them the joins, to
+  what the client shows.
+* ``?include=`` nests related rows, e.g. a payment's lease or a lease's
+  unit and tenant. Each relation costs one ``pk__in`` query for the whole
+  page, however many rows it has. A related row of a row the user can
+  see is visible too.
+* Lists are keyset-paginated on the primary key, newest first, so a page
+  costs the same at row 10 as at row 100,000.
+* Every response carries an ETag over its body. A client that sends it back
+  in If-None-Match gets an empty 304. That saves the transfer and the
+  client's parsing, not the queries.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import parse_etags
+
+from .models import User, Property, Unit, Lease, Payment, MaintenanceTicket, Notification
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+AUDIENCE = 'hostflow-api'
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ── Tokens ─────────────────────────────────────────────────────────────────────
+
+def signing_key():
+    """SECRET_KEY stretched to a full-length HMAC key, and kept apart from its other uses."""
+    return hashlib.sha256(f'{AUDIENCE}:{settings.SECRET_KEY}'.encode()).digest()
+
+
+def _auth_digest(user):
+    """Changes with the password, as Django's session check does; never the session hash itself."""
+    return salted_hmac('hostflow.api.auth', user.get_session_auth_hash()).hexdigest()[:32]
+
+
+def issue_token(user):
+    now = timezone.now()
+    return jwt.encode({
+        'sub': str(user.pk), 'role': user.role, 'aud': AUDIENCE, 'auth': _auth_digest(user),
+        'iat': now, 'exp': now + timedelta(seconds=settings.API_TOKEN_TTL),
+    }, signing_key(), algorithm='HS256')
+
+
+def user_for(request):
+    """The active user named by the request's bearer token, or None (also once their password changed)."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        claims = jwt.decode(token, signing_key(), algorithms=['HS256'], audience=AUDIENCE,
+                            options={'require': ['exp', 'sub', 'auth']})
+    except jwt.InvalidTokenError:
+        return None
+    if not str(claims['sub']).isdigit():
+        return None
+    user = User.objects.filter(pk=claims['sub'], is_active=True).first()
+    if user is None or not constant_time_compare(str(claims['auth']), _auth_digest(user)):
+        return None
+    return user
+
+
+# ── Resources ──────────────────────────────────────────────────────────────────
+
+class Resource:
+    """What a resource exposes: fields (JSON name → values() path), ?name= filters and includes."""
+
+    def __init__(self, manager, fields, scope, filters=None, includes=None):
+        self.manager = manager
+        self.fields = {'id': 'id', **fields}
+        self.scope = scope  # (queryset, user) → the rows the user may see
+        self.filters = filters or {}
+        self.includes = includes or {}  # name → (field holding the id, resource name)
+
+    def visible_to(self, user):
+        return self.scope(self.manager.all(), user)
+
+    def columns(self, names):
+        return {name: F(self.fields[name]) if self.fields[name] != name else None for name in names}
+
+
+def _values(queryset, columns):
+    """values() for `columns` ({name: F() or None for a plain column}), in that order."""
+    plain = [name for name, expression in columns.items() if expression is None]
+    return queryset.values(*plain, **{name: e for name, e in columns.items() if e is not None})
+
+
+def _by_role(landlord, tenant):
+    """Rows whose `landlord` lookup is a landlord user, or whose `tenant` lookup is a tenant user."""
+    return lambda queryset, user: queryset.filter(**{landlord if user.role == 'landlord' else tenant: user})
+
+
+def _owned_or_leased(owner, leased):
+    """A landlord's own rows; a tenant's are those their leases reach (pk__in, so a join adds no duplicates)."""
+    def scope(queryset, user):
+        if user.role == 'landlord':
+            return queryset.filter(**{owner: user})
+        return queryset.filter(pk__in=Lease.all_objects.filter(tenant=user).values(leased))
+    return scope
+
+
+RESOURCES = {
+    'properties': Resource(
+        Property.objects,
+        {'name': 'name', 'address': 'address', 'city': 'city', 'unit_count': 'unit_count',
+         'occupied_count': 'occupied_count', 'created_at': 'created_at'},
+        _owned_or_leased('owner', 'unit__property_id'),
+        filters={'city': 'city__iexact'},
+    ),
+    'units': Resource(
+        Unit.objects.filter(property__deleted_at__isnull=True),
+        {'property_id': 'property_id', 'property_name': 'property__name', 'unit_number': 'unit_number',
+         'rent_type': 'rent_type', 'rent_amount': 'rent_amount', 'status': 'status'},
+        _owned_or_leased('property__owner', 'unit_id'),
+        filters={'property': 'property_id', 'status': 'status', 'rent_type': 'rent_type'},
+        includes={'property': ('property_id', 'properties')},
+    ),
+    'leases': Resource(
+        Lease.all_objects.filter(unit__property__deleted_at__isnull=True),
+        {'unit_id': 'unit_id', 'tenant_id': 'tenant_id', 'start_date': 'start_date', 'end_date': 'end_date',
+         'status': 'status', 'created_at': 'created_at'},
+        _by_role('owner', 'tenant'),
+        filters={'status': 'status', 'unit': 'unit_id', 'tenant': 'tenant_id'},
+        includes={'unit': ('unit_id', 'units'), 'tenant': ('tenant_id', 'users')},
+    ),
+    'payments': Resource(
+        Payment.all_objects.filter(lease__unit__property__deleted_at__isnull=True),
+        {'lease_id': 'lease_id', 'amount_due': 'amount_due', 'late_fee': 'late_fee', 'amount_paid': 'amount_paid',
+         'due_date': 'due_date', 'paid_date': 'paid_date', 'status': 'status', 'receipt_number': 'receipt_number',
+         'unit_number': 'lease__unit__unit_number', 'created_at': 'created_at'},
+        _by_role('owner', 'lease__tenant'),
+        filters={'status': 'status', 'lease': 'lease_id'},
+        includes={'lease': ('lease_id', 'leases')},
+    ),
+    'tickets': Resource(
+        MaintenanceTicket.all_objects.filter(unit__property__deleted_at__isnull=True),
+        {'unit_id': 'unit_id', 'submitted_by_id': 'submitted_by_id', 'title': 'title',
+         'description': 'description', 'priority': 'priority', 'status': 'status', 'created_at': 'created_at'},
+        _by_role('owner', 'submitted_by'),
+        filters={'status': 'status', 'priority': 'priority', 'unit': 'unit_id'},
+        includes={'unit': ('unit_id', 'units'), 'submitted_by': ('submitted_by_id', 'users')},
+    ),
+    'notifications': Resource(
+        Notification.objects,
+        {'title': 'title', 'message': 'message', 'is_read': 'is_read', 'created_at': 'created_at'},
+        lambda queryset, user: queryset.filter(recipient=user),
+        filters={'is_read': 'is_read'},
+    ),
+    # only ever included, never listed
+    'users': Resource(
+        User.objects,
+        {'username': 'username', 'first_name': 'first_name', 'last_name': 'last_name', 'email': 'email',
+         'phone': 'phone'},
+        lambda queryset, user: queryset.none(),
+    ),
+}
+ENDPOINTS = [name for name in RESOURCES if name != 'users']
+
+
+# ── Queries ────────────────────────────────────────────────────────────────────
+
+def _split(value):
+    return [part for part in (value or '').split(',') if part]
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ApiError("Invalid cursor") from exc
+
+
+def _parse(resource, query):
+    """(columns to fetch, columns to return, includes, filters) from a request's GET, or ApiError."""
+    names = _split(query.get('fields')) or list(resource.fields)
+    unknown = [name for name in names if name not in resource.fields]
+    includes = _split(query.get('include'))
+    unknown += [name for name in includes if name not in resource.includes]
+    if unknown:
+        raise ApiError(f"Unknown field or include: {', '.join(unknown)}")
+    names = ['id'] + [name for name in names if name != 'id']
+    # an include needs the id it joins on, even if the client did not ask for it
+    fetched = names + [resource.includes[name][0] for name in includes if resource.includes[name][0] not in names]
+    filters = {lookup: query[name] for name, lookup in resource.filters.items() if name in query}
+    return fetched, names, includes, filters
+
+
+def _include(resource, rows, includes):
+    """Nest each include's rows into `rows`: one query per include."""
+    for name in includes:
+        id_field, target_name = resource.includes[name]
+        target = RESOURCES[target_name]
+        ids = {row[id_field] for row in rows if row[id_field] is not None}
+        related = {
+            row['id']: row for row in
+            _values(target.manager.filter(pk__in=ids), target.columns(list(target.fields)))
+        } if ids else {}
+        for row in rows:
+            row[name] = related.get(row[id_field])
+
+
+def _fetch(queryset, resource, query, limit=None):
+    fetched, names, includes, filters = _parse(resource, query)
+    try:
+        queryset = queryset.filter(**filters)
+        rows = list(_values(queryset.order_by('-pk'), resource.columns(fetched))[:limit])
+    except (ValidationError, ValueError) as exc:
+        raise ApiError("Invalid filter value") from exc
+    _include(resource, rows, includes)
+    for row in rows:
+        for column in fetched[len(names):]:
+            del row[column]
+    return rows
+
+
+def list_rows(user, name, query):
+    """A page of `name` rows visible to `user`: {'results', 'next_cursor'}."""
+    resource = RESOURCES[name]
+    try:
+        limit = min(int(query.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError("Invalid limit")
+    if limit < 1:
+        raise ApiError("Invalid limit")
+    queryset = resource.visible_to(user)
+    if query.get('cursor'):
+        queryset = queryset.filter(pk__lt=decode_cursor(query['cursor']))
+    rows = _fetch(queryset, resource, query, limit + 1)
+    next_cursor = encode_cursor(rows[limit - 1]['id']) if len(rows) > limit else None
+    return {'results': rows[:limit], 'next_cursor': next_cursor}
+
+
+def detail_row(user, name, pk, query):
+    rows = _fetch(RESOURCES[name].visible_to(user).filter(pk=pk), RESOURCES[name], query)
+    if not rows:
+        raise ApiError("Not found", status=404)
+    return rows[0]
+
+
+# ── Responses ──────────────────────────────────────────────────────────────────
+
+def respond(request, payload, status=200):
+    """JSON with an ETag over the body; 304 if the client already has it."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    if status == 200 and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def error(request, message, status=400):
+    response = respond(request, {'error': message}, status)
+    if status == 401:
+        response['WWW-Authenticate'] = 'Bearer'
+    return response
@@ -0,0 +1,155 @@
+"""
+HostFlow Arrears Aging
+──────────────────────
+Who owes how much, and for how long. The outstanding amount of every
+unpaid payment (``amount_due + late_fee - amount_paid``) falls in one bucket
+by days past its due date – current, 1–30, 31–60, 61–90, 90+ – and the
+report sums the buckets per property, unit or tenant:
+
+    aging(landlord, 'property')              # one row per property
+    aging(landlord, 'unit', property=7)      # drill down into one
+    payments(landlord, unit=42)              # the payments behind a row
+
+Each is a single grouped query with one ``SUM(CASE WHEN …)`` per bucket,
+so the database does the pivot and returns one row per group, largest
+arrears first – never the payment rows themselves. ``export_rows`` streams
+the same rows for CSV through a chunked cursor.
+
+Late fees are the stored ``Payment.late_fee``, as in statements.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Payment, Property
+
+UNPAID = ['pending', 'partial', 'overdue']
+ROW_LIMIT = 200
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+OUTSTANDING = F('amount_due') + F('late_fee') - F('amount_paid')
+
+# key, label, days past due (first, last); None leaves that end open
+BUCKETS = [
+    ('current', 'Current', None, 0),
+    ('days_1_30', '1–30 days', 1, 30),
+    ('days_31_60', '31–60 days', 31, 60),
+    ('days_61_90', '61–90 days', 61, 90),
+    ('days_90_plus', '90+ days', 91, None),
+]
+
+# level → the columns of its rows; `key` is what a row drills down by
+GROUPS = {
+    'property': {'key': 'lease__unit__property_id', 'property_name': 'lease__unit__property__name'},
+    'unit': {
+        'key': 'lease__unit_id', 'property_name': 'lease__unit__property__name',
+        'unit_number': 'lease__unit__unit_number',
+    },
+    'tenant': {'key': 'lease__tenant_id', 'tenant_name': 'lease__tenant__username'},
+}
+DRILL_DOWN = {'property': 'unit', 'unit': 'payment', 'tenant': 'payment'}
+LEVELS = [*GROUPS, 'payment']
+FILTERS = {'property': 'lease__unit__property_id', 'unit': 'lease__unit_id', 'tenant': 'lease__tenant_id'}
+
+
+def params(query):
+    """(level, filters) from a request's GET; anything unrecognised is ignored."""
+    level = query.get('by')
+    filters = {name: int(query[name]) for name in FILTERS if query.get(name, '').isdigit()}
+    return (level if level in LEVELS else 'property'), filters
+
+
+# ── Buckets ────────────────────────────────────────────────────────────────────
+
+def _window(today, first, last):
+    """Payments `first`…`last` days past due, as a due-date range (index-friendly)."""
+    window = Q()
+    if first is not None:
+        window &= Q(due_date__lte=today - timedelta(days=first))
+    if last is not None:
+        window &= Q(due_date__gte=today - timedelta(days=last))
+    return window
+
+
+def _bucket_sums(today):
+    sums = {
+        key: Sum(Case(When(_window(today, first, last), then=OUTSTANDING), default=Value(ZERO), output_field=MONEY))
+        for key, _, first, last in BUCKETS
+    }
+    sums['total'] = Sum(OUTSTANDING, output_field=MONEY)
+    return sums
+
+
+def _bucket_of(today):
+    return Case(*[When(_window(today, first, last), then=Value(key)) for key, _, first, last in BUCKETS])
+
+
+# ── Queries ────────────────────────────────────────────────────────────────────
+
+def unpaid(landlord, **filters):
+    """`landlord`'s payments not yet settled (``Payment.save`` marks them paid once they are)."""
+    return Payment.objects.filter(
+        owner=landlord, status__in=UNPAID, **{FILTERS[name]: value for name, value in filters.items()}
+    ).exclude(lease__unit__property__in=Property.all_objects.pending_deletion(landlord))
+
+
+def totals(landlord, today=None, **filters):
+    """Each bucket's sum and the total over everything `filters` selects."""
+    sums = unpaid(landlord, **filters).aggregate(**_bucket_sums(today or timezone.localdate()))
+    return {key: value or ZERO for key, value in sums.items()}
+
+
+def add_up(rows):
+    """totals() from every group's row of aging(), without going back to the database."""
+    keys = [key for key, *_ in BUCKETS] + ['total']
+    return {key: sum((row[key] for row in rows), start=ZERO) for key in keys}
+
+
+def aging(landlord, level='property', today=None, **filters):
+    """One row per `level` group – its columns, bucket sums and total – largest total first."""
+    columns = {name: F(path) for name, path in GROUPS[level].items()}
+    return unpaid(landlord, **filters).values(**columns).annotate(
+        **_bucket_sums(today or timezone.localdate())
+    ).order_by('-total', 'key')
+
+
+def payments(landlord, today=None, **filters):
+    """The unpaid payments themselves, oldest first, each with its bucket."""
+    today = today or timezone.localdate()
+    return unpaid(landlord, **filters).annotate(balance=OUTSTANDING, bucket=_bucket_of(today)).values(
+        'pk', 'due_date', 'status', 'amount_due', 'late_fee', 'amount_paid', 'balance', 'bucket',
+        property_name=F('lease__unit__property__name'), unit_number=F('lease__unit__unit_number'),
+        tenant_name=F('lease__tenant__username'),
+    ).order_by('due_date', 'pk')
+
+
+def report(landlord, level, today=None, **filters):
+    """Rows for `level`, aging() or payments()."""
+    if level == 'payment':
+        return payments(landlord, today, **filters)
+    return aging(landlord, level, today, **filters)
+
+
+# ── Export ─────────────────────────────────────────────────────────────────────
+
+def export_header(level):
+    if level == 'payment':
+        return ['Property', 'Unit', 'Tenant', 'Due Date', 'Status', 'Amount Due', 'Late Fee', 'Paid',
+                'Outstanding', 'Bucket']
+    names = {'property_name': 'Property', 'unit_number': 'Unit', 'tenant_name': 'Tenant'}
+    return [names[column] for column in GROUPS[level] if column != 'key'] + [label for _, label, *_ in BUCKETS] + ['Total']
+
+
+def export_rows(rows, level, chunk_size=2000):
+    """CSV rows for `rows` (from report()), fetched `chunk_size` at a time."""
+    labels = {key: label for key, label, *_ in BUCKETS}
+    for row in rows.iterator(chunk_size=chunk_size):
+        if level == 'payment':
+            yield [row['property_name'], row['unit_number'], row['tenant_name'], row['due_date'], row['status'],
+                   row['amount_due'], row['late_fee'], row['amount_paid'], row['balance'], labels[row['bucket']]]
+        else:
+            yield [row[column] for column in GROUPS[level] if column != 'key'] + \
+                  [row[key] for key, *_ in BUCKETS] + [row['total']]
@@ -0,0 +1,120 @@
+"""
+HostFlow Availability
+─────────────────────
+Booking availability for daily-rent units.
+
+A booking covers the nights ``check_in … check_out - 1``, so a guest may
+check in on the day the previous one checks out. Overlaps are refused by
+the database (migration 0005), and the same interval index answers "which
+units are booked between X and Y":
+
+* PostgreSQL – ``stay && daterange(X, Y)`` on the GiST exclusion index.
+* SQLite     – an R*Tree lookup over [first night, last night].
+* anything else – plain date comparisons on the (unit, check_in, check_out)
+  index.
+
+Either way the search is one ``NOT IN`` subquery, so it costs one query
+whatever the number of units.
+"""
+
+from datetime import date, timedelta
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.db.models.expressions import RawSQL
+
+from .models import Unit, Lease, Booking
+
+MAX_STAY_NIGHTS = 365
+CALENDAR_DAYS = 31
+MAX_CALENDAR_DAYS = 92
+
+
+def parse_range(check_in, check_out, max_nights=MAX_STAY_NIGHTS):
+    """Validate ISO date strings; ValueError with a readable message if bad."""
+    try:
+        start, end = date.fromisoformat(check_in), date.fromisoformat(check_out)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Dates must be YYYY-MM-DD.") from exc
+    if end <= start:
+        raise ValueError("Check-out must be after check-in.")
+    if (end - start).days > max_nights:
+        raise ValueError(f"At most {max_nights} nights at a time.")
+    return start, end
+
+
+def overlapping(check_in, check_out):
+    """Non-cancelled bookings sharing at least one night with the range."""
+    return Booking.objects.exclude(status='cancelled').filter(check_in__lt=check_out, check_out__gt=check_in)
+
+
+def booked_unit_ids(check_in, check_out):
+    """Subquery of unit ids with a booking in the range, served by the interval index."""
+    if connection.vendor == 'postgresql':
+        return RawSQL(
+            "SELECT unit_id FROM hostflow_booking "
+            "WHERE status <> 'cancelled' AND stay && daterange(%s, %s, '[)')",
+            [check_in, check_out],
+        )
+    if connection.vendor == 'sqlite':
+        return RawSQL(
+            "SELECT unit_lo FROM hostflow_booking_rtree "
+            "WHERE first_night <= CAST(julianday(%s) AS INTEGER) - 1 "
+            "AND last_night >= CAST(julianday(%s) AS INTEGER)",
+            [check_out.isoformat(), check_in.isoformat()],
+        )
+    return overlapping(check_in, check_out).values('unit_id')
+
+
+def available_units(landlord, check_in, check_out, property_id=None):
+    """Landlord's daily units free for every night of the range (one query)."""
+    # all_objects: the landlord filter is on the units, and an owner predicate
+    # here would pull the planner off the lease unit index
+    leased = Lease.all_objects.filter(
+        unit=OuterRef('pk'), status='active', start_date__lt=check_out, end_date__gte=check_in
+    )
+    units = Unit.objects.filter(property__owner=landlord, property__deleted_at__isnull=True, rent_type='daily')
+    if property_id:
+        units = units.filter(property_id=property_id)
+    return (
+        units.exclude(pk__in=booked_unit_ids(check_in, check_out))
+        .exclude(Exists(leased))
+        .select_related('property')
+        .order_by('property__name', 'unit_number')
+    )
+
+
+def calendar(landlord, start, days=CALENDAR_DAYS, unit_ids=None, property_id=None):
+    """Bookings of the landlord's daily units in [start, start + days), grouped per unit.
+
+    Two queries: the units, then every booking in the window.
+    """
+    end = start + timedelta(days=days)
+    units = Unit.objects.filter(property__owner=landlord, property__deleted_at__isnull=True, rent_type='daily').select_related('property')
+    if unit_ids:
+        units = units.filter(pk__in=unit_ids)
+    if property_id:
+        units = units.filter(property_id=property_id)
+    rows = {
+        unit.pk: {
+            'id': unit.pk,
+            'unit': unit.unit_number,
+            'property': unit.property.name,
+            'rent_amount': unit.rent_amount,
+            'bookings': [],
+            'booked_nights': 0,
+        }
+        for unit in units.order_by('property__name', 'unit_number')
+    }
+
+    bookings = overlapping(start, end).filter(unit__in=units.values('pk')).order_by('check_in').values(
+        'id', 'unit_id', 'guest_name', 'status', 'check_in', 'check_out'
+    )
+    for booking in bookings:
+        row = rows[booking.pop('unit_id')]
+        row['bookings'].append(booking)
+        row['booked_nights'] += (min(booking['check_out'], end) - max(booking['check_in'], start)).days
+
+    for row in rows.values():
+        row['free_nights'] = days - row['booked_nights']
+    return {'start': start, 'end': end, 'days': days, 'units': list(rows.values())}
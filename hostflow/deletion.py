@@ -0,0 +1,181 @@
+"""
+HostFlow Background Deletion
+────────────────────────────
+Deleting a property (or a whole landlord) with years of history through
+``Model.delete()`` makes Django's collector load every unit, lease, payment,
+ticket and comment into memory and remove them in one long transaction that
+locks the hottest tables.
+
+Instead the request only *schedules* a DeletionJob and soft-hides the
+property (``Property.deleted_at``; the default manager skips it). Its
+active leases are terminated, so nothing bills, forecasts or reminds about
+them any more, its rows leave the search index, and the landlord's views
+skip what still hangs off it. A worker
+(``manage.py run_deletion_jobs``) then removes the rows leaf-first, in
+bounded chunks of primary keys, each chunk its own short transaction:
+
+    comments → tickets → payment captures → payments → bookings → statements
+      → leases → rent history → units → property
+
+Each chunk goes through ``QuerySet.delete()``, so the usual signals keep
+search entries, ledgers, counters and the forecast current, and a row that
+gained a child between steps is cascaded by the collector. Lease documents,
+ticket images and statement files are deleted once their chunk has
+committed.
+"""
+
+import logging
+import time
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import forecast, ledger, search
+from .models import (
+    User, Property, Unit, Lease, Payment, MaintenanceTicket, TicketComment,
+    Notification, Booking, SearchEntry, DeletionJob, Statement, RentHistory, PaymentCapture,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+# ── Scheduling ─────────────────────────────────────────────────────────────────
+
+def _hide(property_ids, owner_id):
+    """Soft-hide `property_ids`, end their leases and drop what caches and search still hold of them."""
+    leases = Lease.all_objects.filter(unit__property__in=property_ids)
+    tenant_ids = set(leases.values_list('tenant_id', flat=True))
+    Property.all_objects.filter(pk__in=property_ids).update(deleted_at=timezone.now())
+    leases.filter(status='active').update(status='terminated')
+    units = Unit.objects.filter(property__in=property_ids).values('pk')
+    SearchEntry.objects.filter(
+        Q(kind='property', object_id__in=property_ids)
+        | Q(kind='unit', object_id__in=units)
+        | Q(kind='ticket', object_id__in=MaintenanceTicket.all_objects.filter(unit__in=units).values('pk'))
+        | Q(kind='payment', object_id__in=Payment.all_objects.filter(lease__unit__in=units).values('pk'))
+    ).delete()
+    search.index_objects('tenant', tenant_ids)
+    for tenant_id in tenant_ids:
+        ledger.invalidate(tenant_id)
+    forecast.invalidate(owner_id)
+
+
+def schedule_property_deletion(prop, requested_by=None):
+    """Hide `prop` now and queue its deletion. A few set-based writes, whatever its size."""
+    _hide([prop.pk], prop.owner_id)
+    return DeletionJob.objects.create(
+        kind='property', object_id=prop.pk, label=prop.name, requested_by=requested_by
+    )
+
+
+def schedule_landlord_deletion(landlord, requested_by=None):
+    """Lock `landlord` out, hide their properties and queue the lot."""
+    User.objects.filter(pk=landlord.pk).update(is_active=False)
+    _hide(list(Property.all_objects.filter(owner=landlord, deleted_at__isnull=True).values_list('pk', flat=True)),
+          landlord.pk)
+    return DeletionJob.objects.create(
+        kind='landlord', object_id=landlord.pk, label=landlord.username, requested_by=requested_by
+    )
+
+
+# ── Steps ──────────────────────────────────────────────────────────────────────
+# (name, unscoped manager, lookup up to the property, media field)
+
+PROPERTY_STEPS = [
+    ('comments', TicketComment.objects, 'ticket__unit__property', None),
+    ('tickets', MaintenanceTicket.all_objects, 'unit__property', 'image'),
+    ('payment captures', PaymentCapture.objects, 'payment__lease__unit__property', None),
+    ('payments', Payment.all_objects, 'lease__unit__property', None),
+    ('bookings', Booking.objects, 'unit__property', None),
+    ('statements', Statement.objects, 'lease__unit__property', 'file'),
+    ('leases', Lease.all_objects, 'unit__property', 'document'),
+    ('rent history', RentHistory.objects, 'unit__property', None),
+    ('units', Unit.objects, 'property', None),
+]
+
+
+def _delete_chunk(manager, pks, media_field):
+    queryset = manager.filter(pk__in=pks)
+    files = list(filter(None, queryset.values_list(media_field, flat=True))) if media_field else []
+    with transaction.atomic():
+        deleted = queryset.delete()[1].get(manager.model._meta.label, 0)
+    for name in files:
+        default_storage.delete(name)
+    return deleted
+
+
+class Runner:
+    def __init__(self, job, chunk_size=CHUNK_SIZE, pause=0):
+        self.job = job
+        self.chunk_size = chunk_size
+        self.pause = pause
+
+    def _progress(self, step, deleted=0):
+        DeletionJob.objects.filter(pk=self.job.pk).update(step=step, deleted_rows=F('deleted_rows') + deleted)
+
+    def count(self, property_ids):
+        return sum(
+            manager.filter(**{f'{path}__in': property_ids}).count()
+            for _, manager, path, _ in PROPERTY_STEPS
+        ) + len(property_ids) + (1 if self.job.kind == 'landlord' else 0)
+
+    def delete_property(self, property_id):
+        for step, manager, path, media_field in PROPERTY_STEPS:
+            pending = manager.filter(**{path: property_id}).order_by('pk').values_list('pk', flat=True)
+            while pks := list(pending[:self.chunk_size]):
+                self._progress(step, _delete_chunk(manager, pks, media_field))
+                if self.pause:
+                    time.sleep(self.pause)
+        # nothing left under it: the collector's cascade is now a no-op
+        deleted = Property.all_objects.filter(pk=property_id).delete()[1].get('hostflow.Property', 0)
+        self._progress('property', deleted)
+
+    def delete_landlord(self, landlord_id):
+        for step, manager, owner in [('notifications', Notification.objects, 'recipient'),
+                                     ('search entries', SearchEntry.objects, 'owner')]:
+            pending = manager.filter(**{owner: landlord_id}).order_by('pk').values_list('pk', flat=True)
+            while pks := list(pending[:self.chunk_size]):
+                self._progress(step, _delete_chunk(manager, pks, None))
+        # what is left hanging off the user is SET_NULL updates and stray rows
+        User.objects.filter(pk=landlord_id).delete()
+        self._progress('landlord', 1)
+
+    def run(self):
+        job = self.job
+        if job.kind == 'property':
+            property_ids = [job.object_id]
+        else:
+            property_ids = list(Property.all_objects.filter(owner=job.object_id).values_list('pk', flat=True))
+        DeletionJob.objects.filter(pk=job.pk).update(total_rows=self.count(property_ids))
+        for property_id in property_ids:
+            self.delete_property(property_id)
+        if job.kind == 'landlord':
+            self.delete_landlord(job.object_id)
+
+
+def run_job(job, chunk_size=CHUNK_SIZE, pause=0):
+    """Run one job to completion, recording progress and any failure on it."""
+    DeletionJob.objects.filter(pk=job.pk).update(status='running', started_at=timezone.now(), error='')
+    try:
+        Runner(job, chunk_size, pause).run()
+    except Exception as exc:
+        logger.exception("Deletion job %s failed", job.pk)
+        DeletionJob.objects.filter(pk=job.pk).update(status='failed', error=repr(exc), finished_at=timezone.now())
+    else:
+        DeletionJob.objects.filter(pk=job.pk).update(status='done', step='', finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def claim_next():
+    """Mark the oldest pending job as running and return it (None if there is none)."""
+    with transaction.atomic():
+        job = DeletionJob.objects.select_for_update(skip_locked=True).filter(
+            status='pending').order_by('created_at').first()
+        if job:
+            DeletionJob.objects.filter(pk=job.pk).update(status='running')
+        return job
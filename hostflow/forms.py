@@ -1,5 +1,13 @@
+from decimal import Decimal
+
 from django import forms
-from .models import User, Property, Unit, Lease, Payment, MaintenanceTicket, TicketComment
+from django.urls import reverse
+from .models import (
+    User, Property, Unit, Lease, MaintenanceTicket, TicketComment, Booking, NotificationPreference, RentRevision,
+)
+from .availability import overlapping
+from .payments import new_key
+from .tenants import tenants_for, label as tenant_label
 
 # ── 1. AUTH FORMS ──────────────────────────────────────────────────────────
 
@@ -49,31 +57,120 @@ class UnitForm(forms.ModelForm):
             'status': forms.Select(attrs={'class': 'form-select'}),
         }
 
+class RentRevisionForm(forms.ModelForm):
+    """A rent change and the units it applies to; the filters are ANDed, blank means all."""
+    property = forms.ModelChoiceField(queryset=Property.objects.none(), required=False, empty_label='All properties',
+                                      widget=forms.Select(attrs={'class': 'form-select'}))
+    city = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    rent_type = forms.ChoiceField(choices=[('', 'Any rent type')] + Unit.RENT_TYPE_CHOICES, required=False,
+                                  widget=forms.Select(attrs={'class': 'form-select'}))
+
+    field_order = ['property', 'city', 'rent_type', 'kind', 'value', 'effective_from', 'note']
+
+    class Meta:
+        model = RentRevision
+        fields = ['kind', 'value', 'effective_from', 'note']
+        widgets = {
+            'kind': forms.Select(attrs={'class': 'form-select'}),
+            'value': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'effective_from': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'note': forms.TextInput(attrs={'class': 'form-control'}),
+        }
+
+    def __init__(self, *args, landlord=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['property'].queryset = Property.objects.filter(owner=landlord).order_by('name')
+
+    def clean(self):
+        cleaned = super().clean()
+        kind, value = cleaned.get('kind'), cleaned.get('value')
+        if kind == 'percent' and value is not None and not -90 <= value <= 100:
+            self.add_error('value', "A percentage change must be between -90 and 100.")
+        return cleaned
+
+class TenantAutocompleteWidget(forms.Widget):
+    """Hidden tenant id plus a search box fed by the tenant_autocomplete endpoint.
+
+    Only the selected tenant is ever rendered, never the full choice list.
+    """
+    template_name = 'hostflow/widgets/tenant_autocomplete.html'
+    queryset = User.objects.none()
+
+    class Media:
+        js = ['hostflow/js/tenant_picker.js']
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        selected = None
+        if value and str(value).isdigit():
+            selected = self.queryset.filter(pk=value).only('username', 'email', 'phone').first()
+        context['widget'].update({
+            'url': reverse('tenant_autocomplete'),
+            'label': tenant_label(selected) if selected else '',
+        })
+        return context
+
+
+class TenantChoiceField(forms.ModelChoiceField):
+    """Validates just the submitted id against the landlord's tenants (one query)."""
+    widget = TenantAutocompleteWidget
+    default_error_messages = {
+        'invalid_choice': "Pick one of your tenants from the list.",
+    }
+
+
 class LeaseForm(forms.ModelForm):
+    tenant = TenantChoiceField(queryset=User.objects.none())
+
     class Meta:
         model = Lease
         fields = ['tenant', 'start_date', 'end_date', 'document']
         widgets = {
-            'tenant': forms.Select(attrs={'class': 'form-select'}),
             'start_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'document': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, landlord=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['tenant'].queryset = User.objects.filter(role='tenant')
+        tenant = self.fields['tenant']
+        tenant.queryset = tenant.widget.queryset = tenants_for(landlord) if landlord else User.objects.none()
+
+class ManualPaymentForm(forms.Form):
+    """Money the landlord took in person; recorded through payments.record()."""
+    amount_paid = forms.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'),
+                                     widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    paid_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    notes = forms.CharField(required=False, widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}))
+    idempotency_key = forms.CharField(max_length=64, widget=forms.HiddenInput, initial=new_key)
 
-class ManualPaymentForm(forms.ModelForm):
+class BookingForm(forms.ModelForm):
     class Meta:
-        model = Payment
-        fields = ['amount_paid', 'paid_date', 'notes']
+        model = Booking
+        fields = ['guest_name', 'check_in', 'check_out', 'status', 'notes']
         widgets = {
-            'amount_paid': forms.NumberInput(attrs={'class': 'form-control'}),
-            'paid_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'guest_name': forms.TextInput(attrs={'class': 'form-control'}),
+            'check_in': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'check_out': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'status': forms.Select(attrs={'class': 'form-select'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
 
+    def __init__(self, *args, unit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unit = unit
+        self.fields['status'].choices = [c for c in Booking.STATUS_CHOICES if c[0] != 'cancelled']
+
+    def clean(self):
+        cleaned = super().clean()
+        check_in, check_out = cleaned.get('check_in'), cleaned.get('check_out')
+        if check_in and check_out:
+            if check_out <= check_in:
+                raise forms.ValidationError("Check-out must be after check-in.")
+            if overlapping(check_in, check_out).filter(unit=self.unit).exists():
+                raise forms.ValidationError("The unit is already booked for some of these nights.")
+        return cleaned
+
 # ── 3. MAINTENANCE FORMS ─────────────────────────────────────────────────────
 
 class MaintenanceTicketForm(forms.ModelForm):
@@ -97,4 +194,12 @@ class TicketStatusForm(forms.ModelForm):
     class Meta:
         model = MaintenanceTicket
         fields = ['status']
-        widgets = {'status': forms.Select(attrs={'class': 'form-select'})}
\ No newline at end of file
+        widgets = {'status': forms.Select(attrs={'class': 'form-select'})}
+
+# ── NOTIFICATION FORMS ─────────────────────────────────────────────────────
+
+class NotificationPreferenceForm(forms.ModelForm):
+    class Meta:
+        model = NotificationPreference
+        fields = list(NotificationPreference.CHANNELS)
+        widgets = {name: forms.CheckboxInput(attrs={'class': 'form-check-input'}) for name in fields}
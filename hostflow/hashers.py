@@ -0,0 +1,20 @@
+"""
+HostFlow Password Hashers
+─────────────────────────
+PBKDF2 with the work factor taken from settings (PASSWORD_PBKDF2_ITERATIONS)
+instead of fixed per Django release. Stored hashes carry their own
+iteration count, so changing the setting never locks anyone out: on the
+next successful login Django sees ``must_update()`` and re-hashes the
+password at the new cost (ModelBackend → check_password → setter).
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Same ``pbkdf2_sha256`` format as Django's; only the iteration count differs."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,121 @@
+"""
+HostFlow Tenant Ledger
+──────────────────────
+Everything the tenant portal shows — balance due, next due date, payment
+history with late fees, monthly statements and open tickets — built in five
+queries and cached per tenant.
+
+The cached summary is a plain dict (so it pickles into any cache backend
+and serialises straight to JSON). Signals drop it whenever one of the
+tenant's payments, leases or tickets changes; the key also carries today's
+date because late fees grow daily. With more than one worker process,
+CACHES must point at a shared backend for invalidation to reach them all.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Lease, Payment, MaintenanceTicket, Statement
+
+CACHE_TTL = 15 * 60
+HISTORY_LENGTH = 24
+STATEMENT_COUNT = 12
+RENT_DUE_DAY = 5
+
+
+def _cache_key(tenant_id, today):
+    return f'hostflow:ledger:{tenant_id}:{today.isoformat()}'
+
+
+def invalidate(tenant_id):
+    cache.delete(_cache_key(tenant_id, timezone.now().date()))
+
+
+def invalidate_many(tenant_ids):
+    """invalidate() for many tenants in one cache round trip."""
+    today = timezone.now().date()
+    cache.delete_many([_cache_key(tenant_id, today) for tenant_id in tenant_ids])
+
+
+def _payment_row(payment):
+    late_fee = payment.calculate_late_fee()
+    return {
+        'id': payment.pk,
+        'amount_due': payment.amount_due,
+        'amount_paid': payment.amount_paid,
+        'late_fee': late_fee,
+        'total_due': payment.amount_due + late_fee,
+        'outstanding': max(payment.amount_due + late_fee - payment.amount_paid, 0),
+        'due_date': payment.due_date,
+        'paid_date': payment.paid_date,
+        'status': payment.status,
+    }
+
+
+def build_ledger(tenant):
+    today = timezone.now().date()
+
+    leases = list(
+        Lease.objects.filter(tenant=tenant, status='active').select_related('unit__property').order_by('start_date')
+    )
+    unpaid = [
+        _payment_row(p) for p in
+        Payment.objects.filter(lease__tenant=tenant, lease__status='active').exclude(status='paid').order_by('due_date')
+    ]
+    history = [
+        _payment_row(p) for p in
+        Payment.objects.filter(lease__tenant=tenant, lease__status='active').order_by('-due_date')[:HISTORY_LENGTH]
+    ]
+    statements = [
+        {'month': s.month, 'closing_balance': s.closing_balance, 'url': s.file.url}
+        for s in Statement.objects.filter(lease__tenant=tenant).only('month', 'closing_balance', 'file')
+        .order_by('-month', '-pk')[:STATEMENT_COUNT]
+    ]
+    tickets = list(
+        MaintenanceTicket.objects.filter(submitted_by=tenant, unit__property__deleted_at__isnull=True)
+        .exclude(status='resolved')
+        .order_by('-created_at').values('id', 'title', 'status', 'priority', 'created_at')
+    )
+
+    upcoming = [p['due_date'] for p in unpaid if p['due_date'] >= today]
+    if upcoming:
+        next_due = upcoming[0]
+    elif leases:
+        # next rent run: generate_rent bills on the 5th of each month
+        next_due = today.replace(day=RENT_DUE_DAY)
+        if next_due <= today:
+            next_due = (next_due.replace(day=1) + timedelta(days=32)).replace(day=RENT_DUE_DAY)
+    else:
+        next_due = None
+
+    return {
+        'as_of': today,
+        'balance_due': sum((p['outstanding'] for p in unpaid), start=0),
+        'overdue_count': sum(1 for p in unpaid if p['due_date'] < today),
+        'next_due_date': next_due,
+        'leases': [{
+            'id': lease.pk,
+            'unit': str(lease.unit),
+            'unit_number': lease.unit.unit_number,
+            'property': lease.unit.property.name,
+            'rent_amount': lease.unit.rent_amount,
+            'start_date': lease.start_date,
+            'end_date': lease.end_date,
+            'expiring_soon': lease.is_expiring_soon(),
+        } for lease in leases],
+        'payments': history,
+        'statements': statements,
+        'open_tickets': tickets,
+    }
+
+
+def get_ledger(tenant):
+    """Cached ledger for `tenant`, rebuilt on a miss."""
+    key = _cache_key(tenant.pk, timezone.now().date())
+    ledger = cache.get(key)
+    if ledger is None:
+        ledger = build_ledger(tenant)
+        cache.set(key, ledger, CACHE_TTL)
+    return ledger
@@ -0,0 +1,239 @@
+"""
+Synthetic portfolio generator for load tests and benchmarks.
+
+    python manage.py generate_portfolio --scale 10k
+    python manage.py generate_portfolio --landlords 3 --properties 20 --units 40 --years 2
+
+Every row is inserted with bulk_create in batches, one landlord at a time,
+so memory stays bounded at any size. The same --seed gives the same data.
+"""
+
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from hostflow import search
+from hostflow.models import (
+    User, Property, Unit, Lease, Payment,
+    MaintenanceTicket, TicketComment, Notification, Booking,
+)
+
+# scale → (landlords, properties per landlord, units per property)
+SCALES = {
+    '1k': (10, 10, 10),
+    '10k': (10, 20, 50),
+    '100k': (20, 50, 100),
+}
+
+BENCH_PASSWORD = 'bench-pass-123'
+
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Pune', 'Chennai', 'Hyderabad', 'Kolkata', 'Jaipur']
+TICKET_TITLES = ['Leaking tap', 'No hot water', 'Broken window', 'AC not cooling',
+                 'Power outage', 'Blocked drain', 'Door lock jammed', 'Pest control']
+
+
+class PortfolioGenerator:
+    def __init__(self, landlords, properties, units, years=1, occupancy=0.9, tickets=2,
+                 comments=2, notifications=3, bookings=6, prefix='bench', seed=42, batch_size=2000,
+                 index_search=True):
+        self.landlords = landlords
+        self.properties = properties
+        self.units = units
+        self.years = years
+        self.occupancy = occupancy
+        self.tickets = tickets
+        self.comments = comments
+        self.notifications = notifications
+        self.bookings = bookings
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.index_search = index_search
+        self.rng = random.Random(seed)
+        self.today = timezone.now().date()
+        self.password = make_password(BENCH_PASSWORD)
+        self.counts = dict.fromkeys(
+            ['landlords', 'properties', 'units', 'tenants', 'leases',
+             'payments', 'tickets', 'comments', 'notifications', 'bookings', 'search entries'], 0
+        )
+
+    def _bulk(self, model, objs, key):
+        created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.counts[key] += len(created)
+        return created
+
+    def run(self):
+        for n in range(self.landlords):
+            with transaction.atomic():
+                self._landlord(n)
+        return self.counts
+
+    def _landlord(self, n):
+        rng = self.rng
+        landlord = self._bulk(User, [User(
+            username=f'{self.prefix}_ll{n}', email=f'{self.prefix}_ll{n}@example.com',
+            password=self.password, role='landlord', is_verified=True,
+        )], 'landlords')[0]
+
+        props = self._bulk(Property, [
+            Property(owner=landlord, name=f'{self.prefix} Residency {n}-{p}',
+                     address=f'{p} MG Road', city=rng.choice(CITIES))
+            for p in range(self.properties)
+        ], 'properties')
+
+        units = []
+        for prop in props:
+            units += self._bulk(Unit, [
+                Unit(property=prop, unit_number=f'{u + 1:03d}',
+                     rent_type='daily' if rng.random() < 0.1 else 'monthly',
+                     rent_amount=Decimal(rng.randrange(8000, 40000, 500)),
+                     status='occupied' if rng.random() < self.occupancy else 'vacant')
+                for u in range(self.units)
+            ], 'units')
+        occupied = [u for u in units if u.status == 'occupied']
+
+        # bulk_create skips the signals that maintain the property counters
+        occupied_per_property = Counter(u.property_id for u in occupied)
+        for prop in props:
+            prop.unit_count = self.units
+            prop.occupied_count = occupied_per_property[prop.pk]
+        Property.objects.bulk_update(props, ['unit_count', 'occupied_count'], batch_size=self.batch_size)
+
+        tenants = self._bulk(User, [
+            User(username=f'{self.prefix}_t{n}_{i}', email=f'{self.prefix}_t{n}_{i}@example.com',
+                 phone=f'9{rng.randrange(10**8, 10**9)}', password=self.password,
+                 role='tenant', is_verified=True)
+            for i in range(len(occupied))
+        ], 'tenants')
+
+        history = relativedelta(years=self.years)
+        leases = self._bulk(Lease, [
+            Lease(unit=unit, tenant=tenant, owner=landlord,
+                  start_date=self.today - history - timedelta(days=rng.randrange(0, 28)),
+                  end_date=self.today + timedelta(days=rng.randrange(10, 700)),
+                  status='active')
+            for unit, tenant in zip(occupied, tenants)
+        ], 'leases')
+
+        self._payments(leases)
+        self._tickets(occupied, tenants, landlord)
+        self._bookings([u for u in units if u.rent_type == 'daily' and u.status == 'vacant'])
+
+        recipients = [landlord] + tenants
+        self._bulk(Notification, [
+            Notification(recipient=user, title='Rent reminder',
+                         message='Your rent is due on the 5th.', is_read=rng.random() < 0.5)
+            for user in recipients for _ in range(self.notifications)
+        ], 'notifications')
+
+        # bulk_create skips the signals that maintain the search index
+        if self.index_search:
+            self.counts['search entries'] += search.rebuild(owner=landlord, batch_size=self.batch_size)
+
+    def _payments(self, leases):
+        rng, batch = self.rng, []
+        for lease in leases:
+            month = lease.start_date.replace(day=5)
+            while month <= self.today.replace(day=5):
+                batch.append(self._payment(lease, month, rng))
+                month += relativedelta(months=1)
+                if len(batch) >= self.batch_size:
+                    self._bulk(Payment, batch, 'payments')
+                    batch = []
+        if batch:
+            self._bulk(Payment, batch, 'payments')
+
+    def _payment(self, lease, due_date, rng):
+        amount = lease.unit.rent_amount
+        payment = Payment(lease=lease, owner_id=lease.owner_id, amount_due=amount, due_date=due_date)
+        roll = rng.random()
+        if due_date >= self.today:
+            payment.status = 'pending'
+        elif roll < 0.9:
+            payment.amount_paid = amount
+            payment.paid_date = due_date + timedelta(days=rng.randrange(0, 10))
+            payment.status = 'paid'
+        else:
+            if roll < 0.95:
+                payment.amount_paid = (amount / 2).quantize(Decimal('1'))
+            payment.late_fee = payment.calculate_late_fee()
+            payment.status = 'partial' if payment.amount_paid else 'overdue'
+        return payment
+
+    def _bookings(self, units):
+        # back-to-back stays from a little before today, never overlapping
+        rng, batch = self.rng, []
+        for unit in units:
+            day = self.today - timedelta(days=rng.randrange(0, 30))
+            for _ in range(self.bookings):
+                day += timedelta(days=rng.randrange(0, 10))
+                nights = rng.randrange(1, 8)
+                batch.append(Booking(unit=unit, guest_name=f'Guest {rng.randrange(1000)}',
+                                     check_in=day, check_out=day + timedelta(days=nights)))
+                day += timedelta(days=nights)
+        self._bulk(Booking, batch, 'bookings')
+
+    def _tickets(self, units, tenants, landlord):
+        rng = self.rng
+        tickets = self._bulk(MaintenanceTicket, [
+            MaintenanceTicket(unit=unit, submitted_by=tenant, owner=landlord, title=rng.choice(TICKET_TITLES),
+                              description='Reported by tenant via portal.',
+                              priority=rng.choice(['low', 'medium', 'high']),
+                              status=rng.choice(['open', 'in_progress', 'resolved', 'resolved']))
+            for unit, tenant in zip(units, tenants) for _ in range(self.tickets)
+        ], 'tickets')
+        self._bulk(TicketComment, [
+            TicketComment(ticket=ticket, author=landlord if c % 2 else ticket.submitted_by,
+                          content='Update on this ticket.')
+            for ticket in tickets for c in range(self.comments)
+        ], 'comments')
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic landlord portfolio (bulk inserts) for load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, help='Preset size; overrides the three counts below.')
+        parser.add_argument('--landlords', type=int, default=2)
+        parser.add_argument('--properties', type=int, default=5, help='Properties per landlord.')
+        parser.add_argument('--units', type=int, default=10, help='Units per property.')
+        parser.add_argument('--years', type=int, default=1, help='Years of monthly payment history.')
+        parser.add_argument('--occupancy', type=float, default=0.9)
+        parser.add_argument('--tickets', type=int, default=2, help='Tickets per occupied unit.')
+        parser.add_argument('--comments', type=int, default=2, help='Comments per ticket.')
+        parser.add_argument('--notifications', type=int, default=3, help='Notifications per user.')
+        parser.add_argument('--bookings', type=int, default=6, help='Bookings per vacant daily unit.')
+        parser.add_argument('--prefix', default='bench', help='Username/name prefix of generated rows.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help='Do not index the generated rows for search.')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete a previous portfolio with the same prefix first.')
+
+    def handle(self, *args, **opts):
+        landlords, properties, units = SCALES[opts['scale']] if opts['scale'] else (
+            opts['landlords'], opts['properties'], opts['units']
+        )
+        if opts['replace']:
+            User.objects.filter(username__startswith=f"{opts['prefix']}_").delete()
+
+        started = time.perf_counter()
+        counts = PortfolioGenerator(
+            landlords, properties, units,
+            years=opts['years'], occupancy=opts['occupancy'], tickets=opts['tickets'],
+            comments=opts['comments'], notifications=opts['notifications'], bookings=opts['bookings'],
+            prefix=opts['prefix'], seed=opts['seed'], batch_size=opts['batch_size'],
+            index_search=not opts['skip_search_index'],
+        ).run()
+        elapsed = time.perf_counter() - started
+
+        summary = ', '.join(f'{v} {k}' for k, v in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Generated {summary} in {elapsed:.1f}s.'))
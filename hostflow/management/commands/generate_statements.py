@@ -0,0 +1,45 @@
+"""
+Write monthly statements for every lease (see hostflow/statements.py).
+
+    python manage.py generate_statements                    # last month
+    python manage.py generate_statements --month 2026-09
+    python manage.py generate_statements --processes 8      # rendering pool size (default: CPU count)
+    python manage.py generate_statements --force            # replace the month's statements
+
+A run that is stopped part-way can simply be started again: leases that
+already have the month's statement are skipped.
+"""
+
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from hostflow import statements
+
+
+def billing_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"--month must look like 2026-09, not {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Generate monthly tenant statements."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=billing_month, default=None, help='Billing month, YYYY-MM (default: last month).')
+        parser.add_argument('--processes', type=int, default=None, help='Rendering processes; 0 renders in this one.')
+        parser.add_argument('--chunk-size', type=int, default=statements.CHUNK_SIZE, help='Leases loaded per round of queries.')
+        parser.add_argument('--force', action='store_true', help="Delete and regenerate the month's statements.")
+
+    def handle(self, *args, **opts):
+        month = opts['month'] or timezone.localdate().replace(day=1) - relativedelta(months=1)
+        stats = statements.generate(month, processes=opts['processes'], chunk_size=opts['chunk_size'], force=opts['force'])
+        seconds = max(stats['seconds'], 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"{month:%B %Y}: {stats['statements']} statements, {stats['lines']} payment lines in {seconds:.1f}s "
+            f"({stats['statements'] / seconds:.0f} statements/s, {(stats['statements'] + stats['lines']) / seconds:.0f} rows/s)"
+        ))
@@ -0,0 +1,35 @@
+"""
+Rebuild the full-text search index from the source tables.
+
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --owner landlord1
+
+Needed after bulk imports (bulk_create skips the signals that keep it current).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hostflow import search
+from hostflow.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the landlord-scoped search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', help='Only rebuild this landlord\'s entries (username).')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        owner = None
+        if opts['owner']:
+            owner = User.objects.filter(username=opts['owner'], role='landlord').first()
+            if owner is None:
+                raise CommandError(f"No landlord named '{opts['owner']}'.")
+        started = time.perf_counter()
+        total = search.rebuild(owner=owner, batch_size=opts['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} entries in {time.perf_counter() - started:.1f}s."
+        ))
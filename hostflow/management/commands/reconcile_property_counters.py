@@ -0,0 +1,57 @@
+"""
+Repair drift in the denormalised Property.unit_count / occupied_count.
+
+    python manage.py reconcile_property_counters
+    python manage.py reconcile_property_counters --dry-run
+
+Drift comes from writes that skip signals: bulk_create, queryset.update()
+on Unit.status, raw SQL. Counts are recomputed with one grouped query per
+batch and only the rows that differ are written.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from hostflow.models import Property
+
+
+class Command(BaseCommand):
+    help = "Recompute Property unit/occupied counters from the units table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        drifted = (
+            Property.objects.with_live_counts()
+            .filter(~Q(unit_count=F('live_unit_count')) | ~Q(occupied_count=F('live_occupied_count')))
+            .only('pk', 'unit_count', 'occupied_count').order_by('pk')
+        )
+
+        fixed, batch = 0, []
+        for prop in drifted.iterator(chunk_size=opts['batch_size']):
+            if opts['verbosity'] > 1:
+                self.stdout.write(
+                    f"Property {prop.pk}: units {prop.unit_count}→{prop.live_unit_count}, "
+                    f"occupied {prop.occupied_count}→{prop.live_occupied_count}"
+                )
+            prop.unit_count, prop.occupied_count = prop.live_unit_count, prop.live_occupied_count
+            batch.append(prop)
+            if len(batch) >= opts['batch_size']:
+                fixed += self._save(batch, opts['dry_run'])
+                batch = []
+        fixed += self._save(batch, opts['dry_run'])
+
+        verb = 'Found' if opts['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {fixed} drifted propert{'y' if fixed == 1 else 'ies'} in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            Property.objects.bulk_update(batch, ['unit_count', 'occupied_count'])
+        return len(batch)
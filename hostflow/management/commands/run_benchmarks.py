@@ -0,0 +1,301 @@
+"""
+Benchmark harness: drives the main HostFlow views through the test client.
+
+    python manage.py run_benchmarks --scale 10k --output bench/10k.json
+    python manage.py run_benchmarks --prefix bench --repeat 50 --compare bench/10k.json
+
+Latency percentiles and per-request query counts (from RequestMetricsMiddleware)
+are written as sorted, indented JSON so results from two commits diff cleanly.
+Point DATABASE_URL at a scratch database: --scale regenerates its portfolio.
+
+--explain adds each view's SELECTs with their join count and query plan
+(EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL) to the JSON, so a
+schema change can be judged by diffing plans from before and after it.
+
+HTML views also record their page weight: the HTML, plus what a browser
+with an empty cache fetches for it – the stylesheets and scripts it links
+and the web fonts those stylesheets use, sized as WhiteNoise serves them
+(Brotli, else gzip). Assets on other hosts are only counted, not sized.
+"""
+
+import json
+import os
+import posixpath
+import re
+import resource
+import subprocess
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from whitenoise.compress import Compressor, brotli_installed
+
+from hostflow.models import User, Unit, Payment, MaintenanceTicket
+
+# name → (role, url name, what the request needs: None, an object argument ('ticket'),
+#         a query string ('stay') or a POST body ('otp', 'login', 'login_unthrottled'))
+SCENARIOS = {
+    'dashboard': ('landlord', 'dashboard', None),
+    'property_list': ('landlord', 'property_list', None),
+    'lease_list': ('landlord', 'lease_list', None),
+    'payment_list': ('landlord', 'payment_list', None),
+    'reports': ('landlord', 'reports', None),
+    'export_csv': ('landlord', 'export_csv', None),
+    'ticket_list': ('landlord', 'ticket_list', None),
+    'ticket_detail': ('landlord', 'ticket_detail', 'ticket'),
+    'tenant_portal': ('tenant', 'tenant_portal', None),
+    'availability_api': ('landlord', 'availability_api', 'stay'),
+    'availability_calendar': ('landlord', 'availability_calendar_api', None),
+    # one abusive client hammering the unauthenticated OTP endpoints
+    'otp_flood': ('anonymous', 'send_email_otp', 'otp'),
+    'otp_guess': ('anonymous', 'verify_email_otp', 'otp'),
+    # password guessing against one landlord, with and without login throttling
+    'login_guess': ('anonymous', 'login', 'login'),
+    'login_guess_unthrottled': ('anonymous', 'login', 'login_unthrottled'),
+}
+ABUSER_IP = '203.0.113.7'
+ASSET_RE = re.compile(r'<(?:link|script)\b[^>]*?\b(?:href|src)="([^"]+)"')
+FONT_RE = re.compile(r'url\(["\']?([^"\')]+\.woff2)')
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def max_rss_mb():
+    """Peak resident memory of this process so far (ru_maxrss is KiB on Linux)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def served_size(name):
+    """Bytes WhiteNoise sends for static file `name` (compressed where it would compress)."""
+    path = staticfiles_storage.path(name)
+    if not os.path.exists(path):
+        path = finders.find(name)
+    for suffix in ('.br', '.gz'):
+        if os.path.exists(path + suffix):
+            return os.path.getsize(path + suffix), path
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if Compressor(quiet=True).should_compress(path):
+        data = (Compressor.compress_brotli if brotli_installed else Compressor.compress_gzip)(data)
+    return len(data), path
+
+
+def page_weight(html):
+    """HTML bytes and cold-cache asset bytes for one rendered page."""
+    weight = {'html_bytes': len(html.encode()), 'asset_bytes': 0, 'assets': 0, 'external_assets': 0}
+    pending = ASSET_RE.findall(html)
+    seen = set()
+    while pending:
+        url = pending.pop().split('?')[0].split('#')[0]
+        if not url.startswith(settings.STATIC_URL):
+            weight['external_assets'] += url.startswith(('http:', 'https:', '//'))
+            continue
+        name = url[len(settings.STATIC_URL):]
+        if name in seen:
+            continue
+        seen.add(name)
+        size, path = served_size(name)
+        weight['asset_bytes'] += size
+        weight['assets'] += 1
+        if name.endswith('.css'):
+            with open(path, encoding='utf-8') as fh:
+                fonts = FONT_RE.findall(fh.read())
+            pending += [settings.STATIC_URL + posixpath.normpath(posixpath.join(posixpath.dirname(name), font))
+                        for font in fonts if '://' not in font]
+    return weight
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark HostFlow views (latency percentiles + query counts) and write JSON results."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=['1k', '10k', '100k'],
+                            help='Regenerate a portfolio of this size before benchmarking.')
+        parser.add_argument('--prefix', default='bench', help='Prefix of the generated portfolio to drive.')
+        parser.add_argument('--views', default=','.join(SCENARIOS), help='Comma-separated scenario names.')
+        parser.add_argument('--repeat', type=int, default=20, help='Measured requests per view.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per view.')
+        parser.add_argument('--sample', type=int, default=3, help='Landlords/tenants to rotate through.')
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--compare', help='Previous results JSON to print deltas against.')
+        parser.add_argument('--explain', action='store_true',
+                            help='Record the SQL, join count and query plan of every SELECT per view.')
+
+    def handle(self, *args, **opts):
+        unknown = set(opts['views'].split(',')) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown views: {', '.join(sorted(unknown))}")
+        if opts['scale']:
+            call_command('generate_portfolio', scale=opts['scale'], prefix=opts['prefix'],
+                         replace=True, stdout=self.stdout)
+
+        prefix = f"{opts['prefix']}_"
+        landlords = list(User.objects.filter(role='landlord', username__startswith=prefix)
+                         .order_by('pk')[:opts['sample']])
+        if not landlords:
+            raise CommandError(f"No landlords named '{prefix}*'; run generate_portfolio or pass --scale.")
+        tenants = list(User.objects.filter(role='tenant', leases__owner__in=landlords,
+                                           leases__status='active').order_by('pk')[:opts['sample']])
+
+        results = {}
+        for name in opts['views'].split(','):
+            results[name] = self._run(name, landlords, tenants, opts['repeat'], opts['warmup'], opts['explain'])
+            result = results[name]
+            self.stdout.write(f"{name:<24} p50 {result['p50_ms']:>8} ms   "
+                              f"p99 {result['p99_ms']:>8} ms   queries {result['queries_max']}   "
+                              f"{result['requests_per_s']:>8} req/s"
+                              + (f"   page {result['html_bytes'] / 1024:.1f} KB + {result['asset_bytes'] / 1024:.1f} KB "
+                                 f"assets ({result['external_assets']} external)" if 'html_bytes' in result else ''))
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'database': connection.vendor,
+                'settings': getattr(settings, 'ENVIRONMENT', None),
+                'debug': settings.DEBUG,
+                'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE', 0),
+                'max_rss_mb': max_rss_mb(),
+                'scale': opts['scale'],
+                'prefix': opts['prefix'],
+                'units': Unit.objects.filter(property__owner__username__startswith=prefix).count(),
+                'payments': Payment.objects.filter(owner__username__startswith=prefix).count(),
+                'repeat': opts['repeat'],
+                'generated_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            },
+            'views': results,
+        }
+        with open(opts['output'], 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
+
+        if opts['compare']:
+            self._compare(opts['compare'], results)
+
+    def _run(self, name, landlords, tenants, repeat, warmup, explain=False):
+        # benchmarks must never mail real people
+        overrides = {'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend'}
+        if SCENARIOS[name][2] == 'login_unthrottled':
+            overrides['LOGIN_THROTTLE_ENABLED'] = False
+        with override_settings(**overrides):
+            return self._measure(name, landlords, tenants, repeat, warmup, explain)
+
+    def _measure(self, name, landlords, tenants, repeat, warmup, explain):
+        role, url_name, needs = SCENARIOS[name]
+        users = {'landlord': landlords, 'tenant': tenants, 'anonymous': [None]}[role]
+        if not users:
+            raise CommandError(f"No {role}s available for '{name}'.")
+
+        clients = []
+        for user in users:
+            if user is None:
+                clients.append((Client(REMOTE_ADDR=ABUSER_IP), reverse(url_name)))
+                continue
+            client = Client()
+            client.force_login(user)
+            args = []
+            if needs == 'ticket':
+                ticket = MaintenanceTicket.objects.filter(owner=user).order_by('pk').first()
+                if ticket is None:
+                    continue
+                args = [ticket.pk]
+            url = reverse(url_name, args=args)
+            if needs == 'stay':
+                check_in = date.today() + timedelta(days=3)
+                url += f'?check_in={check_in}&check_out={check_in + timedelta(days=4)}'
+            clients.append((client, url))
+
+        def request(client, url):
+            if needs == 'otp':
+                body = json.dumps({'email': 'flood@example.com', 'otp': '000000'})
+                return client.post(url, body, content_type='application/json')
+            if needs in ('login', 'login_unthrottled'):
+                return client.post(url, {'username': landlords[0].username, 'password': 'not-the-password'})
+            return client.get(url)
+
+        latencies, queries, statuses, weight = [], [], set(), None
+        for i in range(warmup + repeat):
+            client, url = clients[i % len(clients)]
+            started = time.perf_counter()
+            response = request(client, url)
+            elapsed = (time.perf_counter() - started) * 1000
+            if i < warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(response.wsgi_request.metrics.queries)
+            statuses.add(response.status_code)
+            if weight is None and response.get('Content-Type', '').startswith('text/html'):
+                weight = page_weight(response.content.decode())
+
+        result = {
+            'requests': repeat,
+            'status': sorted(statuses),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'requests_per_s': round(1000 * len(latencies) / sum(latencies), 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p90_ms': round(percentile(latencies, 90), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+            'max_rss_mb': max_rss_mb(),
+        }
+        if weight:
+            result.update(weight)
+        if explain:
+            client, url = clients[0]
+            with CaptureQueriesContext(connection) as captured:
+                request(client, url)
+            result['plans'] = [self._explain(q['sql']) for q in captured.captured_queries
+                               if q['sql'].lstrip().upper().startswith('SELECT')]
+            result['joins'] = sum(plan['joins'] for plan in result['plans'])
+        return result
+
+    def _explain(self, sql):
+        prefix = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}.get(connection.vendor)
+        plan = []
+        if prefix:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+        return {'sql': sql, 'joins': sql.upper().count(' JOIN '), 'plan': plan}
+
+    def _compare(self, path, results):
+        with open(path) as fh:
+            baseline = json.load(fh)['views']
+        self.stdout.write(f"\nChange vs {path}:")
+        for name, now in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            self.stdout.write(
+                f"{name:<24} p50 {now['p50_ms'] - before['p50_ms']:+9.2f} ms   "
+                f"p99 {now['p99_ms'] - before['p99_ms']:+9.2f} ms   "
+                f"queries {now['queries_max'] - before['queries_max']:+d}"
+                + (f"   joins {now['joins'] - before['joins']:+d}" if 'joins' in now and 'joins' in before else '')
+                + (f"   page {(now['html_bytes'] - before['html_bytes']) / 1024:+.1f} KB"
+                   f" + {(now['asset_bytes'] - before['asset_bytes']) / 1024:+.1f} KB assets"
+                   if 'html_bytes' in now and 'html_bytes' in before else '')
+            )
@@ -0,0 +1,52 @@
+"""
+Work through queued property / landlord deletions.
+
+    python manage.py run_deletion_jobs              # drain the queue and exit
+    python manage.py run_deletion_jobs --loop       # keep polling (run under a supervisor)
+    python manage.py run_deletion_jobs --pause 0.05 # breathe between chunks on a busy database
+
+Each chunk is its own short transaction, so the job can be stopped at any
+point; a job left 'running' by a killed worker is picked up again with
+--retry-stale.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostflow import deletion
+from hostflow.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = "Run pending background deletion jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=deletion.CHUNK_SIZE, help='Rows per DELETE.')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between chunks.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs.')
+        parser.add_argument('--poll-interval', type=float, default=5)
+        parser.add_argument('--retry-stale', action='store_true',
+                            help="Requeue jobs left 'running' or 'failed' before starting.")
+
+    def handle(self, *args, **opts):
+        if opts['retry_stale']:
+            requeued = DeletionJob.objects.filter(status__in=['running', 'failed']).update(status='pending')
+            self.stdout.write(f"Requeued {requeued} job(s).")
+
+        while True:
+            job = deletion.claim_next()
+            if job is None:
+                if not opts['loop']:
+                    break
+                time.sleep(opts['poll_interval'])
+                continue
+
+            started = time.perf_counter()
+            job = deletion.run_job(job, chunk_size=opts['chunk_size'], pause=opts['pause'])
+            elapsed = time.perf_counter() - started
+            message = f"{job}: {job.deleted_rows} rows in {elapsed:.1f}s ({job.deleted_rows / max(elapsed, 1e-6):.0f} rows/s)"
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stderr.write(self.style.ERROR(f"{message}: {job.error}"))
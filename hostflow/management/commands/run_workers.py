@@ -0,0 +1,84 @@
+"""
+Run background tasks (see hostflow/tasks.py).
+
+    python manage.py run_workers                         # one worker, forever (run under a supervisor)
+    python manage.py run_workers --processes 4           # four forked workers
+    python manage.py run_workers --queues mail --burst   # drain the mail queue and exit
+    python manage.py run_workers --retry-dead            # requeue dead tasks first
+
+SIGTERM / Ctrl-C lets every worker finish the task in hand and hands the
+rest of its batch back to the queue. With --burst each worker reports its
+throughput on exit.
+"""
+
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from hostflow.models import Task
+from hostflow.tasks import Worker
+
+
+def _work(options, results):
+    worker = Worker(queues=options['queues'], batch_size=options['batch_size'],
+                    poll_interval=options['poll_interval'])
+    worker.handle_signals()
+    started = time.perf_counter()
+    try:
+        worker.run(burst=options['burst'])
+    finally:
+        results.put((worker.name, worker.done, worker.failed, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to fork.')
+        parser.add_argument('--queues', type=lambda value: value.split(','), default=None,
+                            help='Comma-separated queues to serve (default: all).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Tasks claimed at once (TASK_BATCH_SIZE).')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--burst', action='store_true', help='Exit once nothing is due.')
+        parser.add_argument('--retry-dead', action='store_true', help='Requeue dead tasks before starting.')
+
+    def handle(self, *args, **opts):
+        if opts['retry_dead']:
+            requeued = Task.objects.filter(status='dead').update(
+                status='pending', attempts=0, run_at=timezone.now(), last_error=''
+            )
+            self.stdout.write(f"Requeued {requeued} task(s).")
+
+        # forked children must open their own connections, not share the parent's socket
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        children = [context.Process(target=_work, args=(opts, results), daemon=True) for _ in range(opts['processes'])]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: finish the current task, then exit
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the children get Ctrl-C themselves
+
+        reports = [results.get() for _ in children]
+        for child in children:
+            child.join()
+
+        total_done = total_seconds = 0
+        for name, done, failed, seconds in reports:
+            total_done += done
+            total_seconds = max(total_seconds, seconds)
+            self.stdout.write(f"{name}: {done} done, {failed} failed in {seconds:.1f}s "
+                              f"({done / max(seconds, 1e-6):.1f} tasks/s)")
+        if len(reports) > 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"{total_done} tasks in {total_seconds:.1f}s ({total_done / max(total_seconds, 1e-6):.1f} tasks/s)"
+            ))
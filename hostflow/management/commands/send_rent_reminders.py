@@ -0,0 +1,38 @@
+"""
+Queue rent reminders for unpaid rent (see hostflow/notify.py).
+
+    python manage.py send_rent_reminders            # rent due in the next 5 days
+    python manage.py send_rent_reminders --days 0   # rent due today
+    python manage.py send_rent_reminders --overdue  # and everything already late
+
+Only the batches are queued here; ``run_workers`` sends them. Each payment
+is reminded once per channel, so running this daily is safe.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hostflow import notify
+from hostflow.models import Payment
+
+
+class Command(BaseCommand):
+    help = "Queue reminders for rent falling due."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=5, help='Remind about rent due within this many days.')
+        parser.add_argument('--overdue', action='store_true', help='Include rent that is already past due.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Reminders per task (NOTIFY_BATCH_SIZE).')
+
+    def handle(self, *args, **opts):
+        today = timezone.localdate()
+        payments = Payment.all_objects.filter(
+            status__in=notify.UNPAID, due_date__lte=today + timedelta(days=opts['days']),
+            lease__unit__property__deleted_at__isnull=True,
+        )
+        if not opts['overdue']:
+            payments = payments.filter(due_date__gte=today)
+        batches = notify.queue_rent_reminders(payments, opts['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Queued {batches} reminder batch(es)."))
@@ -0,0 +1,198 @@
+"""
+HostFlow Protected Media
+────────────────────────
+Lease documents, ticket photos and statements are private. Nothing serves
+MEDIA_ROOT directly; every file goes through ``views.protected_media``
+(``/media/<name>``), which checks access and then gets out of the way:
+
+* ``ProtectedMediaStorage`` (DEFAULT_FILE_STORAGE) makes ``FieldFile.url``
+  a short-lived signed link, ``/media/<name>?exp=…&sig=…``. Pages only
+  render links to files their viewer may see, so a valid signature *is* the
+  access check – one HMAC, no session or database lookup. The expiry is
+  rounded up to a MEDIA_URL_MAX_AGE boundary, so a page keeps producing the
+  same URL for a while and the browser can cache the file under it.
+* Without a valid signature the session decides: the file must belong to a
+  lease, statement or ticket the user owns, rents or reported.
+* The transfer itself is handed to the front proxy when MEDIA_SERVER names
+  one – ``X-Accel-Redirect`` to the internal MEDIA_ACCEL_PREFIX location
+  (nginx) or ``X-Sendfile`` with the absolute path (Apache, lighttpd) – so
+  the worker's cost does not depend on the file size. Without a proxy it is
+  a FileResponse (sendfile() under gunicorn), or a 206 for a single
+  ``Range`` so PDF viewers and seeking do not fetch the whole file.
+
+Ticket photos arrive straight from phones: several megabytes, rotated by an
+EXIF tag and often carrying the GPS position of the tenant's home. After
+the upload, ``process_ticket_image`` (the 'images' task queue) turns them
+upright, drops the metadata and scales them to TICKET_IMAGE_MAX_SIZE.
+
+nginx needs a matching internal location::
+
+    location /protected-media/ { internal; alias /srv/hostflow/media/; }
+"""
+
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare, salted_hmac
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Lease, MaintenanceTicket, Statement
+from .tasks import task
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# raster images and PDFs only: an SVG is an image/ type too, but runs script when opened
+INLINE_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'application/pdf'}
+REWRITABLE_IMAGES = {'JPEG': {'quality': 85, 'optimize': True}, 'PNG': {'optimize': True}, 'WEBP': {'quality': 85}}
+
+# upload prefix → (unscoped manager, file field, users who may see it)
+PROTECTED = {
+    'leases/': (Lease.all_objects, 'document', ('owner', 'tenant')),
+    'tickets/': (MaintenanceTicket.all_objects, 'image', ('owner', 'submitted_by')),
+    'statements/': (Statement.objects, 'file', ('lease__owner', 'lease__tenant')),
+}
+
+
+# ── Signed URLs ────────────────────────────────────────────────────────────────
+
+def _signature(name, expires):
+    return salted_hmac('hostflow.media', f'{name}:{expires}').hexdigest()[:32]
+
+
+def signed_url(name, now=None):
+    period = settings.MEDIA_URL_MAX_AGE
+    expires = (int(now or time.time()) // period + 2) * period
+    query = urlencode({'exp': expires, 'sig': _signature(name, expires)})
+    return f"{reverse('protected_media', args=[name])}?{query}"
+
+
+def check_signature(name, expires, signature):
+    """Seconds the link stays valid for, or 0 if it is unsigned, forged or expired."""
+    if not expires.isdigit() or not constant_time_compare(signature, _signature(name, expires)):
+        return 0
+    return max(int(expires) - int(time.time()), 0)
+
+
+class ProtectedMediaStorage(FileSystemStorage):
+    def url(self, name):
+        return signed_url(name)
+
+
+# ── Access ─────────────────────────────────────────────────────────────────────
+
+def can_access(user, name):
+    if user.is_superuser:
+        return True
+    for prefix, (manager, field, parties) in PROTECTED.items():
+        if name.startswith(prefix):
+            allowed = Q()
+            for party in parties:
+                allowed |= Q(**{party: user})
+            return manager.filter(allowed, **{field: name}).exists()
+    return False
+
+
+# ── Serving ────────────────────────────────────────────────────────────────────
+
+def _byte_range(header, size):
+    """(start, end) for a single ``bytes=`` range, None to send it all, ValueError if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, content_type):
+    size = os.path.getsize(path)
+    try:
+        byte_range = _byte_range(request.headers.get('Range', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    response = StreamingHttpResponse(_read(path, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def serve(request, name, max_age=0):
+    """Send media file `name`, through the proxy when there is one."""
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    server = settings.MEDIA_SERVER
+    if server == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif server == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _file_response(request, path, content_type)
+
+    # anything else (say, an uploaded .html or .svg) is downloaded, never rendered on our origin
+    disposition = 'inline' if content_type in INLINE_TYPES else 'attachment'
+    response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(os.path.basename(name))}"
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, private=True, max_age=max_age)
+    return response
+
+
+# ── Ticket photos ──────────────────────────────────────────────────────────────
+
+@task(queue='images')
+def process_ticket_image(ticket_id):
+    ticket = MaintenanceTicket.all_objects.filter(pk=ticket_id).only('image').first()
+    if ticket is None or not ticket.image:
+        return
+    path, limit = ticket.image.path, settings.TICKET_IMAGE_MAX_SIZE
+    try:
+        with Image.open(path) as original:
+            options = REWRITABLE_IMAGES.get(original.format)
+            if options is None or (max(original.size) <= limit and not original.getexif()):
+                return
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((limit, limit))
+            # written beside the original and swapped in, so readers never see half a file
+            image.save(path + '.tmp', format=original.format, **options)
+    except (FileNotFoundError, UnidentifiedImageError):
+        return  # replaced or removed since; nothing to do
+    os.replace(path + '.tmp', path)
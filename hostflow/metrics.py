@@ -0,0 +1,195 @@
+"""
+HostFlow Request Metrics
+────────────────────────
+Per-view query count, DB time, template render time and total latency.
+
+RequestMetricsMiddleware opens a RequestMetrics for every request, counts
+SQL through ``connection.execute_wrapper`` and folds the result into the
+process-wide ``registry``, which the /metrics/ view renders in Prometheus
+text format. Views declare how many queries they may spend with
+``@query_budget(n)``; going over it is logged and fails the budget tests.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('hostflow.metrics')
+
+_current = ContextVar('hostflow_request_metrics', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# ── Per-request collection ─────────────────────────────────────────────────────
+
+class RequestMetrics:
+    """Counters for a single request; filled in by the wrappers below."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+
+
+def current_metrics():
+    """RequestMetrics of the request being served, or None outside one."""
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook that charges SQL to a RequestMetrics."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.queries += 1
+            self.metrics.db_time += time.perf_counter() - start
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose top-level renders are timed per request."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+# ── Budgets ────────────────────────────────────────────────────────────────────
+
+def query_budget(max_queries):
+    """Declare the most SQL queries a view may issue, auth/session included."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func):
+    return getattr(view_func, 'query_budget', None)
+
+
+# ── Aggregation & export ───────────────────────────────────────────────────────
+
+class _ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.budget_exceeded = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    """Process-local totals per URL name. Each gunicorn worker keeps its own."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, metrics, status_code, budget=None):
+        with self._lock:
+            stats = self._views.setdefault(view, _ViewStats())
+            stats.requests += 1
+            stats.errors += status_code >= 500
+            stats.queries += metrics.queries
+            stats.db_time += metrics.db_time
+            stats.template_time += metrics.template_time
+            stats.total_time += metrics.total_time
+            if budget is not None and metrics.queries > budget:
+                stats.budget_exceeded += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if metrics.total_time <= bound:
+                    stats.buckets[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {view: vars(stats).copy() for view, stats in self._views.items()}
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, attr):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for view, stats in sorted(snapshot.items()):
+                lines.append(f'{name}{{view="{view}"}} {stats[attr]}')
+
+        family('hostflow_requests_total', 'counter', 'Requests served.', 'requests')
+        family('hostflow_request_errors_total', 'counter', 'Requests that returned 5xx.', 'errors')
+        family('hostflow_db_queries_total', 'counter', 'SQL queries executed.', 'queries')
+        family('hostflow_db_seconds_total', 'counter', 'Time spent in SQL.', 'db_time')
+        family('hostflow_template_seconds_total', 'counter', 'Time spent rendering templates.', 'template_time')
+        family('hostflow_query_budget_exceeded_total', 'counter', 'Requests over their query budget.', 'budget_exceeded')
+
+        lines.append('# HELP hostflow_request_duration_seconds Total request latency.')
+        lines.append('# TYPE hostflow_request_duration_seconds histogram')
+        for view, stats in sorted(snapshot.items()):
+            for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+                lines.append(f'hostflow_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(f'hostflow_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats["requests"]}')
+            lines.append(f'hostflow_request_duration_seconds_sum{{view="{view}"}} {stats["total_time"]}')
+            lines.append(f'hostflow_request_duration_seconds_count{{view="{view}"}} {stats["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def log_request(view, metrics, status_code, budget=None):
+    """Emit one structured (JSON) log line per request."""
+    record = {
+        'view': view,
+        'status': status_code,
+        'queries': metrics.queries,
+        'db_ms': round(metrics.db_time * 1000, 2),
+        'template_ms': round(metrics.template_time * 1000, 2),
+        'total_ms': round(metrics.total_time * 1000, 2),
+    }
+    if budget is not None and metrics.queries > budget:
+        record['query_budget'] = budget
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
@@ -2,9 +2,42 @@
 Tenant Isolation Middleware
 ───────────────────────────
 Attaches the current landlord to the request so views can
-filter querysets without repeating the FK check everywhere.
+filter querysets without repeating the FK check everywhere, and
+scopes the default managers of Lease, Payment and MaintenanceTicket
+to that landlord until the response is returned. Staff are never scoped:
+the admin builds its changelists on those managers, and a superuser
+(role 'landlord' by default) must see every landlord's rows there.
+
+Request Metrics Middleware
+──────────────────────────
+Counts SQL queries and DB time on every configured connection, plus
+template and total time, and records them against the URL name.
+Keep it first in MIDDLEWARE so session/auth queries are charged too.
+
+API Token Middleware
+────────────────────
+Authenticates /api/ requests by their bearer token alone (see
+hostflow/api.py). The session cookie is never read for them, so an API
+call costs no session lookup. Sits right after AuthenticationMiddleware,
+before anything touches request.user.
+
+Replica Pin Middleware
+──────────────────────
+Notes whether a request wrote to the primary and, if it did, pins the user
+to the primary for REPLICA_STICKY_SECONDS (see hostflow/routing.py).
+Only active when DATABASE_REPLICA_URLS configures replicas.
 """
 
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+
+from . import api, metrics, routing
+from .models import landlord_scope
+
 
 class TenantIsolationMiddleware:
     def __init__(self, get_response):
@@ -22,5 +55,60 @@ class TenantIsolationMiddleware:
         else:
             request.landlord = None
 
-        response = self.get_response(request)
+        # ... and scope Lease/Payment/MaintenanceTicket.objects to it
+        staff = request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
+        with landlord_scope(None if staff else request.landlord):
+            response = self.get_response(request)
+        return response
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.RequestMetrics()
+        request.metrics = stats
+        token = metrics.activate(stats)
+        try:
+            with ExitStack() as stack:
+                for alias in settings.DATABASES:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.QueryCounter(stats)))
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        stats.total_time = time.perf_counter() - stats.started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        budget = metrics.get_query_budget(match.func) if match else None
+        metrics.registry.observe(view, stats, response.status_code, budget)
+        metrics.log_request(view, stats, response.status_code, budget)
+        return response
+
+
+class ApiTokenMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path_info.startswith('/api/'):
+            request.user = api.user_for(request) or AnonymousUser()
+        return self.get_response(request)
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        record, token = routing.track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            routing.stop_tracking(token)
+        if record['wrote'] and request.user.is_authenticated:
+            routing.pin_to_primary(request.user.pk)
         return response
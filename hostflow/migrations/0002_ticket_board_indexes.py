@@ -0,0 +1,21 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenanceticket',
+            index=models.Index(fields=['unit', 'status', 'created_at'], name='ticket_unit_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketcomment',
+            index=models.Index(fields=['ticket', 'created_at'], name='comment_ticket_created'),
+        ),
+    ]
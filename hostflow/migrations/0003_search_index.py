@@ -0,0 +1,99 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The full-text index lives outside the ORM: a tsvector column + GIN index
+# kept by a trigger on PostgreSQL, an FTS5 external-content table kept by
+# triggers on SQLite. Other backends fall back to icontains in search.py.
+
+SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE hostflow_searchentry_fts USING fts5(
+        keywords, terms, content='hostflow_searchentry', content_rowid='id'
+    )""",
+    """CREATE TRIGGER hostflow_searchentry_ai AFTER INSERT ON hostflow_searchentry BEGIN
+        INSERT INTO hostflow_searchentry_fts(rowid, keywords, terms) VALUES (new.id, new.keywords, new.terms);
+    END""",
+    """CREATE TRIGGER hostflow_searchentry_ad AFTER DELETE ON hostflow_searchentry BEGIN
+        INSERT INTO hostflow_searchentry_fts(hostflow_searchentry_fts, rowid, keywords, terms)
+        VALUES ('delete', old.id, old.keywords, old.terms);
+    END""",
+    """CREATE TRIGGER hostflow_searchentry_au AFTER UPDATE ON hostflow_searchentry BEGIN
+        INSERT INTO hostflow_searchentry_fts(hostflow_searchentry_fts, rowid, keywords, terms)
+        VALUES ('delete', old.id, old.keywords, old.terms);
+        INSERT INTO hostflow_searchentry_fts(rowid, keywords, terms) VALUES (new.id, new.keywords, new.terms);
+    END""",
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS hostflow_searchentry_au",
+    "DROP TRIGGER IF EXISTS hostflow_searchentry_ad",
+    "DROP TRIGGER IF EXISTS hostflow_searchentry_ai",
+    "DROP TABLE IF EXISTS hostflow_searchentry_fts",
+]
+
+POSTGRES_SETUP = [
+    "ALTER TABLE hostflow_searchentry ADD COLUMN search_vector tsvector",
+    "CREATE INDEX hostflow_searchentry_vector_gin ON hostflow_searchentry USING GIN (search_vector)",
+    """CREATE FUNCTION hostflow_searchentry_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.keywords, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.terms, '')), 'B');
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER hostflow_searchentry_vector_trg
+    BEFORE INSERT OR UPDATE OF keywords, terms ON hostflow_searchentry
+    FOR EACH ROW EXECUTE FUNCTION hostflow_searchentry_vector()""",
+]
+POSTGRES_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS hostflow_searchentry_vector_trg ON hostflow_searchentry",
+    "DROP FUNCTION IF EXISTS hostflow_searchentry_vector()",
+    "DROP INDEX IF EXISTS hostflow_searchentry_vector_gin",
+    "ALTER TABLE hostflow_searchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install_fulltext(apps, schema_editor):
+    statements = {'sqlite': SQLITE_SETUP, 'postgresql': POSTGRES_SETUP}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_fulltext(apps, schema_editor):
+    statements = {'sqlite': SQLITE_TEARDOWN, 'postgresql': POSTGRES_TEARDOWN}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0002_ticket_board_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tenant', 'Tenant'), ('property', 'Property'), ('unit', 'Unit'), ('ticket', 'Ticket'), ('payment', 'Payment')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.TextField()),
+                ('subtitle', models.TextField(blank=True)),
+                ('keywords', models.TextField(blank=True)),
+                ('terms', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'kind'], name='search_owner_kind')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id', 'owner'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(install_fulltext, uninstall_fulltext),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    # one UPDATE with correlated COUNT subqueries, whatever the table size
+    Property = apps.get_model('hostflow', 'Property')
+    Unit = apps.get_model('hostflow', 'Unit')
+
+    def count(units):
+        counted = units.filter(property=OuterRef('pk')).order_by().values('property').annotate(n=Count('pk'))
+        return Coalesce(Subquery(counted.values('n'), output_field=IntegerField()), Value(0))
+
+    Property.objects.update(
+        unit_count=count(Unit.objects.all()),
+        occupied_count=count(Unit.objects.filter(status='occupied')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='occupied_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='unit_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Booked nights are interval-indexed outside the ORM and overlaps are refused
+# by the database itself:
+# PostgreSQL – a generated ``stay daterange`` column under a GiST exclusion
+#              constraint (btree_gist supplies ``unit_id WITH =``).
+# SQLite     – an R*Tree (1-D interval tree per unit) of [first, last] night
+#              as Julian day numbers, kept by triggers, with BEFORE triggers
+#              that abort overlapping writes.
+# Cancelled bookings are left out of both.
+
+NIGHT = "CAST(julianday({}) AS INTEGER)"
+OVERLAP_CHECK = f"""SELECT RAISE(ABORT, 'booking_no_overlap') WHERE EXISTS (
+        SELECT 1 FROM hostflow_booking_rtree
+        WHERE unit_lo <= NEW.unit_id AND unit_hi >= NEW.unit_id
+          AND first_night <= {NIGHT.format('NEW.check_out')} - 1
+          AND last_night >= {NIGHT.format('NEW.check_in')}
+          {{extra}}
+    );"""
+RTREE_ROW = f"NEW.id, NEW.unit_id, NEW.unit_id, {NIGHT.format('NEW.check_in')}, {NIGHT.format('NEW.check_out')} - 1"
+
+SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE hostflow_booking_rtree USING rtree_i32(id, unit_lo, unit_hi, first_night, last_night)",
+    f"""CREATE TRIGGER hostflow_booking_overlap_bi BEFORE INSERT ON hostflow_booking
+    WHEN NEW.status <> 'cancelled' BEGIN
+        {OVERLAP_CHECK.format(extra='')}
+    END""",
+    f"""CREATE TRIGGER hostflow_booking_overlap_bu
+    BEFORE UPDATE OF unit_id, check_in, check_out, status ON hostflow_booking
+    WHEN NEW.status <> 'cancelled' BEGIN
+        {OVERLAP_CHECK.format(extra='AND id <> NEW.id')}
+    END""",
+    f"""CREATE TRIGGER hostflow_booking_ai AFTER INSERT ON hostflow_booking
+    WHEN NEW.status <> 'cancelled' BEGIN
+        INSERT INTO hostflow_booking_rtree VALUES ({RTREE_ROW});
+    END""",
+    f"""CREATE TRIGGER hostflow_booking_au AFTER UPDATE ON hostflow_booking BEGIN
+        DELETE FROM hostflow_booking_rtree WHERE id = OLD.id;
+        INSERT INTO hostflow_booking_rtree SELECT {RTREE_ROW} WHERE NEW.status <> 'cancelled';
+    END""",
+    """CREATE TRIGGER hostflow_booking_ad AFTER DELETE ON hostflow_booking BEGIN
+        DELETE FROM hostflow_booking_rtree WHERE id = OLD.id;
+    END""",
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS hostflow_booking_ad",
+    "DROP TRIGGER IF EXISTS hostflow_booking_au",
+    "DROP TRIGGER IF EXISTS hostflow_booking_ai",
+    "DROP TRIGGER IF EXISTS hostflow_booking_overlap_bu",
+    "DROP TRIGGER IF EXISTS hostflow_booking_overlap_bi",
+    "DROP TABLE IF EXISTS hostflow_booking_rtree",
+]
+
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """ALTER TABLE hostflow_booking ADD COLUMN stay daterange
+    GENERATED ALWAYS AS (daterange(check_in, check_out, '[)')) STORED""",
+    """ALTER TABLE hostflow_booking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (unit_id WITH =, stay WITH &&) WHERE (status <> 'cancelled')""",
+]
+POSTGRES_TEARDOWN = [
+    "ALTER TABLE hostflow_booking DROP CONSTRAINT IF EXISTS booking_no_overlap",
+    "ALTER TABLE hostflow_booking DROP COLUMN IF EXISTS stay",
+]
+
+
+def install_interval_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_SETUP, 'postgresql': POSTGRES_SETUP}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_interval_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_TEARDOWN, 'postgresql': POSTGRES_TEARDOWN}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0004_property_unit_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('guest_name', models.CharField(blank=True, max_length=150)),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('blocked', 'Blocked by owner'), ('cancelled', 'Cancelled')], default='confirmed', max_length=10)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('guest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='hostflow.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['unit', 'check_in', 'check_out'], name='booking_unit_dates')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(check=models.Q(('check_out__gt', models.F('check_in'))), name='booking_checkout_after_checkin'),
+        ),
+        migrations.RunPython(install_interval_index, uninstall_interval_index),
+    ]
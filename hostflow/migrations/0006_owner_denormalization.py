@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+# Copies the landlord of each row's unit onto Lease, MaintenanceTicket and
+# Payment (in that order: payments take it from their lease). Runs outside
+# one big transaction, BATCH_SIZE primary keys at a time, so large tables
+# are never locked for the whole backfill.
+
+BATCH_SIZE = 5000
+
+
+def _backfill(model, owner):
+    rows = model.objects.filter(owner__isnull=True).order_by()
+    bounds = rows.aggregate(lo=models.Min('pk'), hi=models.Max('pk'))
+    if bounds['lo'] is None:
+        return
+    for start in range(bounds['lo'], bounds['hi'] + 1, BATCH_SIZE):
+        with transaction.atomic():
+            rows.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(owner=owner)
+
+
+def backfill_owner(apps, schema_editor):
+    Unit = apps.get_model('hostflow', 'Unit')
+    Lease = apps.get_model('hostflow', 'Lease')
+    Payment = apps.get_model('hostflow', 'Payment')
+    MaintenanceTicket = apps.get_model('hostflow', 'MaintenanceTicket')
+
+    unit_owner = Subquery(Unit.objects.filter(pk=OuterRef('unit_id')).values('property__owner_id')[:1])
+    _backfill(Lease, unit_owner)
+    _backfill(MaintenanceTicket, unit_owner)
+    _backfill(Payment, Subquery(Lease.objects.filter(pk=OuterRef('lease_id')).values('owner_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('hostflow', '0005_bookings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lease',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='maintenanceticket',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0006_owner_denormalization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lease',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='maintenanceticket',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['owner', 'status', 'end_date'], name='lease_owner_status_end'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenanceticket',
+            index=models.Index(fields=['owner', 'status', 'created_at'], name='ticket_owner_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', 'due_date'], name='payment_owner_due'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', 'status', 'paid_date'], name='payment_owner_status_paid'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0007_owner_not_null_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='created_by',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_users', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone'], name='user_phone'),
+        ),
+    ]
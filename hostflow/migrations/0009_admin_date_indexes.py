@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0008_tenant_autocomplete'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['created_at'], name='auditlog_created'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notification_created'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['due_date'], name='payment_due'),
+        ),
+    ]
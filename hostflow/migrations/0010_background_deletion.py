@@ -0,0 +1,41 @@
+# Generated by Django 4.2.28 on 2026-10-19 17:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0009_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('property', 'Property'), ('landlord', 'Landlord')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('label', models.CharField(max_length=200)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('step', models.CharField(blank=True, max_length=50)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('deleted_rows', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deletion_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='deletionjob_status_created')],
+            },
+        ),
+    ]
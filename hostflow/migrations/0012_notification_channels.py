@@ -0,0 +1,47 @@
+# Generated by Django 4.2.28 on 2026-10-19 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0011_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_preference', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('email', models.BooleanField(default=True)),
+                ('sms', models.BooleanField(default=False, verbose_name='SMS')),
+                ('whatsapp', models.BooleanField(default=False, verbose_name='WhatsApp')),
+                ('in_app', models.BooleanField(default=True, verbose_name='In-app')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MessageDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=10)),
+                ('reference', models.CharField(max_length=100)),
+                ('to', models.CharField(max_length=254)),
+                ('provider_id', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sent', 'Sent'), ('failed', 'Failed'), ('undelivered', 'Undelivered'), ('delivered', 'Delivered'), ('read', 'Read')], default='queued', max_length=12)),
+                ('error_code', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipient', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['provider_id'], name='delivery_provider_id'), models.Index(fields=['status', 'created_at'], name='delivery_status_created')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='messagedelivery',
+            constraint=models.UniqueConstraint(fields=('reference', 'channel'), name='delivery_reference_channel'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.28 on 2026-10-19 18:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0012_notification_channels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('charges', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('late_fees', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payments', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('file', models.FileField(upload_to='statements/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='hostflow.lease')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='statement',
+            constraint=models.UniqueConstraint(fields=('lease', 'month'), name='statement_lease_month'),
+        ),
+    ]
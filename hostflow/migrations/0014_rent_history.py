@@ -0,0 +1,45 @@
+# Generated by Django 4.2.28 on 2026-10-19 19:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0013_statements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('percent', 'Percentage'), ('fixed', 'Fixed amount')], max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('effective_from', models.DateField()),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rent_revisions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RentHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rent_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('effective_from', models.DateField()),
+                ('applied', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('revision', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='hostflow.rentrevision')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rent_history', to='hostflow.unit')),
+            ],
+            options={
+                'verbose_name_plural': 'rent history',
+                'indexes': [models.Index(fields=['unit', 'effective_from'], name='renthistory_unit_effective'), models.Index(condition=models.Q(('applied', False)), fields=['effective_from'], name='renthistory_pending')],
+            },
+        ),
+    ]
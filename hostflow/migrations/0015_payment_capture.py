@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-19 19:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0014_rent_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('source', models.CharField(choices=[('tenant', 'Tenant portal'), ('landlord', 'Recorded by landlord')], max_length=10)),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('captured_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='captures', to='hostflow.payment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-19 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0015_payment_capture'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['owner', 'id'], name='lease_owner_id'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenanceticket',
+            index=models.Index(fields=['owner', 'id'], name='ticket_owner_id'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', 'id'], name='payment_owner_id'),
+        ),
+    ]
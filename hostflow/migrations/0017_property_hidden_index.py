@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-19 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0016_api_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='property_hidden'),
+        ),
+    ]
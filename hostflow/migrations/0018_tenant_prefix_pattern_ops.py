@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+# The autocomplete matches prefixes with LIKE 'q%'. PostgreSQL only uses a
+# b-tree for that under C collation, or when the index is built with a
+# pattern operator class; the ORM cannot give an expression index one, so
+# the three indexes from 0008 are rebuilt here under the same names.
+POSTGRES_SETUP = [
+    'DROP INDEX IF EXISTS "user_username_lower"',
+    'CREATE INDEX "user_username_lower" ON "hostflow_user" ((LOWER("username")) text_pattern_ops)',
+    'DROP INDEX IF EXISTS "user_email_lower"',
+    'CREATE INDEX "user_email_lower" ON "hostflow_user" ((LOWER("email")) text_pattern_ops)',
+    'DROP INDEX IF EXISTS "user_phone"',
+    'CREATE INDEX "user_phone" ON "hostflow_user" ("phone" text_pattern_ops)',
+]
+POSTGRES_TEARDOWN = [
+    'DROP INDEX IF EXISTS "user_username_lower"',
+    'CREATE INDEX "user_username_lower" ON "hostflow_user" ((LOWER("username")))',
+    'DROP INDEX IF EXISTS "user_email_lower"',
+    'CREATE INDEX "user_email_lower" ON "hostflow_user" ((LOWER("email")))',
+    'DROP INDEX IF EXISTS "user_phone"',
+    'CREATE INDEX "user_phone" ON "hostflow_user" ("phone")',
+]
+
+
+def install_pattern_ops(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_SETUP}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_pattern_ops(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_TEARDOWN}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0017_property_hidden_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_pattern_ops, uninstall_pattern_ops),
+    ]
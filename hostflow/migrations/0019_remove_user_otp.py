@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-19 20:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostflow', '0018_tenant_prefix_pattern_ops'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='otp',
+        ),
+    ]
@@ -2,11 +2,52 @@
 HostFlow Models (Clean Version)
 """
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Lower
 from django.utils import timezone
-import random
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# LANDLORD SCOPE
+# ══════════════════════════════════════════════════════════════════════════════
+# Lease, Payment and MaintenanceTicket carry a denormalised `owner` (the
+# landlord of their unit) so landlord queries filter one indexed column
+# instead of joining up to Property. TenantIsolationMiddleware activates
+# request.landlord for the length of the request and their default managers
+# then only return that landlord's rows. `all_objects` is never scoped.
+
+_current_landlord = ContextVar('hostflow_landlord', default=None)
+
+
+def current_landlord():
+    return _current_landlord.get()
+
+
+@contextmanager
+def landlord_scope(landlord):
+    token = _current_landlord.set(landlord)
+    try:
+        yield landlord
+    finally:
+        _current_landlord.reset(token)
+
+
+class LandlordScopedManager(models.Manager):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        landlord = _current_landlord.get()
+        return queryset if landlord is None else queryset.filter(owner=landlord)
+
+
+def _unit_owner_id(unit_id, unit=None):
+    if unit is not None and Unit.property.is_cached(unit):
+        return unit.property.owner_id
+    return Unit.objects.filter(pk=unit_id).values_list('property__owner_id', flat=True).first()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -23,13 +64,21 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='landlord')
     phone = models.CharField(max_length=15, blank=True)
 
-    # OTP fields
-    otp = models.CharField(max_length=6, blank=True, null=True)
+    # email confirmed with a one-time code (see otp.py)
     is_verified = models.BooleanField(default=False)
 
-    def generate_otp(self):
-        self.otp = str(random.randint(100000, 999999))
-        self.save()
+    # landlord who created this tenant account (see tenants.py)
+    created_by = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='created_users'
+    )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # prefix search for the tenant autocomplete
+            models.Index(Lower('username'), name='user_username_lower'),
+            models.Index(Lower('email'), name='user_email_lower'),
+            models.Index(fields=['phone'], name='user_phone'),
+        ]
 
     def is_landlord(self):
         return self.role == 'landlord'
@@ -45,6 +94,26 @@ class User(AbstractUser):
 # 2. PROPERTY & UNIT
 # ══════════════════════════════════════════════════════════════════════════════
 
+class PropertyQuerySet(models.QuerySet):
+    def with_live_counts(self):
+        """Unit counts computed from the units table, next to the stored counters."""
+        return self.annotate(
+            live_unit_count=models.Count('units'),
+            live_occupied_count=models.Count('units', filter=models.Q(units__status='occupied')),
+        )
+
+    def pending_deletion(self, owner):
+        """Ids of `owner`'s properties waiting on a DeletionJob, for excluding their rows."""
+        return self.filter(owner=owner, deleted_at__isnull=False).values('pk')
+
+
+class VisiblePropertyManager(models.Manager.from_queryset(PropertyQuerySet)):
+    """Hides properties waiting on a background DeletionJob."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Property(models.Model):
     owner = models.ForeignKey(
         User,
@@ -57,18 +126,31 @@ class Property(models.Model):
     city = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Maintained by signals (see signals.py); repaired by reconcile_property_counters
+    unit_count = models.IntegerField(default=0, editable=False)
+    occupied_count = models.IntegerField(default=0, editable=False)
+
+    # Set when deletion is requested; the rows go in the background (see deletion.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = VisiblePropertyManager()
+    all_objects = PropertyQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Properties'
+        indexes = [
+            # the few hidden properties, for pending_deletion()
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                         name='property_hidden'),
+        ]
 
     def __str__(self):
         return f"{self.name} – {self.city}"
 
     def occupancy_rate(self):
-        total = self.units.count()
-        if total == 0:
+        if self.unit_count <= 0:
             return 0
-        occupied = self.units.filter(status='occupied').count()
-        return round((occupied / total) * 100, 1)
+        return round((self.occupied_count / self.unit_count) * 100, 1)
 
 
 class Unit(models.Model):
@@ -94,6 +176,13 @@ class Unit(models.Model):
     def __str__(self):
         return f"Unit {self.unit_number} – {self.property.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        unit = super().from_db(db, field_names, values)
+        # what the row looked like when loaded, so a save knows which counters it moves
+        unit._counted_as = (unit.property_id, unit.__dict__.get('status'))
+        return unit
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 3. LEASE
@@ -118,6 +207,10 @@ class Lease(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='active')
     document = models.FileField(upload_to='leases/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', editable=False, db_index=False)
+
+    objects = LandlordScopedManager()
+    all_objects = models.Manager()
 
     class Meta:
         constraints = [
@@ -127,10 +220,19 @@ class Lease(models.Model):
                 name='unique_active_lease_per_unit_tenant'
             )
         ]
+        indexes = [
+            models.Index(fields=['owner', 'status', 'end_date'], name='lease_owner_status_end'),
+            models.Index(fields=['owner', 'id'], name='lease_owner_id'),  # API keyset pages
+        ]
 
     def __str__(self):
         return f"{self.tenant.username} @ {self.unit}"
 
+    def save(self, *args, **kwargs):
+        if self.owner_id is None:
+            self.owner_id = _unit_owner_id(self.unit_id, self.unit if Lease.unit.is_cached(self) else None)
+        super().save(*args, **kwargs)
+
     def is_expiring_soon(self):
         return (self.end_date - timezone.now().date()).days <= 30
 
@@ -162,6 +264,18 @@ class Payment(models.Model):
     receipt_number = models.CharField(max_length=50, blank=True, unique=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', editable=False, db_index=False)
+
+    objects = LandlordScopedManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'due_date'], name='payment_owner_due'),
+            models.Index(fields=['owner', 'status', 'paid_date'], name='payment_owner_status_paid'),
+            models.Index(fields=['due_date'], name='payment_due'),
+            models.Index(fields=['owner', 'id'], name='payment_owner_id'),  # API keyset pages
+        ]
 
     def __str__(self):
         return f"₹{self.amount_due} – {self.lease.tenant.username} ({self.status})"
@@ -176,6 +290,12 @@ class Payment(models.Model):
         return 0
 
     def save(self, *args, **kwargs):
+        if self.owner_id is None:
+            if Payment.lease.is_cached(self):
+                self.owner_id = self.lease.owner_id
+            else:
+                self.owner_id = Lease.all_objects.filter(pk=self.lease_id).values_list('owner_id', flat=True).first()
+
         today = timezone.now().date()
 
         if self.due_date < today and self.status != 'paid':
@@ -212,10 +332,26 @@ class MaintenanceTicket(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='open')
     image = models.ImageField(upload_to='tickets/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', editable=False, db_index=False)
+
+    objects = LandlordScopedManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['unit', 'status', 'created_at'], name='ticket_unit_status_created'),
+            models.Index(fields=['owner', 'status', 'created_at'], name='ticket_owner_status_created'),
+            models.Index(fields=['owner', 'id'], name='ticket_owner_id'),  # API keyset pages
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        if self.owner_id is None:
+            self.owner_id = _unit_owner_id(self.unit_id, self.unit if MaintenanceTicket.unit.is_cached(self) else None)
+        super().save(*args, **kwargs)
+
 
 class TicketComment(models.Model):
     ticket = models.ForeignKey(MaintenanceTicket, on_delete=models.CASCADE, related_name='comments')
@@ -223,6 +359,11 @@ class TicketComment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['ticket', 'created_at'], name='comment_ticket_created'),
+        ]
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 6. NOTIFICATIONS
@@ -235,6 +376,61 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='notification_created'),
+        ]
+
+
+class NotificationPreference(models.Model):
+    """The channels a user is reached on (see hostflow/notify.py); no row means the defaults."""
+    CHANNELS = ('email', 'sms', 'whatsapp', 'in_app')
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_preference')
+    email = models.BooleanField(default=True)
+    sms = models.BooleanField('SMS', default=False)
+    whatsapp = models.BooleanField('WhatsApp', default=False)
+    in_app = models.BooleanField('In-app', default=True)
+
+    def channels(self):
+        return [channel for channel in self.CHANNELS if getattr(self, channel)]
+
+
+class MessageDelivery(models.Model):
+    """One outbound in-app / email / SMS / WhatsApp message and the provider's latest word on it."""
+    # in the order a message moves through them; webhooks may arrive out of order
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('undelivered', 'Undelivered'),
+        ('delivered', 'Delivered'),
+        ('read', 'Read'),
+    ]
+
+    channel = models.CharField(max_length=10)
+    reference = models.CharField(max_length=100)  # what it is about, e.g. 'rent_due:<payment id>'
+    recipient = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='deliveries')
+    to = models.CharField(max_length=254)
+    provider_id = models.CharField(max_length=64, blank=True)  # Twilio message SID
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='queued')
+    error_code = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # a retried batch skips what already went out
+            models.UniqueConstraint(fields=['reference', 'channel'], name='delivery_reference_channel'),
+        ]
+        indexes = [
+            models.Index(fields=['provider_id'], name='delivery_provider_id'),
+            models.Index(fields=['status', 'created_at'], name='delivery_status_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.to}: {self.status}"
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 7. AUDIT LOG
@@ -246,4 +442,267 @@ class AuditLog(models.Model):
     model_name = models.CharField(max_length=50)
     object_id = models.PositiveIntegerField()
     description = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='auditlog_created'),
+        ]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 8. SEARCH INDEX
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SearchEntry(models.Model):
+    """One searchable object as seen by one landlord (see hostflow/search.py)."""
+    KIND_CHOICES = [
+        ('tenant', 'Tenant'),
+        ('property', 'Property'),
+        ('unit', 'Unit'),
+        ('ticket', 'Ticket'),
+        ('payment', 'Payment'),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.TextField()
+    subtitle = models.TextField(blank=True)
+    keywords = models.TextField(blank=True)
+    terms = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'owner'], name='unique_search_entry')
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'kind'], name='search_owner_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} ({self.title})"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 9. BOOKINGS (DAILY-RENT UNITS)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class Booking(models.Model):
+    """A stay on a daily-rent unit, nights check_in … check_out - 1.
+
+    Overlapping non-cancelled bookings of one unit are rejected by the
+    database (see hostflow/availability.py).
+    """
+    STATUS_CHOICES = [
+        ('confirmed', 'Confirmed'),
+        ('blocked', 'Blocked by owner'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='bookings')
+    guest = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings'
+    )
+    guest_name = models.CharField(max_length=150, blank=True)
+    check_in = models.DateField()
+    check_out = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='confirmed')
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(check_out__gt=models.F('check_in')),
+                                   name='booking_checkout_after_checkin'),
+        ]
+        indexes = [
+            models.Index(fields=['unit', 'check_in', 'check_out'], name='booking_unit_dates'),
+        ]
+
+    def __str__(self):
+        return f"{self.guest_name or 'Booking'} @ {self.unit} ({self.check_in} → {self.check_out})"
+
+    @property
+    def nights(self):
+        return (self.check_out - self.check_in).days
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 10. BACKGROUND DELETION
+# ══════════════════════════════════════════════════════════════════════════════
+
+class DeletionJob(models.Model):
+    """A property or landlord being deleted in chunks (see hostflow/deletion.py)."""
+    KIND_CHOICES = [
+        ('property', 'Property'),
+        ('landlord', 'Landlord'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    label = models.CharField(max_length=200)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='deletion_jobs'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    step = models.CharField(max_length=50, blank=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='deletionjob_status_created'),
+        ]
+
+    def __str__(self):
+        return f"Delete {self.kind} {self.label} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        return min(99, 100 * self.deleted_rows // self.total_rows) if self.total_rows else 0
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 11. TASK QUEUE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class Task(models.Model):
+    """A queued call to a @task function (see hostflow/tasks.py). Deleted once it succeeds."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('dead', 'Dead'),
+    ]
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # the claim query: pending rows of a queue, oldest due first
+            models.Index(fields=['queue', 'run_at'], name='task_pending_due',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['status', 'queue'], name='task_status_queue'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 12. STATEMENTS
+# ══════════════════════════════════════════════════════════════════════════════
+
+class Statement(models.Model):
+    """A lease's account for one billing month, rendered to a file (see hostflow/statements.py)."""
+    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name='statements')
+    month = models.DateField()  # first day of the billing month
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    charges = models.DecimalField(max_digits=12, decimal_places=2)
+    late_fees = models.DecimalField(max_digits=12, decimal_places=2)
+    payments = models.DecimalField(max_digits=12, decimal_places=2)
+    closing_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    file = models.FileField(upload_to='statements/')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lease', 'month'], name='statement_lease_month'),
+        ]
+
+    def __str__(self):
+        return f"Statement {self.month:%b %Y} – lease {self.lease_id}"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 13. RENT HISTORY
+# ══════════════════════════════════════════════════════════════════════════════
+
+class RentRevision(models.Model):
+    """One rent change applied to many units at once (see hostflow/rent.py)."""
+    KIND_CHOICES = [
+        ('percent', 'Percentage'),
+        ('fixed', 'Fixed amount'),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rent_revisions')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    effective_from = models.DateField()
+    note = models.CharField(max_length=200, blank=True)
+    unit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        change = f"{self.value:+}%" if self.kind == 'percent' else f"₹{self.value:+}"
+        return f"{change} from {self.effective_from} ({self.unit_count} units)"
+
+
+class RentHistory(models.Model):
+    """A unit's rent from `effective_from` on, until its next row."""
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='rent_history')
+    revision = models.ForeignKey(RentRevision, on_delete=models.CASCADE, null=True, blank=True, related_name='changes')
+    rent_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    effective_from = models.DateField()
+    applied = models.BooleanField(default=True)  # Unit.rent_amount already shows it
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'rent history'
+        indexes = [
+            models.Index(fields=['unit', 'effective_from'], name='renthistory_unit_effective'),
+            # future-dated revisions still waiting for their day
+            models.Index(fields=['effective_from'], name='renthistory_pending',
+                         condition=models.Q(applied=False)),
+        ]
+
+    def __str__(self):
+        return f"Unit {self.unit_id}: ₹{self.rent_amount} from {self.effective_from}"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 14. PAYMENT CAPTURE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class PaymentCapture(models.Model):
+    """Money applied to a Payment under a client's idempotency key (see hostflow/payments.py)."""
+    SOURCE_CHOICES = [
+        ('tenant', 'Tenant portal'),
+        ('landlord', 'Recorded by landlord'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='captures')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)  # what was applied; 0 if nothing was owed
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    captured_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    note = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"₹{self.amount} to payment {self.payment_id} ({self.key})"
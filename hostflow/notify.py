@@ -0,0 +1,242 @@
+"""
+HostFlow Notification Channels
+──────────────────────────────
+Reminders and alerts reach a user on every channel they have switched on
+(``NotificationPreference``; users without a row get its defaults):
+
+    dispatch([Message(tenant, 'rent_due:42', 'Rent due', 'Your rent of …')])
+
+Channels are pluggable – NOTIFICATION_CHANNELS maps a name to a class with
+``address(user)`` and ``send(batch)``:
+
+* ``in_app`` – one bulk INSERT of Notification rows.
+* ``email`` – every message of the batch over one SMTP connection.
+* ``sms`` / ``whatsapp`` – through SMS_TRANSPORT. ``TwilioTransport`` keeps
+  one Twilio client per process on a pooled HTTPS session and sends a batch
+  SMS_CONCURRENCY messages at a time (Twilio has no multi-recipient send);
+  a 429 is retried after Retry-After. ``LocmemTransport`` collects messages
+  in ``outbox`` instead, for tests and for development without an account.
+
+Every send, in-app included, is logged in MessageDelivery, keyed on
+(reference, channel): a batch retried by the task queue, or tomorrow's run
+of the same reminder, skips what already went out. Twilio then reports progress to ``views.twilio_status``, which
+moves a delivery's status forward only – callbacks arrive out of order.
+
+Nothing here runs in a request: ``send_rent_reminders`` splits the month's
+unpaid rent into NOTIFY_BATCH_SIZE batches, each a ``rent_reminders`` task
+on the 'notifications' queue.
+"""
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+from .models import User, Payment, Notification, NotificationPreference, MessageDelivery
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+# MessageDelivery statuses by progress; a callback never moves one backwards
+STATUS_RANK = {status: rank for rank, (status, _) in enumerate(MessageDelivery.STATUS_CHOICES)}
+UNPAID = ['pending', 'partial', 'overdue']
+
+
+class Message(NamedTuple):
+    user: User
+    reference: str
+    title: str
+    body: str
+
+
+# ── Transports ─────────────────────────────────────────────────────────────────
+
+outbox = []  # LocmemTransport's sent messages
+
+
+class LocmemTransport:
+    def send_many(self, messages):
+        """Send (to, from, body) triples; returns (message SID, status, error code) for each."""
+        results = []
+        for to, sender, body in messages:
+            outbox.append({'to': to, 'from': sender, 'body': body})
+            results.append((f'SM{len(outbox):032x}', 'queued', ''))
+        return results
+
+
+class TwilioTransport:
+    _client = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls):
+        """The process's Twilio client; its session keeps SMS_CONCURRENCY connections open."""
+        with cls._lock:
+            if cls._client is None:
+                from requests.adapters import HTTPAdapter
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+                from urllib3.util.retry import Retry
+
+                http = TwilioHttpClient(pool_connections=True, timeout=10)
+                # retried only where Twilio cannot have accepted the message: failed connects and 429s
+                retry = Retry(total=3, read=0, other=0, status_forcelist=[429], allowed_methods=None,
+                              backoff_factor=1, respect_retry_after_header=True, raise_on_status=False)
+                http.session.mount('https://', HTTPAdapter(pool_maxsize=settings.SMS_CONCURRENCY, max_retries=retry))
+                cls._client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http)
+            return cls._client
+
+    def _send(self, message):
+        from twilio.base.exceptions import TwilioRestException
+        to, sender, body = message
+        options = {'status_callback': settings.TWILIO_STATUS_CALLBACK} if settings.TWILIO_STATUS_CALLBACK else {}
+        try:
+            sent = self.client().messages.create(to=to, from_=sender, body=body, **options)
+        except TwilioRestException as exc:
+            logger.warning("Twilio refused a message to %s: %s", to, exc.msg)
+            return '', 'failed', str(exc.code or exc.status)
+        return sent.sid, sent.status if sent.status in STATUS_RANK else 'queued', ''  # 'accepted', 'scheduled'
+
+    def send_many(self, messages):
+        with ThreadPoolExecutor(settings.SMS_CONCURRENCY, thread_name_prefix='hostflow-sms') as pool:
+            return list(pool.map(self._send, messages))
+
+
+def transport():
+    return import_string(settings.SMS_TRANSPORT)()
+
+
+# ── Channels ───────────────────────────────────────────────────────────────────
+
+class InAppChannel:
+    logged = True
+
+    def address(self, user):
+        return user.pk
+
+    def send(self, batch):
+        Notification.objects.bulk_create(
+            [Notification(recipient=message.user, title=message.title, message=message.body) for message, _ in batch]
+        )
+        return [('', 'delivered', '')] * len(batch)
+
+
+class EmailChannel:
+    logged = True
+
+    def address(self, user):
+        return user.email
+
+    def send(self, batch):
+        with get_connection() as connection:
+            connection.send_messages([
+                EmailMessage(message.title, message.body, settings.DEFAULT_FROM_EMAIL, [to], connection=connection)
+                for message, to in batch
+            ])
+        return [('', 'sent', '')] * len(batch)
+
+
+class SmsChannel:
+    logged = True
+    prefix = ''
+
+    def sender(self):
+        return settings.TWILIO_FROM_NUMBER
+
+    def address(self, user):
+        digits = re.sub(r'[^\d+]', '', user.phone)
+        if not digits:
+            return ''
+        if not digits.startswith('+'):  # local numbers are stored without the country code
+            digits = settings.SMS_DEFAULT_COUNTRY_CODE + digits.lstrip('0')
+        return self.prefix + digits
+
+    def send(self, batch):
+        sender = self.sender()
+        return transport().send_many([(to, sender, f'{message.title}: {message.body}') for message, to in batch])
+
+
+class WhatsAppChannel(SmsChannel):
+    prefix = 'whatsapp:'
+
+    def sender(self):
+        return 'whatsapp:' + settings.TWILIO_WHATSAPP_FROM
+
+
+def channels():
+    return {name: import_string(path)() for name, path in settings.NOTIFICATION_CHANNELS.items()}
+
+
+# ── Dispatch ───────────────────────────────────────────────────────────────────
+
+def preferences(users):
+    saved = NotificationPreference.objects.in_bulk([user.pk for user in users])
+    return {user.pk: (saved.get(user.pk) or NotificationPreference()).channels() for user in users}
+
+
+def dispatch(messages):
+    """Send `messages` on each recipient's channels; returns {channel: messages sent}."""
+    wanted = preferences({message.user for message in messages})
+    sent = {}
+    for name, channel in channels().items():
+        batch = [(message, to) for message in messages
+                 if name in wanted[message.user.pk] and (to := channel.address(message.user))]
+        if channel.logged and batch:
+            done = set(MessageDelivery.objects.filter(
+                channel=name, reference__in=[message.reference for message, _ in batch]
+            ).values_list('reference', flat=True))
+            batch = [(message, to) for message, to in batch if message.reference not in done]
+        if not batch:
+            continue
+        results = channel.send(batch)
+        if channel.logged:
+            MessageDelivery.objects.bulk_create([
+                MessageDelivery(channel=name, reference=message.reference, recipient=message.user, to=to,
+                                provider_id=provider_id, status=status, error_code=error)
+                for (message, to), (provider_id, status, error) in zip(batch, results)
+            ], ignore_conflicts=True)
+        sent[name] = len(batch)
+    return sent
+
+
+def record_status(provider_id, status, error_code=''):
+    """Apply a provider's status callback; returns whether it moved the delivery forward."""
+    if status not in STATUS_RANK:
+        return False
+    earlier = [name for name, rank in STATUS_RANK.items() if rank < STATUS_RANK[status]]
+    return bool(MessageDelivery.objects.filter(provider_id=provider_id, status__in=earlier).update(
+        status=status, error_code=error_code or ''
+    ))
+
+
+# ── Rent reminders ─────────────────────────────────────────────────────────────
+
+def rent_due_message(payment):
+    tenant = payment.lease.tenant
+    return Message(
+        tenant, f'rent_due:{payment.pk}', f"[HostFlow] Rent Due – ₹{payment.amount_due}",
+        f"Hi {tenant.get_full_name() or tenant.username},\n\n"
+        f"Your rent of ₹{payment.amount_due} is due on {payment.due_date}.\n"
+        f"Please pay on time to avoid late fees.\n\n"
+        f"– HostFlow",
+    )
+
+
+@task(queue='notifications')
+def rent_reminders(payment_ids):
+    payments = Payment.all_objects.filter(pk__in=payment_ids, status__in=UNPAID).select_related('lease__tenant')
+    return dispatch([rent_due_message(payment) for payment in payments])
+
+
+def queue_rent_reminders(payments, batch_size=None):
+    """Enqueue reminders for `payments` in batches; returns how many batches."""
+    batch_size = batch_size or settings.NOTIFY_BATCH_SIZE
+    ids = list(payments.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        rent_reminders.enqueue(ids[start:start + batch_size])
+    return -(-len(ids) // batch_size)
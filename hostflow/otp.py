@@ -0,0 +1,122 @@
+"""
+HostFlow Email OTP
+──────────────────
+One-time codes for verifying an email address at registration.
+
+Nothing touches the database: a code lives in the cache for
+OTP_EXPIRY_SECONDS, stored only as an HMAC of (email, code), next to a
+counter of guesses. After OTP_MAX_ATTEMPTS wrong guesses the code is burnt.
+Issuing is limited per email (OTP_RESEND_LIMIT per expiry window) and per
+client IP (OTP_IP_LIMIT an hour) by token buckets, so a flood of requests
+is refused before a code is generated or a mail is queued.
+
+The request stores the code's digest, so it can be verified as soon as
+the response is out. The cache must be shared by every process (production
+settings refuse to start otherwise).
+
+Mail goes out from the 'mail' task queue (hostflow/tasks.py), so a slow or
+unreachable SMTP server never holds up the request and a failed send is
+retried. The queued row (and a dead one left for the admin) holds the code
+only sealed: added, modulo 10⁶, to a pad derived from SECRET_KEY and a
+fresh nonce. A mail that would land after the deadline is dropped.
+"""
+
+import hmac
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.utils.crypto import salted_hmac
+
+from .ratelimit import TokenBucket
+from .tasks import task
+
+SENT, RATE_LIMITED, VERIFIED, INVALID, EXPIRED, LOCKED = (
+    'sent', 'rate_limited', 'verified', 'invalid', 'expired', 'locked',
+)
+
+
+def _expiry():
+    return settings.OTP_EXPIRY_SECONDS
+
+
+def _email_bucket():
+    return TokenBucket('otp-email', settings.OTP_RESEND_LIMIT, _expiry())
+
+
+def _ip_bucket():
+    return TokenBucket('otp-ip', settings.OTP_IP_LIMIT, 3600)
+
+
+def _key(email):
+    return 'hostflow:otp:' + salted_hmac('hostflow.otp.key', email.lower()).hexdigest()[:32]
+
+
+def _digest(email, code):
+    return salted_hmac('hostflow.otp.code', f'{email.lower()}:{code}').hexdigest()
+
+
+def _pad(email, nonce):
+    return int.from_bytes(salted_hmac('hostflow.otp.seal', f'{email.lower()}:{nonce}').digest(), 'big')
+
+
+def _seal(email, code):
+    nonce = secrets.token_hex(8)
+    return f'{nonce}:{(int(code) + _pad(email, nonce)) % 10 ** 6:06d}'
+
+
+def _unseal(email, sealed):
+    nonce, value = sealed.split(':')
+    return f'{(int(value) - _pad(email, nonce)) % 10 ** 6:06d}'
+
+
+@task(queue='mail')
+def deliver(email, sealed, expires_at):
+    ttl = expires_at - int(time.time())
+    if ttl <= 0:
+        return
+    code = _unseal(email, sealed)
+    send_mail(
+        'HostFlow OTP',
+        f'Your HostFlow verification code is {code}. It expires in {max(ttl // 60, 1)} minutes.',
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+    )
+
+
+def issue(email, ip):
+    """Queue a code for `email`.
+
+    Returns (SENT, the queued mail Task) or (RATE_LIMITED, seconds to wait).
+    """
+    ip_bucket, email_bucket = _ip_bucket(), _email_bucket()
+    # both checked before either is spent, so refused requests for one address cannot drain a shared IP
+    wait = max(ip_bucket.wait(ip), email_bucket.wait(email))
+    if wait:
+        return RATE_LIMITED, wait
+    ip_bucket.consume(ip)
+    email_bucket.consume(email)
+    code, key = f'{secrets.randbelow(10 ** 6):06d}', _key(email)
+    cache.set_many({key: _digest(email, code), key + ':attempts': 0}, _expiry())
+    return SENT, deliver.enqueue(email, _seal(email, code), int(time.time()) + _expiry())
+
+
+def verify(email, code):
+    """Check `code` for `email` in constant time; a correct code is single-use."""
+    key = _key(email)
+    digest = cache.get(key)
+    if digest is None:
+        return EXPIRED
+    try:
+        # counted before comparing, with an atomic incr, so parallel guesses cannot share a slot
+        attempts = cache.incr(key + ':attempts')
+    except ValueError:  # counter expired between the two reads
+        return EXPIRED
+    if attempts > settings.OTP_MAX_ATTEMPTS:
+        return LOCKED
+    if hmac.compare_digest(digest, _digest(email, str(code))):
+        cache.delete_many([key, key + ':attempts'])
+        return VERIFIED
+    return LOCKED if attempts >= settings.OTP_MAX_ATTEMPTS else INVALID
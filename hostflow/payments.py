@@ -0,0 +1,150 @@
+"""
+HostFlow Payment Capture
+────────────────────────
+Money into a Payment, safe against double-clicked submits, retried requests
+and a tenant and landlord paying at the same moment:
+
+    capture(payment.pk, key, by=request.user)             # pay what is owed
+    record(lease, key, Decimal('2000'), by=request.user)  # cash the landlord took
+
+* Every capture carries an idempotency key, rendered fresh into each pay
+  form, and stored in PaymentCapture under a unique constraint. The row is
+  inserted first, in the capture's own transaction. A repeat of the key,
+  even one racing the original, hits the constraint and gets the original
+  capture back instead of paying twice.
+* The payment row is then locked with ``SELECT … FOR UPDATE``, so the
+  amount owed is read only after any capture in flight has committed. SQLite
+  has no row locks, but there the key INSERT has already taken the database
+  write lock, which serializes captures just the same.
+* ``amount_paid`` moves by an F() increment, and status, late fee and paid
+  date are set in that same UPDATE. ``Payment.save()`` is not used: it
+  writes back every column from a copy that may be stale.
+* A capture the database turns away over a lock (SQLite "database is
+  locked", a PostgreSQL deadlock or serialization failure) rolled back
+  whole, so it is retried a few times after a short random pause.
+
+Without an amount, capture() pays what is outstanding, so a second "pay
+now" for a settled payment applies nothing.
+"""
+
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+from django.utils import timezone
+
+from . import ledger, search
+from .models import Lease, Payment, PaymentCapture
+
+ZERO = Decimal('0.00')
+ATTEMPTS = 50
+
+
+def new_key():
+    """A fresh idempotency key for a pay form."""
+    return uuid.uuid4().hex
+
+
+def _settle(payment_id, amount, paid_on, today):
+    """Lock the payment and apply up to `amount` (None: all that is owed). Returns what was applied."""
+    payment = Payment.all_objects.select_related('lease').select_for_update(of=('self',)).get(pk=payment_id)
+    late = payment.due_date < today and payment.status != 'paid'
+    fee = Decimal(payment.calculate_late_fee()) if late else payment.late_fee
+    owed = payment.amount_due + fee
+    applied = max(owed - payment.amount_paid, ZERO) if amount is None else amount
+    if not applied:
+        return ZERO
+
+    paid = F('amount_paid') + Value(applied)
+    Payment.all_objects.filter(pk=payment_id).update(
+        amount_paid=paid,
+        late_fee=fee,
+        paid_date=paid_on or today,
+        status=Case(
+            When(GreaterThanOrEqual(paid, Value(owed)), then=Value('paid')),
+            When(GreaterThan(paid, Value(ZERO)), then=Value('partial')),
+            default=Value('overdue' if today > payment.due_date else 'pending'),
+        ),
+    )
+    # what the post_save signals would have done, once the row is committed (before that,
+    # another request could cache the old ledger again); robust, so a failure there cannot
+    # turn a committed capture into an error and a retry
+    tenant_id = payment.lease.tenant_id
+    transaction.on_commit(lambda: search.index_object('payment', payment_id), robust=True)
+    transaction.on_commit(lambda: ledger.invalidate(tenant_id), robust=True)
+    return applied
+
+
+def _retrying(func):
+    """Run `func`, again if a lock conflict rolled it back; only as the outermost transaction."""
+    for attempt in range(1, ATTEMPTS + 1):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == ATTEMPTS or connection.in_atomic_block:
+                raise
+            time.sleep(random.uniform(0, min(0.01 * attempt, 0.25)))
+
+
+def _replay(key, payment_id=None):
+    """The capture an earlier request made under `key`."""
+    original = PaymentCapture.objects.filter(key=key).first()
+    if original is None:
+        return None
+    if payment_id is not None and original.payment_id != payment_id:
+        raise ValueError(f"Idempotency key {key!r} was used for another payment.")
+    original.replayed = True
+    return original
+
+
+def capture(payment_id, key, amount=None, by=None, source='tenant', paid_on=None, note=''):
+    """Apply `amount` (None: whatever is owed) to a payment once per `key`.
+
+    Returns the PaymentCapture; ``replayed`` is True when `key` had already
+    been captured and nothing new was applied.
+    """
+    today = timezone.now().date()  # the day Payment.save() and calculate_late_fee() go by
+
+    def attempt():
+        with transaction.atomic():
+            captured = PaymentCapture.objects.create(
+                key=key, payment_id=payment_id, amount=ZERO, source=source, captured_by=by, note=note,
+            )
+            captured.amount = _settle(payment_id, amount, paid_on, today)
+            PaymentCapture.objects.filter(pk=captured.pk).update(amount=captured.amount)
+        captured.replayed = False
+        return captured
+
+    try:
+        return _retrying(attempt)
+    except IntegrityError:
+        original = _retrying(lambda: _replay(key, payment_id))
+        if original is None:
+            raise
+        return original
+
+
+def record(lease, key, amount, by=None, paid_on=None, note=''):
+    """Money the landlord took for `lease`: onto its oldest unsettled payment, else a new charge for today."""
+
+    def attempt():
+        with transaction.atomic():
+            # one recording per lease at a time, so two cannot both open a new charge
+            Lease.all_objects.select_for_update().filter(pk=lease.pk).values_list('pk', flat=True).first()
+            payment_id = Payment.all_objects.filter(lease=lease).exclude(status='paid').order_by(
+                'due_date', 'pk'
+            ).values_list('pk', flat=True).first()
+            if payment_id is None:
+                payment_id = Payment.all_objects.create(
+                    lease=lease, amount_due=lease.unit.rent_amount, due_date=timezone.now().date(),
+                ).pk
+            result = capture(payment_id, key, amount, by=by, source='landlord', paid_on=paid_on, note=note)
+            if result.replayed:
+                transaction.set_rollback(True)  # recorded by an earlier request; drop any charge opened above
+        return result
+
+    return _retrying(attempt)
@@ -0,0 +1,127 @@
+"""
+HostFlow Rate Limits
+────────────────────
+Cache-backed limits for the unauthenticated endpoints, so abusive traffic is
+turned away before it reaches the database or the mail server.
+
+* TokenBucket – up to ``capacity`` tokens per key, refilled at
+  ``capacity / period`` a second; each request spends one. State is a single
+  ``(tokens, updated_at)`` entry that expires once the bucket would be full
+  again, so idle keys cost nothing. The read-modify-write is not atomic: two
+  workers racing on one key can each spend the same token, which over-admits
+  by at most the number of workers – fine for abuse control.
+* SlidingWindow – events per key over the last ``period`` seconds, estimated
+  from two fixed-window counters (this one, and the previous one weighted by
+  how much of it still overlaps the window). Counting is an atomic
+  ``cache.incr``, so it is exact under concurrency.
+
+With more than one worker process CACHES must point at a shared backend,
+otherwise every process keeps its own buckets.
+"""
+
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def cache_key(kind, name, key):
+    digest = hashlib.sha256(str(key).lower().encode()).hexdigest()[:32]
+    return f'hostflow:{kind}:{name}:{digest}'
+
+
+class TokenBucket:
+    def __init__(self, name, capacity, period):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    def _key(self, key):
+        return cache_key('bucket', self.name, key)
+
+    def _level(self, key, now):
+        level, updated = cache.get(self._key(key), (self.capacity, now))
+        return min(self.capacity, level + (now - updated) * self.rate)
+
+    def wait(self, key, tokens=1):
+        """Seconds until `tokens` could be spent for `key` (0: now), without spending them."""
+        level = self._level(key, time.time())
+        return math.ceil((tokens - level) / self.rate) if level < tokens else 0
+
+    def consume(self, key, tokens=1):
+        """Spend `tokens` for `key`: 0 if allowed, else seconds until they would be."""
+        now = time.time()
+        level = self._level(key, now)
+        if level < tokens:
+            return math.ceil((tokens - level) / self.rate)
+        level -= tokens
+        cache.set(self._key(key), (level, now), math.ceil((self.capacity - level) / self.rate) or 1)
+        return 0
+
+    def reset(self, key):
+        cache.delete(self._key(key))
+
+
+class SlidingWindow:
+    def __init__(self, name, limit, period):
+        self.name = name
+        self.limit = limit
+        self.period = period
+
+    def _state(self, key):
+        now = time.time()
+        slot, elapsed = divmod(now, self.period)
+        base = cache_key('window', self.name, key)
+        current_key, previous_key = f'{base}:{int(slot)}', f'{base}:{int(slot) - 1}'
+        return current_key, previous_key, elapsed / self.period
+
+    def _estimate(self, current, previous, fraction):
+        return current + previous * (1 - fraction)
+
+    def count(self, key):
+        current_key, previous_key, fraction = self._state(key)
+        counts = cache.get_many([current_key, previous_key])
+        return self._estimate(counts.get(current_key, 0), counts.get(previous_key, 0), fraction)
+
+    def hit(self, key):
+        """Record one event; returns the new estimated count."""
+        current_key, previous_key, fraction = self._state(key)
+        cache.add(current_key, 0, 2 * self.period)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # evicted between add and incr
+            cache.set(current_key, 1, 2 * self.period)
+            current = 1
+        return self._estimate(current, cache.get(previous_key, 0), fraction)
+
+    def retry_after(self, key):
+        """Seconds until the count drops below the limit if nothing else happens (0 if it is)."""
+        current_key, previous_key, fraction = self._state(key)
+        counts = cache.get_many([current_key, previous_key])
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        if self._estimate(current, previous, fraction) < self.limit:
+            return 0
+        if current < self.limit:
+            # the previous window's share decays below the headroom later in this one
+            return math.ceil((1 - (self.limit - current) / previous - fraction) * self.period) + 1
+        # wait out this window, then for its count to decay in the next
+        return math.ceil((1 - fraction + 1 - self.limit / current) * self.period) + 1
+
+    def reset(self, key):
+        current_key, previous_key, _ = self._state(key)
+        cache.delete_many([current_key, previous_key])
+
+
+def client_ip(request):
+    """The caller's address.
+
+    Behind a proxy (RATELIMIT_TRUST_FORWARDED_FOR) that is the last address
+    the proxy appended to X-Forwarded-For; earlier entries are client-supplied.
+    """
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and getattr(settings, 'RATELIMIT_TRUST_FORWARDED_FOR', False):
+        return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
@@ -0,0 +1,147 @@
+"""
+HostFlow Rent Revisions
+───────────────────────
+Rent changes across many units at once, with a history of every amount:
+
+    units = select_units(landlord, city='Pune', rent_type='monthly')
+    revise(landlord, units, 'percent', Decimal('5'), effective_from=date(2027, 1, 1))
+
+* The revision costs the same few statements whether it touches ten units
+  or fifty thousand, all in one short transaction. First the RentRevision
+  row. Then an ``INSERT … SELECT`` that writes each unit's RentHistory row,
+  old and new amount, with the new amount computed in SQL. Then, if the
+  effective date has come, one ``UPDATE`` of ``Unit.rent_amount`` with the
+  same F() expression. No unit is loaded into Python.
+* ``Unit.rent_amount`` is the rent in force today. A revision dated in the
+  future waits in RentHistory (``applied=False``) until ``apply_due``
+  promotes it. generate_rent calls that before billing.
+* Billing charges the rent in force on the first day of the billing month.
+  ``effective_rent`` is a RentHistory subquery, falling back to the unit's
+  rent for units that were never revised.
+
+New amounts are worked out from the rent in force today; a percentage is
+rounded to the paisa and nothing goes below zero.
+"""
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.utils import timezone
+
+from . import forecast, search
+from .models import Unit, RentRevision, RentHistory
+from .tasks import task
+
+ZERO = Decimal('0.00')
+REINDEX_BATCH_SIZE = 2000
+
+
+def select_units(landlord, property=None, city='', rent_type=''):
+    """`landlord`'s units, narrowed by property, city (any case) and rent type."""
+    units = Unit.objects.filter(property__owner=landlord, property__deleted_at__isnull=True)
+    if property:
+        units = units.filter(property=property)
+    if city:
+        units = units.filter(property__city__iexact=city)
+    if rent_type:
+        units = units.filter(rent_type=rent_type)
+    return units
+
+
+def new_rent(kind, value):
+    """The revised rent as an expression over ``rent_amount``."""
+    if kind == 'percent':
+        revised = Round(F('rent_amount') * Value(1 + Decimal(value) / 100), 2)
+    else:
+        revised = F('rent_amount') + Value(Decimal(value))
+    return Greatest(revised, Value(ZERO), output_field=Unit._meta.get_field('rent_amount'))
+
+
+# ── Revising ───────────────────────────────────────────────────────────────────
+
+def _insert_history(units, revision, revised, applied):
+    rows = units.order_by().annotate(
+        new_amount=revised, effective=Value(revision.effective_from), is_applied=Value(applied),
+        revision_id_=Value(revision.pk), created=Value(revision.created_at),
+    ).values_list('pk', 'rent_amount', 'new_amount', 'effective', 'is_applied', 'revision_id_', 'created')
+    select, params = rows.query.sql_with_params()
+    columns = ['unit_id', 'previous_amount', 'rent_amount', 'effective_from', 'applied', 'revision_id', 'created_at']
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {RentHistory._meta.db_table} ({', '.join(map(connection.ops.quote_name, columns))}) {select}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def revise(landlord, units, kind, value, effective_from, note='', today=None):
+    """Change the rent of every unit in `units`; returns the RentRevision."""
+    today = today or timezone.localdate()
+    revised = new_rent(kind, value)
+    applied = effective_from <= today
+    with transaction.atomic():
+        revision = RentRevision.objects.create(
+            owner=landlord, kind=kind, value=value, effective_from=effective_from, note=note,
+        )
+        revision.unit_count = _insert_history(units, revision, revised, applied)
+        RentRevision.objects.filter(pk=revision.pk).update(unit_count=revision.unit_count)
+        if applied:
+            units.update(rent_amount=revised)  # same expression, same pre-revision rents
+        transaction.on_commit(lambda: forecast.invalidate(landlord.pk))
+        if applied:
+            reindex_units.enqueue(revision.pk)
+    return revision
+
+
+def record_change(unit, previous_amount, today=None):
+    """History for a single unit whose rent was just edited by hand."""
+    if unit.rent_amount != previous_amount:
+        RentHistory.objects.create(
+            unit=unit, rent_amount=unit.rent_amount, previous_amount=previous_amount,
+            effective_from=today or timezone.localdate(),
+        )
+
+
+def apply_due(today=None):
+    """Bring Unit.rent_amount up to future-dated revisions whose day has come; returns units updated."""
+    today = today or timezone.localdate()
+    due = RentHistory.objects.filter(applied=False, effective_from__lte=today)
+    if not due.exists():
+        return 0
+    units = Unit.objects.filter(pk__in=due.values('unit_id'))
+    landlords = list(units.values_list('property__owner_id', flat=True).distinct())
+    revisions = list(due.values_list('revision_id', flat=True).distinct())
+    with transaction.atomic():
+        updated = units.update(rent_amount=Subquery(
+            RentHistory.objects.filter(unit=OuterRef('pk'), effective_from__lte=today)
+            .order_by('-effective_from', '-pk').values('rent_amount')[:1]
+        ))
+        due.update(applied=True)
+        for revision_id in filter(None, revisions):
+            reindex_units.enqueue(revision_id)
+    for landlord_id in landlords:
+        forecast.invalidate(landlord_id)
+    return updated
+
+
+# ── Billing ────────────────────────────────────────────────────────────────────
+
+def effective_rent(on, unit='unit'):
+    """Annotation: the rent in force on `on` for the unit behind the `unit` relation."""
+    return Coalesce(
+        Subquery(
+            RentHistory.objects.filter(unit=OuterRef(unit), effective_from__lte=on)
+            .order_by('-effective_from', '-pk').values('rent_amount')[:1]
+        ),
+        F(f'{unit}__rent_amount'),
+    )
+
+
+@task()
+def reindex_units(revision_id):
+    """Refresh the search entries (they show the rent) of a revision's units."""
+    ids = list(RentHistory.objects.filter(revision_id=revision_id).order_by('unit_id').values_list('unit_id', flat=True))
+    for start in range(0, len(ids), REINDEX_BATCH_SIZE):
+        search.index_objects('unit', ids[start:start + REINDEX_BATCH_SIZE])
@@ -0,0 +1,163 @@
+"""
+HostFlow Read Replicas
+──────────────────────
+Month-end reporting should not queue behind rent payments on the primary,
+so the heavy read-only views run inside ``use_replica``:
+
+    @query_budget(14)
+    @login_required
+    @landlord_required
+    @use_replica()
+    def reports(request): ...
+
+    with use_replica(request.user):
+        rows = list(Payment.objects.filter(...))
+
+Replicas come from DATABASE_REPLICA_URLS (comma-separated; aliases
+``replica_1``, ``replica_2``, …). ``ReplicaRouter`` sends reads inside a
+``use_replica`` block to one of them and everything else to ``default``:
+
+* Writes always go to the primary, and once a request has written, its
+  later reads do too. ``ReplicaPinMiddleware`` then pins the user to the
+  primary for REPLICA_STICKY_SECONDS, so the page after a POST shows what
+  was just saved even if the replica has not replayed it yet.
+* A replica is checked at most every REPLICA_CHECK_INTERVAL seconds per
+  process. One that cannot be reached, or is more than REPLICA_MAX_LAG
+  seconds behind (PostgreSQL replay lag), is skipped; with none usable the
+  block reads from the primary.
+* Reads inside an open transaction on the primary stay there.
+
+Without replicas configured ``use_replica`` is a no-op. To try it locally,
+point DATABASE_URL and DATABASE_REPLICA_URLS at two SQLite files, run
+``migrate`` and ``migrate --database replica_1``, and copy the primary file
+over the replica whenever it should "catch up".
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_replica = ContextVar('hostflow_replica', default=None)
+_request_writes = ContextVar('hostflow_request_writes', default=None)
+_health = {}  # alias → (checked at, usable), per process
+
+# seconds the replica is behind, 0 once it has replayed everything it received
+LAG_SQL = {
+    'postgresql': (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+# ── Replica health ─────────────────────────────────────────────────────────────
+
+def replica_lag(alias):
+    connection = connections[alias]
+    connection.ensure_connection()
+    sql = LAG_SQL.get(connection.vendor)
+    if sql is None:  # nothing replicates (two SQLite files in development)
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def is_usable(alias):
+    now = time.monotonic()
+    checked_at, usable = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_CHECK_INTERVAL:
+        return usable
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable; reading from the primary", alias, exc_info=True)
+        usable = False
+    else:
+        usable = lag <= settings.REPLICA_MAX_LAG
+        if not usable:
+            logger.warning("Replica %s is %.1fs behind; reading from the primary", alias, lag)
+    _health[alias] = (now, usable)
+    return usable
+
+
+def choose_replica(user=None):
+    """A usable replica alias for `user`'s reads, or None for the primary."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)):
+        return None
+    candidates = random.sample(settings.DATABASE_REPLICAS, len(settings.DATABASE_REPLICAS))
+    return next((alias for alias in candidates if is_usable(alias)), None)
+
+
+# ── Read-your-writes ───────────────────────────────────────────────────────────
+
+def _pin_key(user_id):
+    return f'hostflow:replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def track_writes():
+    """Start recording writes for this request; returns the record and a reset token."""
+    record = {'wrote': False}
+    return record, _request_writes.set(record)
+
+
+def stop_tracking(token):
+    _request_writes.reset(token)
+
+
+# ── use_replica ────────────────────────────────────────────────────────────────
+
+class use_replica:
+    """``with use_replica(user):`` or, on a view, ``@use_replica()``."""
+
+    def __init__(self, user=None):
+        self.user = user
+
+    def __enter__(self):
+        self.token = _replica.set(choose_replica(self.user))
+        return _replica.get()
+
+    def __exit__(self, *exc_info):
+        _replica.reset(self.token)
+
+    def __call__(self, view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with use_replica(getattr(request, 'user', None)):
+                return view_func(request, *args, **kwargs)
+        return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None:
+            return None
+        record = _request_writes.get()
+        if (record and record['wrote']) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        record = _request_writes.get()
+        if record is not None:
+            record['wrote'] = True
+        # never None: Django would fall back to the instance's database, which may be a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same rows
@@ -0,0 +1,228 @@
+"""
+HostFlow Search
+───────────────
+Landlord-scoped full-text search over tenants, properties, units,
+maintenance tickets and payments.
+
+Every searchable object has one SearchEntry per landlord who may see it.
+Signals (see signals.py) keep entries current; the database keeps the
+index current from the entries:
+
+* PostgreSQL – a ``search_vector tsvector`` column with a GIN index,
+  filled by a BEFORE INSERT/UPDATE trigger.
+* SQLite     – an external-content FTS5 table synced by triggers.
+* anything else – plain ``icontains`` over the stored terms.
+
+Text is normalised to lowercase alphanumeric words in Python before it is
+stored, so IDs like ``pay_29QQoUBi66xm2f`` and emails split the same way on
+every backend.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from .models import (
+    User, Property, Unit, Lease, Payment, MaintenanceTicket, SearchEntry,
+)
+
+WORD_RE = re.compile(r'[^\W_]+')
+MAX_TERMS_LENGTH = 10000
+
+
+def normalize(*parts):
+    words = []
+    for part in parts:
+        if part:
+            words += WORD_RE.findall(str(part).lower())
+    return ' '.join(words)[:MAX_TERMS_LENGTH]
+
+
+# ── Documents ──────────────────────────────────────────────────────────────────
+# Each builder returns {owner_id: fields} for one object.
+
+def _tenant_docs(user):
+    owners = {lease.owner_id for lease in user.leases.all()}
+    fields = {
+        'title': user.get_full_name() or user.username,
+        'subtitle': ' · '.join(filter(None, [user.email, user.phone])),
+        'keywords': normalize(user.username, user.first_name, user.last_name),
+        'terms': normalize(user.email, user.phone),
+    }
+    return {owner_id: fields for owner_id in owners}
+
+
+def _property_docs(prop):
+    return {prop.owner_id: {
+        'title': prop.name,
+        'subtitle': prop.city,
+        'keywords': normalize(prop.name),
+        'terms': normalize(prop.address, prop.city),
+    }}
+
+
+def _unit_docs(unit):
+    prop = unit.property
+    return {prop.owner_id: {
+        'title': f"Unit {unit.unit_number} – {prop.name}",
+        'subtitle': f"{unit.get_rent_type_display()} · ₹{unit.rent_amount} · {unit.get_status_display()}",
+        'keywords': normalize('unit', unit.unit_number, prop.name),
+        'terms': normalize(prop.city, unit.rent_type, unit.status),
+    }}
+
+
+def _ticket_docs(ticket):
+    comments = [c.content for c in ticket.comments.all()]
+    return {ticket.owner_id: {
+        'title': ticket.title,
+        'subtitle': f"Unit {ticket.unit.unit_number} · {ticket.get_status_display()}",
+        'keywords': normalize(ticket.title),
+        'terms': normalize(ticket.description, *comments),
+    }}
+
+
+def _payment_docs(payment):
+    lease = payment.lease
+    return {payment.owner_id: {
+        'title': f"₹{payment.amount_due} – {lease.tenant.username}",
+        'subtitle': f"Due {payment.due_date} · {payment.get_status_display()}",
+        'keywords': normalize(payment.receipt_number, payment.razorpay_order_id, payment.razorpay_payment_id),
+        'terms': normalize(lease.tenant.username, lease.unit.unit_number, payment.notes),
+    }}
+
+
+# Nothing under a property waiting on a DeletionJob is indexed (see deletion.py).
+KINDS = {
+    'tenant': (User.objects.filter(role='tenant').prefetch_related(
+        Prefetch('leases', queryset=Lease.all_objects.filter(unit__property__deleted_at__isnull=True)
+                 .only('tenant_id', 'owner_id'))
+    ), _tenant_docs),
+    'property': (Property.objects.all(), _property_docs),
+    'unit': (Unit.objects.filter(property__deleted_at__isnull=True).select_related('property'), _unit_docs),
+    'ticket': (MaintenanceTicket.all_objects.filter(unit__property__deleted_at__isnull=True)
+               .select_related('unit').prefetch_related('comments'), _ticket_docs),
+    'payment': (Payment.all_objects.filter(lease__unit__property__deleted_at__isnull=True)
+                .select_related('lease__tenant', 'lease__unit'), _payment_docs),
+}
+INDEXED_FIELDS = ['title', 'subtitle', 'keywords', 'terms']
+
+
+# ── Index maintenance ──────────────────────────────────────────────────────────
+
+def index_objects(kind, pks):
+    """(Re)build the entries of some objects in a fixed number of queries.
+
+    Objects that no longer exist lose their entries.
+    """
+    queryset, build = KINDS[kind]
+    pks = list(pks)
+    docs = {
+        (obj.pk, owner_id): fields
+        for obj in queryset.filter(pk__in=pks)
+        for owner_id, fields in build(obj).items()
+    }
+    existing = {(e.object_id, e.owner_id): e for e in SearchEntry.objects.filter(kind=kind, object_id__in=pks)}
+
+    stale = [e.pk for key, e in existing.items() if key not in docs]
+    if stale:
+        SearchEntry.objects.filter(pk__in=stale).delete()
+
+    new, changed, now = [], [], timezone.now()
+    for (pk, owner_id), fields in docs.items():
+        entry = existing.get((pk, owner_id))
+        if entry is None:
+            new.append(SearchEntry(kind=kind, object_id=pk, owner_id=owner_id, **fields))
+        elif any(getattr(entry, k) != v for k, v in fields.items()):
+            for k, v in fields.items():
+                setattr(entry, k, v)
+            entry.updated_at = now
+            changed.append(entry)
+    if new:
+        SearchEntry.objects.bulk_create(new, ignore_conflicts=True)
+    if changed:
+        SearchEntry.objects.bulk_update(changed, INDEXED_FIELDS + ['updated_at'])
+
+
+def index_object(kind, pk):
+    index_objects(kind, [pk])
+
+
+def remove_object(kind, pk):
+    SearchEntry.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def rebuild(owner=None, batch_size=2000):
+    """Rebuild the whole index (or one landlord's slice) with bulk inserts."""
+    scope = {
+        'tenant': 'leases__owner',
+        'property': 'owner',
+        'unit': 'property__owner',
+        'ticket': 'owner',
+        'payment': 'owner',
+    }
+    entries = SearchEntry.objects.all()
+    if owner is not None:
+        entries = entries.filter(owner=owner)
+    entries.delete()
+
+    total = 0
+    for kind, (queryset, build) in KINDS.items():
+        if owner is not None:
+            queryset = queryset.filter(**{scope[kind]: owner}).distinct()
+        batch = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            for owner_id, fields in build(obj).items():
+                if owner is None or owner_id == owner.pk:
+                    batch.append(SearchEntry(kind=kind, object_id=obj.pk, owner_id=owner_id, **fields))
+            if len(batch) >= batch_size:
+                total += len(SearchEntry.objects.bulk_create(batch))
+                batch = []
+        total += len(SearchEntry.objects.bulk_create(batch))
+    return total
+
+
+# ── Querying ───────────────────────────────────────────────────────────────────
+
+def search(landlord, query, kinds=None, limit=20):
+    """Ranked SearchEntry rows for `landlord` matching every word of `query`."""
+    words = WORD_RE.findall(query.lower())[:8]
+    if not words:
+        return []
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f"{w}:*" for w in words)
+        return list(SearchEntry.objects.raw(
+            """
+            SELECT e.id, e.kind, e.object_id, e.title, e.subtitle,
+                   ts_rank(e.search_vector, q) AS rank
+            FROM hostflow_searchentry e, to_tsquery('simple', %s) q
+            WHERE e.owner_id = %s AND e.kind = ANY(%s) AND e.search_vector @@ q
+            ORDER BY rank DESC, e.id
+            LIMIT %s
+            """,
+            [tsquery, landlord.pk, kinds, limit],
+        ))
+
+    if connection.vendor == 'sqlite':
+        match = ' AND '.join(f'"{w}"*' for w in words)
+        placeholders = ', '.join(['%s'] * len(kinds))
+        return list(SearchEntry.objects.raw(
+            f"""
+            SELECT e.id, e.kind, e.object_id, e.title, e.subtitle,
+                   -bm25(hostflow_searchentry_fts, 5.0, 1.0) AS rank
+            FROM hostflow_searchentry_fts
+            JOIN hostflow_searchentry e ON e.id = hostflow_searchentry_fts.rowid
+            WHERE hostflow_searchentry_fts MATCH %s AND e.owner_id = %s AND e.kind IN ({placeholders})
+            ORDER BY rank DESC, e.id
+            LIMIT %s
+            """,
+            [match, landlord.pk, *kinds, limit],
+        ))
+
+    entries = SearchEntry.objects.filter(owner=landlord, kind__in=kinds)
+    for word in words:
+        entries = entries.filter(Q(terms__icontains=word) | Q(keywords__icontains=word))
+    return list(entries.order_by('-updated_at')[:limit])
@@ -0,0 +1,168 @@
+"""
+HostFlow Signals
+================
+Keeps derived data in step with the models it is computed from.
+Connected in HostflowConfig.ready().
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import forecast, ledger, search
+from .models import User, Property, Unit, Lease, Payment, MaintenanceTicket, TicketComment
+
+
+# ── Property unit counters ─────────────────────────────────────────────────────
+# Property.unit_count / occupied_count move with F() so concurrent saves
+# cannot lose an update. A unit's occupancy is its status, which the lease
+# views flip when a lease starts or ends.
+
+def _shift_counters(counted_as, sign):
+    property_id, status = counted_as
+    changes = {'unit_count': F('unit_count') + sign}
+    if status == 'occupied':
+        changes['occupied_count'] = F('occupied_count') + sign
+    Property.objects.filter(pk=property_id).update(**changes)
+
+
+@receiver(post_save, sender=Unit)
+def count_unit(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, '_counted_as', None)
+    after = (instance.property_id, instance.status)
+    if not created and before is None:
+        return  # saved without being loaded; nothing to diff against
+    if before == after:
+        return
+    if before and before[0] == after[0]:
+        # status flip inside one property: a single UPDATE
+        Property.objects.filter(pk=after[0]).update(
+            occupied_count=F('occupied_count') + (1 if after[1] == 'occupied' else -1)
+        )
+    else:
+        if before:
+            _shift_counters(before, -1)
+        _shift_counters(after, 1)
+    instance._counted_as = after
+
+
+@receiver(post_delete, sender=Unit)
+def uncount_unit(sender, instance, origin=None, **kwargs):
+    # When a property (or its landlord) is being deleted, its counters go with it.
+    if isinstance(origin, Unit) or getattr(origin, 'model', None) is Unit:
+        _shift_counters(getattr(instance, '_counted_as', (instance.property_id, instance.status)), -1)
+
+
+# ── Search index ───────────────────────────────────────────────────────────────
+
+# what _tenant_docs reads; a save of other columns (say last_login on every login) leaves the entry as it is
+TENANT_SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'email', 'phone', 'role'}
+
+
+@receiver(post_save, sender=User)
+def index_tenant(sender, instance, raw=False, update_fields=None, **kwargs):
+    if update_fields is not None and not TENANT_SEARCH_FIELDS.intersection(update_fields):
+        return
+    if not raw and instance.role == 'tenant':
+        search.index_object('tenant', instance.pk)
+
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def index_lease_tenant(sender, instance, raw=False, **kwargs):
+    # A lease is what makes a tenant searchable by a landlord.
+    if not raw:
+        search.index_object('tenant', instance.tenant_id)
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object('property', instance.pk)
+        search.index_objects('unit', instance.units.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Unit)
+def index_unit(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object('unit', instance.pk)
+
+
+@receiver(post_save, sender=MaintenanceTicket)
+def index_ticket(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object('ticket', instance.pk)
+
+
+@receiver(post_save, sender=TicketComment)
+@receiver(post_delete, sender=TicketComment)
+def index_ticket_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object('ticket', instance.ticket_id)
+
+
+@receiver(post_save, sender=Payment)
+def index_payment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object('payment', instance.pk)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Unit)
+@receiver(post_delete, sender=MaintenanceTicket)
+@receiver(post_delete, sender=Payment)
+def unindex(sender, instance, **kwargs):
+    kind = {User: 'tenant', Property: 'property', Unit: 'unit',
+            MaintenanceTicket: 'ticket', Payment: 'payment'}[sender]
+    search.remove_object(kind, instance.pk)
+
+
+# ── Tenant ledger cache ────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_ledger_for_payment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        if Payment.lease.is_cached(instance):
+            tenant_id = instance.lease.tenant_id
+        else:
+            tenant_id = Lease.all_objects.filter(pk=instance.lease_id).values_list('tenant_id', flat=True).first()
+        if tenant_id:
+            ledger.invalidate(tenant_id)
+
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def invalidate_ledger_for_lease(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ledger.invalidate(instance.tenant_id)
+
+
+@receiver(post_save, sender=MaintenanceTicket)
+@receiver(post_delete, sender=MaintenanceTicket)
+def invalidate_ledger_for_ticket(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ledger.invalidate(instance.submitted_by_id)
+
+
+# ── Cash-flow forecast cache ───────────────────────────────────────────────────
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def invalidate_forecast_for_lease(sender, instance, raw=False, **kwargs):
+    if not raw:
+        forecast.invalidate(instance.owner_id)
+
+
+@receiver(post_save, sender=Unit)
+def invalidate_forecast_for_unit(sender, instance, raw=False, created=False, **kwargs):
+    # a new unit has no lease yet; an edited one may have a new rent or rent type
+    if not raw and not created:
+        if Unit.property.is_cached(instance):
+            owner_id = instance.property.owner_id
+        else:
+            owner_id = Property.objects.filter(pk=instance.property_id).values_list('owner_id', flat=True).first()
+        forecast.invalidate(owner_id)
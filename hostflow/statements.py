@@ -0,0 +1,235 @@
+"""
+HostFlow Monthly Statements
+───────────────────────────
+Every lease gets a statement per billing month – opening balance, rent
+charged (``Payment.amount_due``), late fees, payments received, closing
+balance and one line per payment – written to storage and linked from the
+tenant portal. ``manage.py generate_statements --month 2026-09`` does the
+whole portfolio in one run:
+
+* Leases are read in keyset chunks of CHUNK_SIZE primary keys. Each chunk
+  takes three set-based queries, however many leases it holds: the leases
+  with tenant, unit and property; one row of conditional SUMs per lease for
+  the balances; and the month's payment lines.
+* Rendering and writing the files is spread over a ProcessPoolExecutor. The
+  next chunk is loaded while the pool works on the current one, and no more
+  than two chunks are held at once, so memory stays flat at 100k leases.
+* Statement rows are bulk-inserted per chunk. Leases that already have the
+  month's statement are skipped, so a run that was stopped resumes where it
+  left off; --force regenerates the month.
+
+Amounts follow the payment rows. A charge and its recorded late fee fall in
+the month of the due date. A payment falls in the month it was paid, or the
+month it was due while a part-payment has no paid date yet.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import F, Q, Sum
+
+from . import ledger
+from .models import Lease, Payment, Statement
+
+CHUNK_SIZE = 2000
+SLICES_PER_PROCESS = 2  # pool tasks per process and chunk, so a slow slice does not idle the rest
+ZERO = Decimal('0.00')
+RULE = '-' * 46
+
+
+def month_bounds(month):
+    """First and last day of the month containing `month`."""
+    start = month.replace(day=1)
+    return start, start + relativedelta(months=1) - timedelta(days=1)
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def _paid_by(day):
+    return Q(paid_date__lte=day) | Q(paid_date__isnull=True, due_date__lte=day)
+
+
+def load_chunk(start, end, after=0, chunk_size=CHUNK_SIZE):
+    """Statement data for the next `chunk_size` leases after pk `after` that ran in the month and have none yet."""
+    leases = Lease.all_objects.filter(pk__gt=after, start_date__lte=end, end_date__gte=start)
+    rows = list(leases.exclude(statements__month=start).order_by('pk').values(
+        'pk', 'tenant_id', 'tenant__username', 'tenant__first_name', 'tenant__last_name',
+        'unit__unit_number', 'unit__property__name',
+    )[:chunk_size])
+    if not rows:
+        return []
+    ids = [row['pk'] for row in rows]
+    before = start - timedelta(days=1)
+
+    totals = {
+        row.pop('lease_id'): row for row in
+        Payment.all_objects.filter(lease_id__in=ids).values('lease_id').annotate(
+            billed_before=Sum(F('amount_due') + F('late_fee'), filter=Q(due_date__lt=start)),
+            paid_before=Sum('amount_paid', filter=_paid_by(before)),
+            charges=Sum('amount_due', filter=Q(due_date__range=(start, end))),
+            late_fees=Sum('late_fee', filter=Q(due_date__range=(start, end))),
+            paid_to_end=Sum('amount_paid', filter=_paid_by(end)),
+        ).order_by()
+    }
+    lines = {}
+    for line in Payment.all_objects.filter(
+        Q(due_date__range=(start, end)) | Q(paid_date__range=(start, end)), lease_id__in=ids,
+    ).order_by('lease_id', 'due_date', 'pk').values(
+        'lease_id', 'due_date', 'amount_due', 'late_fee', 'amount_paid', 'paid_date', 'receipt_number',
+    ):
+        lines.setdefault(line.pop('lease_id'), []).append(line)
+
+    statements = []
+    for row in rows:
+        total = {key: value or ZERO for key, value in totals.get(row['pk'], {}).items()}
+        opening = total.get('billed_before', ZERO) - total.get('paid_before', ZERO)
+        charges, late_fees = total.get('charges', ZERO), total.get('late_fees', ZERO)
+        payments = total.get('paid_to_end', ZERO) - total.get('paid_before', ZERO)
+        name = f"{row['tenant__first_name']} {row['tenant__last_name']}".strip()
+        statements.append({
+            'lease_id': row['pk'],
+            'tenant_id': row['tenant_id'],
+            'tenant': name or row['tenant__username'],
+            'property': row['unit__property__name'],
+            'unit': row['unit__unit_number'],
+            'month': start,
+            'end': end,
+            'opening_balance': opening,
+            'charges': charges,
+            'late_fees': late_fees,
+            'payments': payments,
+            'closing_balance': opening + charges + late_fees - payments,
+            'lines': lines.get(row['pk'], []),
+        })
+    return statements
+
+
+# ── Rendering ──────────────────────────────────────────────────────────────────
+
+def _amount(label, value):
+    return f"{label:<30}₹{value:>14,.2f}"
+
+
+def render(statement):
+    lines = [
+        '=' * 46,
+        f"HOSTFLOW STATEMENT – {statement['month']:%B %Y}".center(46),
+        '=' * 46,
+        f"Tenant      : {statement['tenant']}",
+        f"Property    : {statement['property']}",
+        f"Unit        : {statement['unit']}",
+        f"Period      : {statement['month']:%d %b %Y} – {statement['end']:%d %b %Y}",
+        RULE,
+        _amount('Opening balance', statement['opening_balance']),
+    ]
+    for line in statement['lines']:
+        if statement['month'] <= line['due_date'] <= statement['end']:
+            lines.append(_amount(f"Rent due {line['due_date']:%d %b}", line['amount_due']))
+            if line['late_fee']:
+                lines.append(_amount('  Late fee', line['late_fee']))
+        paid_on = line['paid_date'] or line['due_date']
+        if line['amount_paid'] and statement['month'] <= paid_on <= statement['end']:
+            receipt = f" ({line['receipt_number']})" if line['receipt_number'] else ''
+            lines.append(_amount(f"Paid {paid_on:%d %b}{receipt}", -line['amount_paid']))
+    lines += [
+        RULE,
+        _amount('Charges', statement['charges']),
+        _amount('Late fees', statement['late_fees']),
+        _amount('Payments', -statement['payments']),
+        _amount('Closing balance', statement['closing_balance']),
+        '=' * 46,
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def file_name(statement):
+    return f"statements/{statement['month']:%Y-%m}/lease-{statement['lease_id']}.txt"
+
+
+def write_statements(statements):
+    """Render and store `statements`; runs in the pool. Returns {lease id: file name}."""
+    names = {}
+    for statement in statements:
+        name = file_name(statement)
+        default_storage.delete(name)  # a file left by an interrupted run
+        names[statement['lease_id']] = default_storage.save(name, ContentFile(render(statement).encode()))
+    return names
+
+
+# ── Generating ─────────────────────────────────────────────────────────────────
+
+def _store(statements, names):
+    Statement.objects.bulk_create([
+        Statement(
+            lease_id=s['lease_id'], month=s['month'], file=names[s['lease_id']],
+            **{key: s[key] for key in ('opening_balance', 'charges', 'late_fees', 'payments', 'closing_balance')},
+        ) for s in statements
+    ])
+    # bulk_create sends no signals; the tenants' cached ledgers list statements
+    ledger.invalidate_many({s['tenant_id'] for s in statements})
+
+
+def _clear(start):
+    stale = Statement.objects.filter(month=start)
+    for name in stale.values_list('file', flat=True).iterator():
+        default_storage.delete(name)
+    stale.delete()
+
+
+def generate(month, processes=None, chunk_size=CHUNK_SIZE, force=False):
+    """Write the statements for `month`; `processes=0` renders in this process.
+
+    Returns {'statements', 'lines', 'seconds'}.
+    """
+    start, end = month_bounds(month)
+    if force:
+        _clear(start)
+    stats = {'statements': 0, 'lines': 0}
+    started = time.perf_counter()
+
+    pool = None
+    if processes != 0:
+        processes = processes or os.cpu_count()
+        # fork every worker now, while no database connection is open for them to inherit
+        connections.close_all()
+        pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('fork'))
+        pool.submit(int).result()
+
+    def submit(chunk):
+        if pool is None:
+            return [write_statements(chunk)]
+        size = math.ceil(len(chunk) / (processes * SLICES_PER_PROCESS))
+        return [pool.submit(write_statements, chunk[i:i + size]) for i in range(0, len(chunk), size)]
+
+    def finish(chunk, results):
+        names = {}
+        for result in results:
+            names.update(result if pool is None else result.result())
+        _store(chunk, names)
+        stats['statements'] += len(chunk)
+        stats['lines'] += sum(len(s['lines']) for s in chunk)
+
+    in_flight, after = None, 0
+    try:
+        while True:
+            chunk = load_chunk(start, end, after, chunk_size)  # while the pool renders the last one
+            if in_flight:
+                finish(*in_flight)
+            if not chunk:
+                break
+            after = chunk[-1]['lease_id']
+            in_flight = (chunk, submit(chunk))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,14 @@
+// Loader
+window.onload = () => {
+    document.getElementById('loader').style.display = 'none';
+};
+
+// Scroll animation
+const fades = document.querySelectorAll('.fade');
+window.addEventListener('scroll', () => {
+    fades.forEach(el => {
+        if(el.getBoundingClientRect().top < window.innerHeight - 100){
+            el.classList.add('show');
+        }
+    });
+});
@@ -0,0 +1,80 @@
+let isVerified = false;
+
+function togglePassword(){
+    const input=document.getElementById("password");
+    input.type=input.type==="password"?"text":"password";
+}
+
+function csrf(){return document.querySelector('[name=csrfmiddlewaretoken]').value;}
+function next(el){if(el.value && el.nextElementSibling) el.nextElementSibling.focus();}
+function back(e,el){if(e.key==="Backspace" && !el.value && el.previousElementSibling){el.previousElementSibling.focus();}}
+
+function getOtp(containerId){
+    let otp="";
+    document.querySelectorAll(`#${containerId} .otp`).forEach(i=>otp+=i.value);
+    return otp;
+}
+
+function startTimer(type){
+    let t=30;
+    let timerEl = document.getElementById(type+"Timer");
+    let resendBtn = document.getElementById(type+"Resend");
+    let id=setInterval(()=>{
+        timerEl.innerText="Resend in "+t+"s";
+        t--;
+        if(t<0){
+            clearInterval(id);
+            resendBtn.disabled=false;
+            timerEl.innerText="";
+        }
+    },1000);
+}
+
+function sendEmailOtp(){
+    const emailVal = document.getElementById("email").value;
+    if(!emailVal) { alert("Please enter email"); return; }
+    fetch("/send-email-otp/",{
+        method:"POST",
+        headers:{"Content-Type":"application/json","X-CSRFToken":csrf()},
+        body:JSON.stringify({email:emailVal})
+    })
+    .then(r=>r.json())
+    .then(d=>{
+        if(d.status === 'success'){
+            document.getElementById("emailOtpBox").style.display="block";
+            document.getElementById("emailResend").disabled=true;
+            startTimer("email");
+        } else {
+            alert("Error: " + (d.message || "Could not send OTP"));
+        }
+    });
+}
+
+function verifyEmailOtp(){
+    fetch("/verify-email-otp/",{
+        method:"POST",
+        headers:{"Content-Type":"application/json","X-CSRFToken":csrf()},
+        body:JSON.stringify({email:document.getElementById("email").value, otp:getOtp('emailOtpInputs')})
+    })
+    .then(r=>r.json())
+    .then(d=>{
+        const status = document.getElementById("emailStatus");
+        if(d.status === "success"){
+            status.innerText="Verified ✓";
+            status.style.color = "green";
+            isVerified = true;
+        } else {
+            status.innerText=d.message || "Invalid OTP";
+            status.style.color = "red";
+            isVerified = false;
+        }
+    });
+}
+
+// Prevent form submission if not verified
+document.getElementById('regForm').onsubmit = function(e) {
+    if(!isVerified) {
+        e.preventDefault();
+        alert("Please verify your email first!");
+    }
+};
@@ -0,0 +1,21 @@
+var monthly = JSON.parse(document.getElementById('monthly-data').textContent);
+var props   = JSON.parse(document.getElementById('prop-revenue').textContent);
+
+new Chart(document.getElementById('incomeChart'), {
+  type: 'bar',
+  data: {
+    labels: monthly.map(d => d.month),
+    datasets: [{ label: 'Income (₹)', data: monthly.map(d => d.total),
+                 backgroundColor: '#e9456088', borderColor: '#e94560', borderWidth:1 }]
+  },
+  options: { plugins: { legend: { display: false } } }
+});
+
+new Chart(document.getElementById('propChart'), {
+  type: 'doughnut',
+  data: {
+    labels: props.map(p => p.name),
+    datasets: [{ data: props.map(p => p.revenue),
+                 backgroundColor: ['#e94560','#0d6efd','#198754','#fd7e14','#6f42c1'] }]
+  }
+});
@@ -0,0 +1,36 @@
+// Tenant autocomplete for every .tenant-picker on the page (TenantAutocompleteWidget).
+document.querySelectorAll('.tenant-picker').forEach(function (picker) {
+  const id = picker.querySelector('.tenant-picker-id');
+  const search = picker.querySelector('.tenant-picker-search');
+  const results = picker.querySelector('.tenant-picker-results');
+  let timer;
+  let latest = 0;  // only the newest request may fill the list; a slow earlier one is dropped
+
+  function show(tenants) {
+    results.replaceChildren(...tenants.map(function (tenant) {
+      const item = document.createElement('button');
+      item.type = 'button';
+      item.className = 'list-group-item list-group-item-action small';
+      item.textContent = tenant.label;
+      item.addEventListener('click', function () {
+        id.value = tenant.id;
+        search.value = tenant.label;
+        results.replaceChildren();
+      });
+      return item;
+    }));
+  }
+
+  search.addEventListener('input', function () {
+    id.value = '';
+    clearTimeout(timer);
+    timer = setTimeout(async function () {
+      const request = ++latest;
+      const response = await fetch(picker.dataset.url + '?q=' + encodeURIComponent(search.value));
+      const data = await response.json();
+      if (request === latest) {
+        show(data.results);
+      }
+    }, 150);
+  });
+});
@@ -0,0 +1,235 @@
+"""
+HostFlow Task Queue
+───────────────────
+Slow work – mail, image processing – runs outside the request, on a queue
+kept in the database itself (the ``Task`` table), so there is no broker to
+deploy:
+
+    @task(queue='mail')
+    def send_code(email, code): ...
+
+    send_code.enqueue('new@example.com', '123456')
+
+* ``enqueue`` inserts the row in the caller's transaction, so workers see it
+  only once that commits – a task never runs against rows the request has
+  not committed or rolled back – and it cannot be lost between the commit
+  and a separate ``on_commit`` hook. Arguments must be JSON: pass primary
+  keys, not model instances.
+* ``manage.py run_workers --processes N`` forks N workers. Each claims up to
+  TASK_BATCH_SIZE due tasks with ``SELECT … FOR UPDATE SKIP LOCKED`` and
+  marks them running in one short transaction – workers never wait on each
+  other's rows – then runs them one by one outside any transaction.
+* A task that returns is deleted, together with the rest of its batch once
+  that is through – delivery is at-least-once, so a worker killed mid-batch
+  means those tasks run again and should be safe to repeat. One that raises is retried after
+  TASK_RETRY_BACKOFF · 2^(attempt-1) seconds (capped at
+  TASK_RETRY_BACKOFF_MAX, with jitter); after ``max_attempts`` it stays
+  'dead' with its traceback, for the admin to inspect and requeue.
+* TASK_QUEUES caps how many tasks of a queue run at once across all workers
+  (say, two SMTP connections); a worker takes those one per claim. On
+  PostgreSQL claims for a capped queue take a transaction-level advisory
+  lock, so the running count they check is exact.
+* A task still 'running' after TASK_VISIBILITY_TIMEOUT belonged to a worker
+  that died; it goes back on the queue, the lost run counting as an attempt.
+
+SQLite ignores FOR UPDATE; there its single write lock serialises the
+claims instead.
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+import uuid
+import zlib
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}  # task name → function
+
+
+# ── Declaring & enqueueing ─────────────────────────────────────────────────────
+
+def task(queue='default', max_attempts=5):
+    """Register a function as a task; adds ``func.enqueue(*args, **kwargs)``."""
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        REGISTRY[name] = func
+        func.task_name = name
+        func.enqueue = lambda *args, **kwargs: enqueue(
+            name, args, kwargs, queue=queue, max_attempts=max_attempts
+        )
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, queue='default', max_attempts=5, delay=0):
+    return Task.objects.create(
+        name=name, queue=queue, args=list(args), kwargs=kwargs or {}, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def resolve(name):
+    if name not in REGISTRY:
+        import_module(name.rpartition('.')[0])  # registers the module's tasks
+    return REGISTRY[name]
+
+
+# ── Claiming ───────────────────────────────────────────────────────────────────
+
+def _caps():
+    return {queue: conf['concurrency'] for queue, conf in settings.TASK_QUEUES.items() if conf.get('concurrency')}
+
+
+def _lock_queue(queue):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(f'hostflow.task:{queue}'.encode())])
+
+
+def _take(due, limit, token):
+    # one UPDATE … WHERE id IN (SELECT … FOR UPDATE SKIP LOCKED LIMIT n): it writes from its
+    # first step, so even SQLite claims never deadlock upgrading a read lock
+    ids = due.select_for_update(skip_locked=True).order_by('run_at').values('pk')[:limit]
+    return Task.objects.filter(pk__in=ids).update(
+        status='running', locked_by=token, locked_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+
+
+def claim(worker_id, queues=None, limit=None):
+    """Mark up to `limit` due tasks running for `worker_id` and return them, oldest first."""
+    limit = limit or settings.TASK_BATCH_SIZE
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    due = Task.objects.filter(status='pending', run_at__lte=timezone.now())
+    if queues:
+        due = due.filter(queue__in=queues)
+    caps = _caps()
+
+    with transaction.atomic():
+        taken = _take(due.exclude(queue__in=list(caps)), limit, token)
+    for queue, cap in caps.items():
+        if taken >= limit:
+            break
+        if queues and queue not in queues:
+            continue
+        with transaction.atomic():
+            _lock_queue(queue)
+            # one at a time: a batch runs serially, so a second one would only sit on a slot
+            room = min(1, cap - Task.objects.filter(queue=queue, status='running').count())
+            if room > 0:
+                taken += _take(due.filter(queue=queue), room, token)
+
+    if not taken:
+        return []
+    return list(Task.objects.filter(locked_by=token, status='running').order_by('run_at', 'pk'))
+
+
+def requeue_stale():
+    """Return tasks whose worker died to the queue (or the dead letters); returns how many."""
+    stale = Task.objects.filter(
+        status='running', locked_at__lt=timezone.now() - timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT)
+    )
+    lost = 'Worker stopped responding while running this task.'
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(status='dead', locked_by='', last_error=lost)
+    return dead + stale.update(status='pending', locked_by='', run_at=timezone.now(), last_error=lost)
+
+
+# ── Running ────────────────────────────────────────────────────────────────────
+
+def backoff(attempt):
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempt - 1), settings.TASK_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)  # spread out tasks that failed together
+
+
+def execute(item):
+    """Run one claimed task; True if it succeeded (the caller then deletes it)."""
+    mine = Task.objects.filter(pk=item.pk, locked_by=item.locked_by)
+    try:
+        resolve(item.name)(*item.args, **item.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if item.attempts >= item.max_attempts:
+            logger.error("Task %s failed %d times; giving up:\n%s", item, item.attempts, error)
+            mine.update(status='dead', locked_by='', last_error=error)
+        else:
+            logger.warning("Task %s failed (attempt %d of %d)", item, item.attempts, item.max_attempts, exc_info=True)
+            retry_at = timezone.now() + timedelta(seconds=backoff(item.attempts))
+            mine.update(status='pending', locked_by='', run_at=retry_at, last_error=error)
+        return False
+    return True
+
+
+class Worker:
+    def __init__(self, queues=None, batch_size=None, poll_interval=1.0, name=None):
+        self.queues = queues
+        self.batch_size = batch_size or settings.TASK_BATCH_SIZE
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        self.done = self.failed = 0
+
+    def stop(self, *args):
+        self.stopping = True  # finish the task in hand, then exit
+
+    def run_once(self):
+        """Claim and run one batch; returns its size."""
+        batch, succeeded = claim(self.name, self.queues, self.batch_size), []
+        for item in batch:
+            if self.stopping:  # hand the rest of the batch straight back
+                Task.objects.filter(pk=item.pk, locked_by=item.locked_by).update(
+                    status='pending', locked_by='', attempts=F('attempts') - 1
+                )
+                continue
+            if execute(item):
+                succeeded.append(item.pk)
+            else:
+                self.failed += 1
+        Task.objects.filter(pk__in=succeeded).delete()  # one write per batch, not per task
+        self.done += len(succeeded)
+        return len(batch)
+
+    def anything_due(self):
+        due = Task.objects.filter(status='pending', run_at__lte=timezone.now())
+        return (due.filter(queue__in=self.queues) if self.queues else due).exists()
+
+    def run(self, burst=False):
+        """Work until stopped, or with `burst` until nothing is due."""
+        next_sweep = 0
+        while not self.stopping:
+            try:
+                if time.monotonic() >= next_sweep:
+                    requeue_stale()
+                    next_sweep = time.monotonic() + settings.TASK_VISIBILITY_TIMEOUT / 2
+                worked = self.run_once()
+            except DatabaseError:  # a restart or failover should not take the worker down
+                logger.warning("Worker %s lost the database; retrying", self.name, exc_info=True)
+                connection.close()
+                worked = 0
+            if not worked:
+                if burst and not self.anything_due():  # not just a claim lost to another worker
+                    break
+                close_old_connections()  # while idle, not per batch: reconnecting costs more than a task
+                time.sleep(self.poll_interval)
+        return self.done, self.failed
+
+    def handle_signals(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+
+def run_pending(queues=None):
+    """Run everything that is due in this process (tests, one-off scripts)."""
+    return Worker(queues=queues).run(burst=True)
@@ -0,0 +1,50 @@
+"""
+HostFlow Tenant Directory
+─────────────────────────
+Which tenants a landlord may pick for a lease, and the prefix search behind
+the lease form's tenant autocomplete.
+
+A landlord sees the tenants they created (``User.created_by``) and anyone
+they have leased to. Matching is a case-insensitive prefix on username or
+email, or a prefix on phone: ``lower(col) LIKE 'q%'``. On PostgreSQL the
+``user_*_lower`` / ``user_phone`` indexes are built with
+``text_pattern_ops`` (migration 0018), which serve LIKE prefixes under any
+database collation; a plain range bound such as ``q || U+FFFF`` only
+holds under C collation.
+"""
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import User, Lease
+
+AUTOCOMPLETE_LIMIT = 10
+MAX_QUERY_LENGTH = 64
+
+
+def tenants_for(landlord):
+    """Tenants `landlord` created or has (had) a lease with."""
+    leased = Lease.all_objects.filter(owner=landlord).values('tenant_id')
+    return User.objects.filter(role='tenant').filter(Q(created_by=landlord) | Q(pk__in=leased))
+
+
+def _prefix(field, prefix):
+    return Q(**{f'{field}__startswith': prefix})
+
+
+def autocomplete(landlord, query, limit=AUTOCOMPLETE_LIMIT):
+    """Up to `limit` of the landlord's tenants whose username, email or phone starts with `query`."""
+    prefix = query.strip().lower()[:MAX_QUERY_LENGTH]
+    tenants = tenants_for(landlord)
+    if prefix:
+        tenants = tenants.alias(username_lower=Lower('username'), email_lower=Lower('email')).filter(
+            _prefix('username_lower', prefix) | _prefix('email_lower', prefix) | _prefix('phone', prefix)
+        )
+    return list(tenants.order_by('username').values('id', 'username', 'email', 'phone')[:limit])
+
+
+def label(tenant):
+    """What the picker shows for a tenant (dict from autocomplete() or a User)."""
+    get = tenant.get if isinstance(tenant, dict) else lambda key: getattr(tenant, key)
+    details = ' · '.join(filter(None, [get('email'), get('phone')]))
+    return f"{get('username')} ({details})" if details else get('username')
@@ -0,0 +1,24 @@
+"""
+HostFlow Test Helpers
+=====================
+Query-budget assertions built on RequestMetricsMiddleware.
+"""
+
+from .metrics import get_query_budget
+
+
+class QueryBudgetMixin:
+    """Mix into a TestCase to check responses against their view's @query_budget."""
+
+    def assertWithinQueryBudget(self, response):
+        request = response.wsgi_request
+        match = request.resolver_match
+        budget = get_query_budget(match.func)
+        if budget is None:
+            self.fail(f"View '{match.view_name}' declares no @query_budget.")
+        used = request.metrics.queries
+        self.assertLessEqual(
+            used, budget,
+            f"View '{match.view_name}' ran {used} queries, over its budget of {budget}."
+        )
+        return used
@@ -5,13 +5,38 @@ Covers: Auth, Tenant isolation, Payment logic, Late fee, API endpoints.
 Run with: python manage.py test hostflow
 """
 
-from django.test import TestCase, Client
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections, router, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
 from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+import jwt
+import re
+import json, os, subprocess, sys, tempfile, threading, time
 
-from .models import User, Property, Unit, Lease, Payment, MaintenanceTicket
+from .models import (
+    User, Property, Unit, Lease, Payment, MaintenanceTicket, TicketComment, Booking, Notification, AuditLog,
+    SearchEntry, DeletionJob, Task, NotificationPreference, MessageDelivery, Statement, RentRevision, RentHistory,
+    PaymentCapture,
+)
+from . import api, arrears, deletion, forecast, ledger, media, notify, otp, payments, rent, routing, statements, tasks, tickets
+from .views import generate_rent
+from .ratelimit import SlidingWindow
+from .metrics import registry
+from .testing import QueryBudgetMixin
 
 
 def make_landlord(username='landlord1', password='testpass123'):
@@ -204,3 +229,1762 @@ class DBConstraintTests(TestCase):
         make_unit(self.prop, 'A1')
         unit2 = make_unit(prop2, 'A1')   # should succeed
         self.assertIsNotNone(unit2.pk)
+
+
+# ── Query Budget & Metrics Tests ───────────────────────────────────────────────
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every list view must stay within its budget however many rows it shows."""
+
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.tenant   = make_tenant()
+        for p in range(3):
+            prop = Property.objects.create(owner=self.landlord, name=f'Prop {p}', address='x', city='Pune')
+            for u in range(3):
+                unit = make_unit(prop, f'U{u}')
+                tenant = self.tenant if (p, u) == (0, 0) else make_tenant(f'tenant_{p}_{u}')
+                lease = make_lease(unit, tenant)
+                for m in range(3):
+                    Payment.objects.create(
+                        lease=lease, amount_due=Decimal('5000'),
+                        due_date=date.today() - timedelta(days=30 * m + 1),
+                    )
+                ticket = MaintenanceTicket.objects.create(
+                    unit=unit, submitted_by=tenant, title='Leak', description='Pipe'
+                )
+                TicketComment.objects.create(ticket=ticket, author=self.landlord, content='On it')
+
+    def test_landlord_views_within_budget(self):
+        self.client.force_login(self.landlord)
+        for name in ['dashboard', 'lease_list', 'payment_list', 'reports',
+                     'export_csv', 'ticket_list', 'notification_list', 'audit_logs']:
+            with self.subTest(view=name):
+                self.assertWithinQueryBudget(self.client.get(reverse(name)))
+
+    def test_tenant_portal_within_budget(self):
+        self.client.force_login(self.tenant)
+        self.assertWithinQueryBudget(self.client.get(reverse('tenant_portal')))
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_metrics_requires_staff(self):
+        self.client.force_login(make_landlord())
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_metrics_reports_per_view_counters(self):
+        landlord = make_landlord()
+        self.client.force_login(landlord)
+        self.client.get(reverse('lease_list'))
+        landlord.is_staff = True
+        landlord.save()
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('hostflow_requests_total{view="lease_list"} 1', body)
+        self.assertIn('hostflow_db_queries_total{view="lease_list"}', body)
+        self.assertIn('hostflow_request_duration_seconds_bucket{view="lease_list",le="+Inf"} 1', body)
+
+
+# ── Load-test Tooling Tests ────────────────────────────────────────────────────
+
+class PortfolioGeneratorTests(TestCase):
+    def test_generates_requested_shape(self):
+        call_command('generate_portfolio', landlords=2, properties=2, units=5,
+                     occupancy=1.0, tickets=1, comments=2, stdout=StringIO())
+        self.assertEqual(User.objects.filter(role='landlord', username__startswith='bench_').count(), 2)
+        self.assertEqual(Unit.objects.count(), 20)
+        self.assertEqual(Lease.objects.filter(status='active').count(), 20)
+        self.assertEqual(TicketComment.objects.count(), 40)
+        # a year of monthly history per lease, current month included
+        self.assertGreaterEqual(Payment.objects.count(), 20 * 12)
+        self.assertFalse(Payment.objects.filter(status='paid', paid_date__isnull=True).exists())
+
+    def test_benchmark_writes_json_results(self):
+        call_command('generate_portfolio', landlords=1, properties=1, units=3,
+                     occupancy=1.0, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, 'bench.json')
+            call_command('run_benchmarks', views='dashboard,tenant_portal', repeat=2, warmup=0,
+                         output=out, stdout=StringIO())
+            with open(out) as fh:
+                report = json.load(fh)
+        self.assertEqual(report['meta']['units'], 3)
+        self.assertEqual(report['views']['dashboard']['status'], [200])
+        self.assertGreater(report['views']['tenant_portal']['queries_max'], 0)
+
+
+# ── Ticket Board Tests ─────────────────────────────────────────────────────────
+
+class TicketBoardTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.tenant   = make_tenant()
+        self.prop     = make_property(self.landlord)
+        self.unit     = make_unit(self.prop)
+        make_lease(self.unit, self.tenant)
+
+    def make_ticket(self, title, priority='medium', hours_old=0, status='open'):
+        ticket = MaintenanceTicket.objects.create(
+            unit=self.unit, submitted_by=self.tenant, title=title,
+            description='x', priority=priority, status=status,
+        )
+        MaintenanceTicket.objects.filter(pk=ticket.pk).update(
+            created_at=timezone.now() - timedelta(hours=hours_old)
+        )
+        return ticket
+
+    def test_priority_outranks_recent_age(self):
+        from .tickets import board_page
+        self.make_ticket('old low', 'low', hours_old=10)
+        self.make_ticket('new high', 'high', hours_old=1)
+        self.make_ticket('ancient low', 'low', hours_old=100)
+        self.make_ticket('done', 'high', hours_old=200, status='resolved')
+        tickets, _ = board_page(self.landlord)
+        self.assertEqual([t.title for t in tickets], ['ancient low', 'new high', 'old low'])
+
+    def test_keyset_pages_cover_every_ticket_once(self):
+        from .tickets import board_page
+        for i in range(7):
+            self.make_ticket(f'T{i}', ['low', 'medium', 'high'][i % 3], hours_old=i * 5)
+        seen, cursor = [], None
+        while True:
+            page, cursor = board_page(self.landlord, cursor=cursor, page_size=3, status='all')
+            seen += [t.pk for t in page]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_board_api_filters_and_budget(self):
+        self.make_ticket('Leak', 'high')
+        self.make_ticket('Paint', 'low')
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('ticket_board_api'), {'priority': 'high'})
+        self.assertWithinQueryBudget(response)
+        self.assertEqual([t['title'] for t in response.json()['results']], ['Leak'])
+        self.assertEqual(self.client.get(reverse('ticket_board_api'), {'cursor': '!!'}).status_code, 400)
+
+    def test_ticket_detail_budget_and_isolation(self):
+        ticket = self.make_ticket('Leak')
+        for _ in range(3):
+            TicketComment.objects.create(ticket=ticket, author=self.tenant, content='Still leaking')
+        self.client.force_login(self.landlord)
+        self.assertWithinQueryBudget(self.client.get(reverse('ticket_detail', args=[ticket.pk])))
+        self.client.force_login(make_landlord('ll_other'))
+        self.assertEqual(self.client.get(reverse('ticket_detail', args=[ticket.pk])).status_code, 404)
+
+    def test_tenant_cannot_open_board(self):
+        self.client.force_login(self.tenant)
+        self.assertEqual(self.client.get(reverse('ticket_list')).status_code, 302)
+
+
+# ── Search Tests ───────────────────────────────────────────────────────────────
+
+class SearchTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.tenant   = make_tenant('priya')
+        self.prop     = make_property(self.landlord)
+        self.unit     = make_unit(self.prop, 'B12')
+        self.lease    = make_lease(self.unit, self.tenant)
+
+    def search(self, q, user=None):
+        from .search import search
+        return [(r.kind, r.object_id) for r in search(user or self.landlord, q)]
+
+    def test_finds_tenant_unit_and_payment_ids(self):
+        payment = Payment.objects.create(
+            lease=self.lease, amount_due=Decimal('5000'), due_date=date.today(),
+            razorpay_payment_id='pay_29QQoUBi66xm2f',
+        )
+        self.assertIn(('tenant', self.tenant.pk), self.search('priya'))
+        self.assertIn(('tenant', self.tenant.pk), self.search('priya@test.com'))
+        self.assertIn(('unit', self.unit.pk), self.search('unit b12'))
+        self.assertEqual(self.search('pay_29QQoUBi66xm2f'), [('payment', payment.pk)])
+
+    def test_ticket_comments_are_searchable_and_kept_current(self):
+        ticket = MaintenanceTicket.objects.create(
+            unit=self.unit, submitted_by=self.tenant, title='Geyser', description='No hot water'
+        )
+        self.assertEqual(self.search('plumber'), [])
+        comment = TicketComment.objects.create(ticket=ticket, author=self.landlord, content='Plumber booked')
+        self.assertEqual(self.search('plumber'), [('ticket', ticket.pk)])
+        comment.delete()
+        self.assertEqual(self.search('plumber'), [])
+        ticket.delete()
+        self.assertEqual(self.search('geyser'), [])
+
+    def test_login_does_not_reindex_the_tenant(self):
+        with mock.patch('hostflow.signals.search.index_object') as index:
+            self.assertTrue(self.client.login(username='priya', password='testpass123'))
+            index.assert_not_called()
+            self.tenant.phone = '9876500000'
+            self.tenant.save(update_fields=['phone'])
+            index.assert_called_once_with('tenant', self.tenant.pk)
+
+    def test_results_are_scoped_by_landlord(self):
+        other = make_landlord('ll_other')
+        self.assertEqual(self.search('priya', user=other), [])
+        self.assertEqual(self.search('delhi', user=other), [])
+
+    def test_rebuild_matches_signal_maintained_index(self):
+        from .models import SearchEntry
+        before = set(SearchEntry.objects.values_list('kind', 'object_id', 'owner_id'))
+        call_command('rebuild_search_index', stdout=StringIO())
+        after = set(SearchEntry.objects.values_list('kind', 'object_id', 'owner_id'))
+        self.assertEqual(before, after)
+        self.assertIn(('tenant', self.tenant.pk), self.search('priya'))
+
+    def test_search_api_within_budget(self):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('search_api'), {'q': 'b12'})
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(response.json()['results'][0]['url'], reverse('unit_edit', args=[self.unit.pk]))
+
+
+# ── Tenant Ledger Tests ────────────────────────────────────────────────────────
+
+class TenantLedgerTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.tenant   = make_tenant()
+        self.unit     = make_unit(make_property(self.landlord))
+        self.lease    = make_lease(self.unit, self.tenant)
+        today = timezone.now().date()  # the day the ledger and late fees go by, not the local TZ's
+        self.overdue  = Payment.objects.create(
+            lease=self.lease, amount_due=Decimal('5000'), due_date=today - timedelta(days=10),
+            status='overdue',
+        )
+        self.upcoming = Payment.objects.create(
+            lease=self.lease, amount_due=Decimal('5000'), due_date=today + timedelta(days=5),
+        )
+        self.client.force_login(self.tenant)
+
+    def test_ledger_api_summarises_balance(self):
+        response = self.client.get(reverse('tenant_ledger_api'))
+        data = response.json()
+        # 5000 + 500 late fee overdue, plus 5000 not yet due
+        self.assertEqual(Decimal(data['balance_due']), Decimal('10500'))
+        self.assertEqual(data['overdue_count'], 1)
+        self.assertEqual(data['next_due_date'], self.upcoming.due_date.isoformat())
+        self.assertEqual(data['leases'][0]['unit_number'], 'A1')
+
+    def test_portal_is_served_from_cache(self):
+        self.assertWithinQueryBudget(self.client.get(reverse('tenant_portal')))
+        # session + user only, the ledger comes from the cache
+        with self.assertNumQueries(2):
+            self.client.get(reverse('tenant_portal'))
+
+    def test_payment_change_invalidates_ledger(self):
+        self.client.get(reverse('tenant_ledger_api'))
+        self.overdue.amount_paid = Decimal('5500')
+        self.overdue.status = 'paid'
+        self.overdue.save()
+        data = self.client.get(reverse('tenant_ledger_api')).json()
+        self.assertEqual(Decimal(data['balance_due']), Decimal('5000'))
+        self.assertEqual(data['overdue_count'], 0)
+
+    def test_landlord_cannot_read_ledger(self):
+        self.client.force_login(self.landlord)
+        self.assertNotEqual(self.client.get(reverse('tenant_ledger_api')).status_code, 200)
+
+
+# ── Property Counter Tests ─────────────────────────────────────────────────────
+
+class PropertyCounterTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.prop     = make_property(self.landlord)
+        self.unit     = make_unit(self.prop, 'A1')
+        make_unit(self.prop, 'A2')
+
+    def counters(self):
+        self.prop.refresh_from_db()
+        return self.prop.unit_count, self.prop.occupied_count
+
+    def test_counters_follow_units_and_leases(self):
+        self.assertEqual(self.counters(), (2, 0))
+        self.client.force_login(self.landlord)
+        tenant = make_tenant()
+        tenant.created_by = self.landlord; tenant.save()
+        self.client.post(reverse('lease_add', args=[self.unit.pk]), {
+            'tenant': tenant.pk, 'start_date': date.today(), 'end_date': date.today() + timedelta(days=90),
+        })
+        self.assertEqual(self.counters(), (2, 1))
+        self.assertEqual(self.prop.occupancy_rate(), 50.0)
+
+        lease = Lease.objects.get(unit=self.unit)
+        self.client.post(reverse('lease_terminate', args=[lease.pk]))
+        self.assertEqual(self.counters(), (2, 0))
+
+        Unit.objects.get(pk=self.unit.pk).delete()
+        self.assertEqual(self.counters(), (1, 0))
+
+    def test_moving_a_unit_moves_its_counts(self):
+        other = Property.objects.create(owner=self.landlord, name='Other', address='1 Park St', city='Pune')
+        unit = Unit.objects.get(pk=self.unit.pk)
+        unit.property, unit.status = other, 'occupied'
+        unit.save()
+        self.assertEqual(self.counters(), (1, 0))
+        other.refresh_from_db()
+        self.assertEqual((other.unit_count, other.occupied_count), (1, 1))
+
+    def test_reconcile_repairs_drift(self):
+        Unit.objects.filter(pk=self.unit.pk).update(status='occupied')  # skips signals
+        out = StringIO()
+        call_command('reconcile_property_counters', '--dry-run', stdout=out)
+        self.assertIn('Found 1', out.getvalue())
+        self.assertEqual(self.counters(), (2, 0))
+        call_command('reconcile_property_counters', stdout=StringIO())
+        self.assertEqual(self.counters(), (2, 1))
+        live = Property.objects.with_live_counts().get(pk=self.prop.pk)
+        self.assertEqual((live.live_unit_count, live.live_occupied_count), (2, 1))
+
+    def test_property_list_query_count_is_flat(self):
+        for n in range(5):
+            make_unit(Property.objects.create(owner=self.landlord, name=f'P{n}', address='x', city='Goa'), 'B1')
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('property_list'))
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(response.wsgi_request.metrics.queries, 4)
+
+
+# ── Availability & Booking Tests ───────────────────────────────────────────────
+
+class AvailabilityTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.prop     = make_property(self.landlord)
+        self.units    = []
+        for n in range(3):
+            unit = make_unit(self.prop, f'D{n}', rent=1500)
+            unit.rent_type = 'daily'; unit.save()
+            self.units.append(unit)
+        self.day = date.today() + timedelta(days=10)
+        self.client.force_login(self.landlord)
+
+    def book(self, unit, start, nights, **kwargs):
+        return Booking.objects.create(unit=unit, check_in=self.day + timedelta(days=start),
+                                      check_out=self.day + timedelta(days=start + nights), **kwargs)
+
+    def free(self, start, nights):
+        from .availability import available_units
+        check_in = self.day + timedelta(days=start)
+        return [u.unit_number for u in available_units(self.landlord, check_in, check_in + timedelta(days=nights))]
+
+    def test_database_refuses_overlapping_bookings(self):
+        self.book(self.units[0], 0, 3)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(self.units[0], 2, 2)
+        # back-to-back stays, other units and cancelled bookings do not clash
+        self.book(self.units[0], 3, 2)
+        self.book(self.units[1], 1, 2)
+        cancelled = self.book(self.units[2], 0, 5, status='cancelled')
+        self.book(self.units[2], 1, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            cancelled.status = 'confirmed'; cancelled.save()
+
+    def test_search_excludes_booked_and_leased_units(self):
+        self.book(self.units[0], 0, 3)
+        self.assertEqual(self.free(0, 2), ['D1', 'D2'])
+        self.assertEqual(self.free(3, 2), ['D0', 'D1', 'D2'])
+        Lease.objects.create(unit=self.units[1], tenant=make_tenant(), start_date=self.day,
+                             end_date=self.day + timedelta(days=30))
+        self.assertEqual(self.free(3, 2), ['D0', 'D2'])
+
+    def test_moving_a_booking_updates_the_index(self):
+        booking = self.book(self.units[0], 0, 3)
+        booking.check_in += timedelta(days=20); booking.check_out += timedelta(days=20); booking.save()
+        self.assertEqual(self.free(0, 3), ['D0', 'D1', 'D2'])
+        self.assertEqual(self.free(20, 1), ['D1', 'D2'])
+
+    def test_availability_api_is_one_query(self):
+        self.book(self.units[2], 0, 2)
+        response = self.client.get(reverse('availability_api'), {
+            'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=2)).isoformat(),
+        })
+        self.assertWithinQueryBudget(response)
+        data = response.json()
+        self.assertEqual([u['unit'] for u in data['units']], ['D0', 'D1'])
+        self.assertEqual(Decimal(data['units'][0]['total']), Decimal('3000'))
+        bad = self.client.get(reverse('availability_api'), {'check_in': self.day, 'check_out': self.day})
+        self.assertEqual(bad.status_code, 400)
+        clamped = self.client.get(reverse('availability_api'), {
+            'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=2)).isoformat(), 'limit': -1,
+        })
+        self.assertEqual(clamped.json()['units'], [])
+        bad = self.client.get(reverse('availability_api'), {
+            'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=2)).isoformat(), 'limit': 'x',
+        })
+        self.assertEqual((bad.status_code, bad.json()), (400, {'error': 'limit must be a number.'}))
+
+    def test_calendar_clips_bookings_to_window(self):
+        self.book(self.units[0], -2, 4, guest_name='Asha')
+        response = self.client.get(reverse('availability_calendar_api'), {
+            'start': self.day.isoformat(), 'days': 7, 'units': f'{self.units[0].pk},{self.units[1].pk}',
+        })
+        self.assertWithinQueryBudget(response)
+        rows = {row['unit']: row for row in response.json()['units']}
+        self.assertEqual(set(rows), {'D0', 'D1'})
+        self.assertEqual(rows['D0']['bookings'][0]['guest_name'], 'Asha')
+        self.assertEqual((rows['D0']['booked_nights'], rows['D0']['free_nights']), (2, 5))
+
+    def test_booking_form_rejects_overlap(self):
+        self.book(self.units[0], 0, 3)
+        response = self.client.post(reverse('booking_add', args=[self.units[0].pk]), {
+            'guest_name': 'Late', 'status': 'confirmed',
+            'check_in': self.day + timedelta(days=1), 'check_out': self.day + timedelta(days=4),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already booked')
+        response = self.client.post(reverse('booking_add', args=[self.units[0].pk]), {
+            'guest_name': 'Next', 'status': 'confirmed',
+            'check_in': self.day + timedelta(days=3), 'check_out': self.day + timedelta(days=4),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.filter(unit=self.units[0]).count(), 2)
+
+    def test_other_landlords_cannot_book_or_see_units(self):
+        self.client.force_login(make_landlord('ll_other'))
+        self.assertEqual(self.client.get(reverse('booking_add', args=[self.units[0].pk])).status_code, 404)
+        response = self.client.get(reverse('availability_api'), {
+            'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.json()['units'], [])
+
+
+# ── Landlord Scope Tests ───────────────────────────────────────────────────────
+
+class LandlordScopeTests(TestCase):
+    def setUp(self):
+        self.landlord1 = make_landlord('ll1')
+        self.landlord2 = make_landlord('ll2')
+        self.tenant    = make_tenant()
+        self.lease1    = make_lease(make_unit(make_property(self.landlord1)), self.tenant)
+        self.lease2    = make_lease(make_unit(make_property(self.landlord2), 'B1'), self.tenant)
+        self.payment2  = Payment.objects.create(lease=self.lease2, amount_due=Decimal('5000'), due_date=date.today())
+
+    def test_owner_is_copied_from_the_unit(self):
+        ticket = MaintenanceTicket.objects.create(
+            unit=self.lease2.unit, submitted_by=self.tenant, title='Leak', description='Kitchen'
+        )
+        self.assertEqual(self.lease1.owner, self.landlord1)
+        self.assertEqual((self.payment2.owner, ticket.owner), (self.landlord2, self.landlord2))
+
+    def test_default_managers_follow_the_active_landlord(self):
+        from .models import landlord_scope
+        with landlord_scope(self.landlord1):
+            self.assertEqual(list(Lease.objects.all()), [self.lease1])
+            self.assertFalse(Payment.objects.exists())
+            self.assertEqual(Payment.all_objects.count(), 1)
+        self.assertEqual(Lease.objects.count(), 2)
+
+    def test_requests_are_scoped_to_request_landlord(self):
+        self.client.force_login(self.landlord1)
+        response = self.client.get(reverse('download_receipt', args=[self.payment2.pk]))
+        self.assertEqual(response.status_code, 404)
+        # the sweep in the dashboard still covers every landlord's leases
+        Payment.objects.create(lease=self.lease1, amount_due=Decimal('5000'), due_date=date.today())
+        Lease.all_objects.filter(pk=self.lease2.pk).update(end_date=timezone.now().date() - timedelta(days=1))
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(Lease.all_objects.get(pk=self.lease2.pk).status, 'expired')
+
+    def test_landlord_lists_do_not_join_up_to_property(self):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        self.client.force_login(self.landlord2)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('payment_list'))
+        payment_sql = [q['sql'] for q in captured if 'FROM "hostflow_payment"' in q['sql']]
+        self.assertEqual(len(payment_sql), 1)
+        # hidden properties are excluded by subquery, never by a join
+        self.assertNotIn('JOIN "hostflow_property"', payment_sql[0])
+
+
+# ── Tenant Autocomplete Tests ──────────────────────────────────────────────────
+
+class TenantAutocompleteTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.unit     = make_unit(make_property(self.landlord))
+        self.created  = make_tenant('priya')
+        self.created.created_by = self.landlord; self.created.phone = '9876500000'; self.created.save()
+        self.leased   = make_tenant('Pranav')
+        make_lease(make_unit(self.unit.property, 'A2'), self.leased)
+        self.stranger = make_tenant('prakash')
+        self.client.force_login(self.landlord)
+
+    def complete(self, q):
+        response = self.client.get(reverse('tenant_autocomplete'), {'q': q})
+        self.assertWithinQueryBudget(response)
+        return [r['username'] for r in response.json()['results']]
+
+    def test_prefix_search_is_scoped_to_landlord(self):
+        self.assertEqual(self.complete('pr'), ['Pranav', 'priya'])
+        self.assertEqual(self.complete('PRI'), ['priya'])
+        self.assertEqual(self.complete('98765'), ['priya'])
+        self.assertEqual(self.complete('pranav@test'), ['Pranav'])
+        self.assertEqual(self.complete('prak'), [])
+        # literal LIKE wildcards in the query match only themselves
+        self.assertEqual(self.complete('pr_'), [])
+        self.assertEqual(self.complete('%'), [])
+
+    def test_add_tenant_records_creator(self):
+        self.client.post(reverse('add_tenant'), {'username': 'newbie', 'email': 'newbie@test.com', 'password': 'x1y2z3w4!'})
+        self.assertEqual(User.objects.get(username='newbie').created_by, self.landlord)
+        self.assertEqual(self.complete('new'), ['newbie'])
+
+    def test_lease_form_renders_no_tenant_list_and_validates_selection(self):
+        response = self.client.get(reverse('lease_add', args=[self.unit.pk]))
+        self.assertNotContains(response, '<option')
+        self.assertNotContains(response, '<script>')
+        self.assertContains(response, 'hostflow/js/tenant_picker.js')
+        self.assertNotContains(response, 'prakash')
+        dates = {'start_date': date.today(), 'end_date': date.today() + timedelta(days=30)}
+        response = self.client.post(reverse('lease_add', args=[self.unit.pk]), {'tenant': self.stranger.pk, **dates})
+        self.assertContains(response, 'Pick one of your tenants')
+        response = self.client.post(reverse('lease_add', args=[self.unit.pk]), {'tenant': self.created.pk, **dates})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Lease.objects.filter(unit=self.unit, tenant=self.created).exists())
+
+
+# ── Admin Tests ────────────────────────────────────────────────────────────────
+
+class AdminScaleTests(TestCase):
+    CHANGELISTS = ['payment', 'lease', 'unit', 'property', 'booking', 'maintenanceticket',
+                   'ticketcomment', 'notification', 'auditlog']
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@test.com', 'testpass123')
+        self.client.force_login(self.admin)
+        self.landlord = make_landlord()
+        self.prop = make_property(self.landlord)
+
+    def add_rows(self, n, start=0):
+        for i in range(start, start + n):
+            tenant = make_tenant(f'tenant{i}')
+            unit = make_unit(self.prop, f'U{i}')
+            lease = make_lease(unit, tenant)
+            Payment.objects.create(lease=lease, amount_due=5000, due_date=date.today() - timedelta(days=i))
+            Booking.objects.create(unit=unit, guest_name='Guest', check_in=date.today(),
+                                   check_out=date.today() + timedelta(days=2))
+            ticket = MaintenanceTicket.objects.create(unit=unit, submitted_by=tenant, title='Leak', description='.')
+            TicketComment.objects.create(ticket=ticket, author=tenant, content='Still leaking.')
+            Notification.objects.create(recipient=tenant, title='Rent reminder', message='Due on the 5th.')
+            AuditLog.objects.create(performed_by=tenant, action='create', model_name='lease',
+                                    object_id=lease.pk, description='Lease created')
+
+    def test_superuser_sees_every_landlords_rows(self):
+        self.add_rows(3)
+        self.assertEqual(self.admin.role, 'landlord')  # createsuperuser's default
+        for model, count in [('payment', 3), ('lease', 3), ('maintenanceticket', 3)]:
+            response = self.client.get(reverse(f'admin:hostflow_{model}_changelist'))
+            self.assertEqual(len(response.context['cl'].result_list), count, model)
+
+    def changelist_queries(self, model):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(f'admin:hostflow_{model}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        few = {model: self.changelist_queries(model) for model in self.CHANGELISTS}
+        self.add_rows(10, start=2)
+        for model in self.CHANGELISTS:
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), few[model])
+                self.assertLessEqual(few[model], 8)
+
+    def test_log_tables_page_by_cursor_without_counting(self):
+        tenant = make_tenant()
+        Notification.objects.bulk_create(
+            Notification(recipient=tenant, title=f'Note {i}', message='.') for i in range(120)
+        )
+        url = reverse('admin:hostflow_notification_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+        newest = Notification.objects.order_by('-pk')
+        self.assertEqual(len(response.context['cl'].result_list), 50)
+        self.assertContains(response, 'Note 119')
+        self.assertContains(response, f'?cursor={newest[49].pk}')
+
+        response = self.client.get(url, {'cursor': newest[99].pk})
+        self.assertEqual([n.pk for n in response.context['cl'].result_list], [n.pk for n in newest[100:]])
+        self.assertNotContains(response, 'Older')
+        self.assertContains(response, 'Newest')
+
+
+# ── Background Deletion Tests ──────────────────────────────────────────────────
+
+class BackgroundDeletionTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+        self.landlord = make_landlord()
+        self.prop = make_property(self.landlord)
+        self.keep = Property.objects.create(owner=self.landlord, name='Keep', address='1 Park St', city='Pune')
+        make_unit(self.keep, 'K1')
+        self.tenant = make_tenant()
+        self.tenant.created_by = self.landlord; self.tenant.save()
+        for n in range(3):
+            unit = make_unit(self.prop, f'A{n}')
+            lease = make_lease(unit, make_tenant(f'tenant_{n}'))
+            for month in range(3):
+                Payment.objects.create(lease=lease, amount_due=5000, due_date=date.today() - timedelta(days=30 * month))
+            ticket = MaintenanceTicket.objects.create(unit=unit, submitted_by=lease.tenant, title='Leak', description='.')
+            TicketComment.objects.create(ticket=ticket, author=self.landlord, content='On it.')
+            Booking.objects.create(unit=unit, guest_name='Guest', check_in=date.today(),
+                                   check_out=date.today() + timedelta(days=2))
+        self.lease = Lease.objects.filter(unit__property=self.prop).first()
+        self.lease.document = SimpleUploadedFile('lease.pdf', b'%PDF-1.4')
+        self.lease.save()
+        self.document = os.path.join(self.media.name, self.lease.document.name)
+        self.client.force_login(self.landlord)
+
+    def test_delete_request_hides_property_and_queues_job(self):
+        response = self.client.post(reverse('property_delete', args=[self.prop.pk]))
+        self.assertRedirects(response, reverse('property_list'), fetch_redirect_response=False)
+        self.assertWithinQueryBudget(response)
+
+        job = DeletionJob.objects.get()
+        self.assertEqual((job.kind, job.object_id, job.status), ('property', self.prop.pk, 'pending'))
+        self.assertEqual(Unit.objects.filter(property=self.prop).count(), 3)  # nothing deleted yet
+        self.assertEqual(self.client.get(reverse('property_edit', args=[self.prop.pk])).status_code, 404)
+
+        # its leases end and its rows leave the landlord's lists and search
+        self.assertFalse(Lease.all_objects.filter(status='active').exists())
+        self.assertEqual(list(self.client.get(reverse('lease_list')).context['leases']), [])
+        self.assertEqual(list(self.client.get(reverse('payment_list')).context['payments']), [])
+        self.assertEqual(list(tickets.board_queryset(self.landlord)), [])
+        self.assertEqual(arrears.totals(self.landlord)['total'], 0)
+        self.assertEqual(set(SearchEntry.objects.values_list('kind', 'object_id')),
+                         {('property', self.keep.pk), ('unit', Unit.objects.get(property=self.keep).pk)})
+        generate_rent()
+        self.assertEqual(Payment.all_objects.count(), 9)  # nothing billed to the ended leases
+
+        response = self.client.get(reverse('property_list'))
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(list(response.context['properties']), [self.keep])
+        self.assertContains(response, 'in the background')
+
+    def test_job_deletes_children_in_chunks_and_cleans_up(self):
+        self.assertTrue(os.path.exists(self.document))
+        job = deletion.schedule_property_deletion(self.prop, requested_by=self.landlord)
+        job = deletion.run_job(job, chunk_size=2)
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.deleted_rows, job.total_rows)
+        self.assertEqual(job.total_rows, 9 + 3 * 5 + 1)  # payments, 3 of each other child, the property
+        self.assertFalse(Property.all_objects.filter(pk=self.prop.pk).exists())
+        self.assertEqual(Unit.objects.get().property, self.keep)
+        for manager in (Lease.all_objects, Payment.all_objects, MaintenanceTicket.all_objects,
+                        TicketComment.objects, Booking.objects):
+            self.assertFalse(manager.exists(), manager.model.__name__)
+        self.assertFalse(os.path.exists(self.document))
+        self.assertEqual(
+            set(SearchEntry.objects.filter(owner=self.landlord).values_list('kind', 'title')),
+            {('property', 'Keep'), ('unit', 'Unit K1 – Keep')},
+        )
+
+    def test_admin_action_queues_instead_of_cascading(self):
+        admin_user = User.objects.create_superuser('root', 'root@test.com', 'testpass123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:hostflow_property_changelist')
+        self.assertNotContains(self.client.get(url), 'value="delete_selected"')
+        self.assertNotContains(self.client.get(reverse('admin:hostflow_user_changelist')), 'value="delete_selected"')
+
+        self.client.post(url, {'action': 'delete_in_background', '_selected_action': [self.prop.pk]})
+        self.assertEqual(DeletionJob.objects.get().object_id, self.prop.pk)
+        self.assertEqual(Unit.objects.filter(property=self.prop).count(), 3)
+
+    def test_landlord_deletion_via_command(self):
+        deletion.schedule_landlord_deletion(self.landlord)
+        self.assertFalse(User.objects.get(pk=self.landlord.pk).is_active)
+        self.assertFalse(Property.objects.filter(owner=self.landlord).exists())
+
+        out = StringIO()
+        call_command('run_deletion_jobs', chunk_size=4, stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.landlord.pk).exists())
+        self.assertFalse(Property.all_objects.exists())
+        self.tenant.refresh_from_db()
+        self.assertIsNone(self.tenant.created_by)
+        self.assertEqual(DeletionJob.objects.get().status, 'done')
+
+
+# ── Email OTP Tests ────────────────────────────────────────────────────────────
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   OTP_RESEND_LIMIT=3, OTP_MAX_ATTEMPTS=5, OTP_IP_LIMIT=20)
+class EmailOtpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post(self, name, ip='198.51.100.1', **data):
+        return self.client.post(reverse(name), json.dumps(data), content_type='application/json', REMOTE_ADDR=ip)
+
+    def sent_codes(self):
+        tasks.run_pending()
+        return [re.search(r'\b(\d{6})\b', m.body).group(1) for m in mail.outbox]
+
+    def test_code_is_hashed_single_use_and_expires_with_setting(self):
+        with mock.patch.object(otp.cache, 'set_many', wraps=otp.cache.set_many) as set_many:
+            self.assertEqual(self.post('send_email_otp', email='new@test.com').status_code, 200)
+        # stored by the request itself, so it verifies whichever process sends the mail
+        self.assertEqual(otp.verify('new@test.com', 'x'), otp.INVALID)
+        queued = Task.objects.get()
+        code, = self.sent_codes()
+        self.assertEqual(set_many.call_args.args[1], 300)
+        self.assertNotIn(code, str(set_many.call_args.args[0]))
+        self.assertNotIn(code, json.dumps([queued.args, queued.kwargs]))
+
+        self.assertEqual(self.post('verify_email_otp', email='new@test.com', otp=code).json()['status'], 'success')
+        self.assertTrue(self.client.session['email_verified'])
+        self.assertEqual(otp.verify('new@test.com', code), otp.EXPIRED)
+
+    def test_wrong_guesses_burn_the_code(self):
+        self.post('send_email_otp', email='new@test.com')
+        code, = self.sent_codes()
+        wrong = '%06d' % ((int(code) + 1) % 10 ** 6)
+        results = [otp.verify('new@test.com', wrong) for _ in range(5)]
+        self.assertEqual(results, [otp.INVALID] * 4 + [otp.LOCKED])
+        self.assertEqual(otp.verify('new@test.com', code), otp.LOCKED)
+
+    def test_resends_limited_per_email_and_per_ip(self):
+        statuses = [self.post('send_email_otp', email='new@test.com').status_code for _ in range(5)]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+        self.assertIn('Retry-After', self.post('send_email_otp', email='new@test.com'))
+        # the refused requests spent none of the IP's 20: three admitted, seventeen left
+        statuses = [self.post('send_email_otp', email=f'v{i}@test.com').status_code for i in range(18)]
+        self.assertEqual(statuses.count(429), 1)
+
+        statuses = [self.post('send_email_otp', ip='198.51.100.2', email=f'u{i}@test.com').status_code
+                    for i in range(22)]
+        self.assertEqual(statuses.count(429), 2)
+
+    def test_flood_stays_off_database_and_smtp(self):
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(200):
+                self.post('send_email_otp', email='victim@test.com')
+                self.post('verify_email_otp', email='victim@test.com', otp='123456')
+        # the only writes are the three admitted codes' queued mails
+        self.assertEqual([q['sql'].split()[:3] for q in ctx.captured_queries], [['INSERT', 'INTO', '"hostflow_task"']] * 3)
+        self.assertEqual(len(self.sent_codes()), 3)
+
+    def test_register_requires_the_verified_email(self):
+        self.post('send_email_otp', email='owner@test.com')
+        code, = self.sent_codes()
+        self.post('verify_email_otp', email='owner@test.com', otp=code)
+        form = {'username': 'owner', 'password': 'StrongPass123!'}
+        self.client.post(reverse('register'), {**form, 'email': 'other@test.com'})
+        self.assertFalse(User.objects.filter(username='owner').exists())
+        self.client.post(reverse('register'), {**form, 'email': 'owner@test.com'})
+        self.assertEqual(User.objects.get(username='owner').role, 'landlord')
+
+
+# ── Login Throttle Tests ───────────────────────────────────────────────────────
+
+@override_settings(LOGIN_FAILURES_PER_USER=3, LOGIN_FAILURES_PER_IP=5, LOGIN_DELAY_AFTER=10,
+                   LOGIN_FAILURE_WINDOW=900, PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord('ll_login', 'pass12345!')
+
+    def login(self, password='wrong', username='ll_login', ip='198.51.100.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_lockout_refuses_before_hashing_and_notifies_once(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 200)
+        with mock.patch('hostflow.views.authenticate') as authenticate:
+            response = self.login(password='pass12345!')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Notification.objects.filter(recipient=self.landlord, title='Sign-in locked').count(), 1)
+
+    @override_settings(LOGIN_DELAY_AFTER=1)
+    def test_progressive_delay_and_success_resets(self):
+        self.login()
+        self.login()
+        response = self.login(password='pass12345!')
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 2)
+        with mock.patch('hostflow.throttle.time.time', return_value=time.time() + 3):
+            self.assertEqual(self.login(password='pass12345!').status_code, 302)
+        self.assertEqual(SlidingWindow('login-user', 3, 900).count('ll_login'), 0)
+
+    def test_ip_limit_spans_usernames(self):
+        for i in range(5):
+            self.login(username=f'nobody{i}')
+        self.assertEqual(self.login(password='pass12345!').status_code, 429)
+        self.assertEqual(self.login(password='pass12345!', ip='198.51.100.2').status_code, 302)
+
+    def test_sliding_window_decays(self):
+        window = SlidingWindow('test', 10, 100)
+        with mock.patch('hostflow.ratelimit.time.time', return_value=1000.0):
+            for _ in range(10):
+                window.hit('k')
+            self.assertEqual(window.retry_after('k'), 101)
+        with mock.patch('hostflow.ratelimit.time.time', return_value=1150.0):
+            self.assertEqual(window.count('k'), 5)
+            self.assertEqual(window.retry_after('k'), 0)
+
+    def test_password_rehashed_at_new_cost_on_login(self):
+        self.assertIn('$1000$', User.objects.get(pk=self.landlord.pk).password)
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login(password='pass12345!').status_code, 302)
+        self.assertIn('$2000$', User.objects.get(pk=self.landlord.pk).password)
+
+
+# ── Health Check Tests ─────────────────────────────────────────────────────────
+
+class HealthCheckTests(QueryBudgetMixin, TestCase):
+    def test_healthz_touches_nothing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/healthz')
+        self.assertEqual((response.status_code, response.content), (200, b'ok'))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_readyz_checks_database_and_cache(self):
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        self.assertEqual({name: check['ok'] for name, check in response.json()['checks'].items()},
+                         {'database': True, 'cache': True})
+
+    def test_readyz_fails_when_cache_is_down(self):
+        with mock.patch('hostflow.views.cache.get', side_effect=ConnectionError('refused')), \
+                self.assertLogs('hostflow.views', 'ERROR') as logs:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['checks']['cache']['ok'])
+        self.assertNotIn('refused', response.content.decode())
+        self.assertIn('refused', logs.output[0])
+
+    def test_prod_profile(self):
+        script = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'website.settings'; django.setup();"
+            "from django.conf import settings as s; db = s.DATABASES['default'];"
+            "print(s.DEBUG, db['CONN_MAX_AGE'], db['CONN_HEALTH_CHECKS'], db.get('DISABLE_SERVER_SIDE_CURSORS'),"
+            "s.TEMPLATES[0]['OPTIONS']['loaders'][0][0])"
+        )
+        env = {**os.environ, 'DJANGO_ENV': 'prod', 'PGBOUNCER': '1', 'DATABASE_URL': 'sqlite:///:memory:',
+               'CACHE_BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'CACHE_LOCATION': 'hostflow_cache'}
+        output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split(), ['False', '600', 'True', 'True', 'django.template.loaders.cached.Loader'])
+
+        del env['CACHE_BACKEND']  # the per-process default
+        output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+        self.assertNotEqual(output.returncode, 0)
+        self.assertIn('shared cache', output.stderr)
+
+
+# ── Static Asset Tests ─────────────────────────────────────────────────────────
+
+class StaticAssetTests(TestCase):
+    ASSET_RE = re.compile(r'<(?:link|script)\b[^>]*?\b(?:href|src)="([^"]+)"')
+
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.prop = make_property(self.landlord)
+        self.client.force_login(self.landlord)
+
+    def assets(self, response):
+        self.assertEqual(response.status_code, 200)
+        return self.ASSET_RE.findall(response.content.decode())
+
+    def test_pages_are_self_hosted(self):
+        pages = [reverse('dashboard'), reverse('reports'), reverse('property_list'),
+                 reverse('lease_add', args=[make_unit(self.prop).pk])]
+        anonymous = Client()
+        responses = [self.client.get(url) for url in pages] + [
+            anonymous.get(reverse(name)) for name in ('landing', 'login', 'register')
+        ]
+        for response in responses:
+            for url in self.assets(response):
+                self.assertTrue(url.startswith('/static/'), url)
+                self.assertIsNotNone(finders.find(url[len('/static/'):]), url)
+            self.assertNotIn('<style>', response.content.decode())
+            self.assertNotIn('<script>', response.content.decode())
+
+    def test_chart_js_only_on_chart_pages(self):
+        self.assertFalse(any('chart' in url for url in self.assets(self.client.get(reverse('dashboard')))))
+        self.assertTrue(any('chart' in url for url in self.assets(self.client.get(reverse('reports')))))
+
+    def test_report_data_cannot_break_out_of_script(self):
+        Property.objects.filter(pk=self.prop.pk).update(name='</script><script>alert(1)</script>')
+        response = self.client.get(reverse('reports'))
+        self.assertNotContains(response, '<script>alert(1)')
+        self.assertContains(response, '\\u003C/script\\u003E')
+
+
+# ── Protected Media Tests ──────────────────────────────────────────────────────
+
+class ProtectedMediaTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+        self.landlord = make_landlord()
+        self.tenant = make_tenant()
+        self.lease = make_lease(make_unit(make_property(self.landlord)), self.tenant)
+        self.lease.document = SimpleUploadedFile('lease.pdf', b'%PDF-1.4 ' + bytes(range(256)) * 40)
+        self.lease.save()
+        self.name = self.lease.document.name
+        self.path = reverse('protected_media', args=[self.name])
+
+    def test_signed_url_needs_no_session_or_queries(self):
+        url = self.lease.document.url
+        self.assertTrue(url.startswith(self.path + '?exp='))
+        with CaptureQueriesContext(connection) as ctx:
+            response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(b''.join(response.streaming_content), open(self.lease.document.path, 'rb').read())
+        self.assertIn('private', response['Cache-Control'])
+        self.assertGreaterEqual(int(response['Cache-Control'].split('max-age=')[1]), settings.MEDIA_URL_MAX_AGE)
+
+    def test_forged_or_expired_signature_falls_back_to_session(self):
+        expired = media.signed_url(self.name, now=time.time() - 3 * settings.MEDIA_URL_MAX_AGE)
+        forged = self.lease.document.url[:-4] + 'abcd'
+        for url in (expired, forged):
+            self.assertEqual(Client().get(url).status_code, 302)
+
+    def test_session_access_is_limited_to_the_lease_parties(self):
+        stranger = make_tenant('stranger')
+        for user, status in [(self.landlord, 200), (self.tenant, 200), (stranger, 404)]:
+            self.client.force_login(user)
+            response = self.client.get(self.path)
+            self.assertEqual(response.status_code, status, user)
+            self.assertWithinQueryBudget(response)
+
+    def test_range_request(self):
+        response = Client().get(self.lease.document.url, HTTP_RANGE='bytes=9-18')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 9-18/{9 + 256 * 40}')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10)))
+        self.assertEqual(Client().get(self.lease.document.url, HTTP_RANGE='bytes=99999-').status_code, 416)
+
+    def test_proxy_handoff(self):
+        url = self.lease.document.url
+        with override_settings(MEDIA_SERVER='nginx'):
+            response = Client().get(url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SERVER='sendfile'):
+            response = Client().get(url)
+        self.assertEqual(response['X-Sendfile'], self.lease.document.path)
+
+    def test_untrusted_types_are_downloaded(self):
+        with open(os.path.join(self.media.name, 'leases', 'page.html'), 'w') as fh:
+            fh.write('<script>alert(1)</script>')
+        response = Client().get(media.signed_url('leases/page.html'))
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        with open(os.path.join(self.media.name, 'leases', 'x.svg'), 'w') as fh:
+            fh.write('<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>')
+        response = Client().get(media.signed_url('leases/x.svg'))
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(Client().get(media.signed_url('../settings.py')).status_code, 404)
+
+
+# ── Read Replica Tests ─────────────────────────────────────────────────────────
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        routing._health.clear()
+        self.addCleanup(routing._health.clear)
+        self.landlord = make_landlord()
+
+    def route(self, user=None):
+        # outside TestCase's own transaction, which would keep every read on the primary
+        with mock.patch.object(connections['default'], 'in_atomic_block', False), routing.use_replica(user):
+            return router.db_for_read(Payment), router.db_for_write(Payment)
+
+    def test_reads_in_block_go_to_replica(self):
+        with mock.patch('hostflow.routing.replica_lag', return_value=0.5):
+            self.assertEqual(self.route(self.landlord), ('replica_1', 'default'))
+            with routing.use_replica(self.landlord):
+                self.assertEqual(router.db_for_read(Payment), 'default')  # inside a transaction
+        self.assertEqual(router.db_for_read(Payment), 'default')
+
+    def test_lagging_or_unreachable_replica_falls_back_to_primary(self):
+        for behaviour in [{'return_value': 60.0}, {'side_effect': OperationalError('could not connect')}]:
+            routing._health.clear()
+            with self.subTest(**behaviour), mock.patch('hostflow.routing.replica_lag', **behaviour) as lag:
+                with self.assertLogs('hostflow.routing', 'WARNING'):
+                    self.assertEqual(self.route(), ('default', 'default'))
+                self.route()
+                self.assertEqual(lag.call_count, 1)  # re-checked only after REPLICA_CHECK_INTERVAL
+
+    def test_no_replicas_configured(self):
+        with override_settings(DATABASE_REPLICAS=[]), mock.patch('hostflow.routing.replica_lag') as lag:
+            self.assertEqual(self.route(self.landlord), ('default', 'default'))
+        lag.assert_not_called()
+
+    def test_writing_pins_the_user_to_primary(self):
+        self.client.force_login(self.landlord)
+        self.client.get(reverse('property_list'))
+        self.assertIsNone(cache.get(routing._pin_key(self.landlord.pk)))
+
+        self.client.post(reverse('property_add'), {'name': 'New', 'address': '1 Road', 'city': 'Goa'})
+        with mock.patch('hostflow.routing.replica_lag', return_value=0):
+            self.assertEqual(self.route(self.landlord), ('default', 'default'))
+            self.assertEqual(self.route(make_landlord('other')), ('replica_1', 'default'))
+
+    def test_dashboard_sweep_reads_the_primary(self):
+        self.client.force_login(self.landlord)
+        seen = {}
+
+        def record(name):
+            def side_effect(*args):
+                seen[name] = routing._replica.get()  # where reads would be routed
+                return HttpResponse()
+            return side_effect
+
+        with mock.patch('hostflow.routing.replica_lag', return_value=0), \
+                mock.patch('hostflow.views.generate_rent', side_effect=record('sweep')), \
+                mock.patch('hostflow.views._dashboard', side_effect=record('aggregates')):
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(seen, {'sweep': None, 'aggregates': 'replica_1'})
+
+    def test_two_sqlite_databases(self):
+        script = """
+import django, os, shutil, sys
+os.environ['DJANGO_SETTINGS_MODULE'] = 'website.settings'
+django.setup()
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import setup_test_environment
+from hostflow.models import User, Property
+setup_test_environment()
+call_command('migrate', verbosity=0)
+landlord = User.objects.create_user('ll', password='pw', role='landlord')
+Property.objects.create(owner=landlord, name='Old', address='x', city='Pune')
+shutil.copy(sys.argv[1], sys.argv[2])  # the replica catches up
+Property.objects.create(owner=landlord, name='Unreplicated', address='x', city='Pune')
+
+client = Client()
+client.force_login(landlord)
+def names():
+    return sorted(p['name'] for p in client.get('/reports/').context['prop_revenue'])
+print(names())
+client.post('/properties/add/', {'name': 'Mine', 'address': 'x', 'city': 'Pune'})
+print(names())
+"""
+        with tempfile.TemporaryDirectory() as tmp:
+            primary, replica = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+            env = {**os.environ, 'DJANGO_ENV': 'dev', 'DATABASE_URL': f'sqlite:///{primary}',
+                   'DATABASE_REPLICA_URLS': f'sqlite:///{replica}'}
+            output = subprocess.run([sys.executable, '-c', script, primary, replica],
+                                    env=env, capture_output=True, text=True, check=True)
+        before, after = output.stdout.splitlines()
+        self.assertEqual(before, "['Old']")                             # read from the replica
+        self.assertEqual(after, "['Mine', 'Old', 'Unreplicated']")     # pinned to the primary
+
+
+# ── Task Queue Tests ───────────────────────────────────────────────────────────
+
+CALLS = []
+
+
+@tasks.task()
+def record_call(value):
+    CALLS.append(value)
+
+
+@tasks.task(queue='mail', max_attempts=2)
+def always_fails():
+    raise RuntimeError('SMTP unreachable')
+
+
+@override_settings(TASK_QUEUES={'mail': {'concurrency': 2}}, TASK_BATCH_SIZE=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_task_runs_only_if_enqueueing_transaction_commits(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            record_call.enqueue('rolled back')
+            raise IntegrityError
+        record_call.enqueue('committed')
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertEqual(CALLS, ['committed'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failures_back_off_then_go_dead(self):
+        always_fails.enqueue()
+        with self.assertLogs('hostflow.tasks', 'WARNING'):
+            self.assertEqual(tasks.run_pending(), (0, 1))
+        item = Task.objects.get()
+        self.assertEqual((item.status, item.attempts), ('pending', 1))
+        self.assertGreater(item.run_at, timezone.now() + timedelta(seconds=4))
+        self.assertIn('SMTP unreachable', item.last_error)
+
+        self.assertEqual(tasks.run_pending(), (0, 0))  # not due yet
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('hostflow.tasks', 'ERROR'):
+            tasks.run_pending()
+        self.assertEqual(Task.objects.get().status, 'dead')
+
+    def test_claims_respect_queue_concurrency_and_do_not_overlap(self):
+        for _ in range(4):
+            tasks.enqueue('hostflow.tests.always_fails', queue='mail')
+        for value in range(3):
+            record_call.enqueue(value)
+        Task.objects.filter(pk=Task.objects.filter(queue='mail').first().pk).update(status='running')
+
+        first = tasks.claim('worker-1')
+        self.assertEqual(sorted(t.queue for t in first), ['default'] * 3 + ['mail'])
+        self.assertEqual(tasks.claim('worker-2'), [])  # mail is at its cap of 2
+        self.assertTrue(all(t.attempts == 1 and t.locked_by.startswith('worker-1:') for t in first))
+
+    def test_tasks_of_a_dead_worker_are_requeued(self):
+        record_call.enqueue('lost')
+        always_fails.enqueue()
+        stale = timezone.now() - timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT + 1)
+        Task.objects.update(status='running', locked_by='gone:1', locked_at=stale, attempts=1)
+        Task.objects.filter(name=always_fails.task_name).update(attempts=2)
+        self.assertEqual(tasks.requeue_stale(), 2)
+        self.assertEqual(dict(Task.objects.values_list('name', 'status')), {
+            'hostflow.tests.record_call': 'pending', 'hostflow.tests.always_fails': 'dead',
+        })
+
+    def test_expired_otp_mail_is_dropped(self):
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            otp.deliver.enqueue('late@test.com', otp._seal('late@test.com', '123456'), int(time.time()) - 1)
+            self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_ticket_photo_is_uprighted_stripped_and_scaled_in_the_background(self):
+        from PIL import Image
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, TICKET_IMAGE_MAX_SIZE=100))
+        tenant = make_tenant()
+        make_lease(make_unit(make_property(make_landlord())), tenant)
+
+        photo, exif = BytesIO(), Image.Exif()
+        exif[0x0112] = 6  # orientation: rotate 90° to display
+        exif[0x010F] = 'PhoneMaker'
+        Image.new('RGB', (400, 200), 'red').save(photo, format='JPEG', exif=exif)
+        self.client.force_login(tenant)
+        self.client.post(reverse('submit_ticket'), {
+            'title': 'Leak', 'description': 'Kitchen', 'priority': 'high',
+            'image': SimpleUploadedFile('leak.jpg', photo.getvalue(), content_type='image/jpeg'),
+        })
+        ticket = MaintenanceTicket.all_objects.get()
+        self.assertEqual(Image.open(ticket.image.path).size, (400, 200))  # the upload is untouched
+
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        with Image.open(ticket.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertFalse(image.getexif())
+
+
+# ── Notification Channel Tests ─────────────────────────────────────────────────
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   SMS_TRANSPORT='hostflow.notify.LocmemTransport', TWILIO_FROM_NUMBER='+15005550006',
+                   SMS_DEFAULT_COUNTRY_CODE='+91')
+class NotificationChannelTests(TestCase):
+    def setUp(self):
+        notify.outbox.clear()
+        self.landlord = make_landlord()
+        self.tenant = make_tenant()
+        User.objects.filter(pk=self.tenant.pk).update(phone='098765 43210')
+        self.tenant.refresh_from_db()
+        NotificationPreference.objects.create(user=self.tenant, sms=True, in_app=False)
+        self.other = make_tenant('tenant2')  # no preference row: email and in-app
+        self.unit = make_unit(make_property(self.landlord))
+        self.payments = [
+            Payment.objects.create(lease=make_lease(self.unit, tenant), amount_due=Decimal('5000'),
+                                   due_date=date.today() + timedelta(days=2))
+            for tenant in (self.tenant, self.other)
+        ]
+
+    def test_dispatch_follows_preferences_and_skips_what_already_went_out(self):
+        messages = [notify.rent_due_message(payment) for payment in self.payments]
+        self.assertEqual(notify.dispatch(messages), {'email': 2, 'sms': 1, 'in_app': 1})
+        self.assertEqual([m['to'] for m in notify.outbox], ['+919876543210'])
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['tenant1@test.com', 'tenant2@test.com'])
+        self.assertEqual(list(Notification.objects.values_list('recipient', flat=True)), [self.other.pk])
+
+        self.assertEqual(notify.dispatch(messages), {})  # a retried batch, or the next day's run
+        self.assertEqual((len(notify.outbox), len(mail.outbox), Notification.objects.count()), (1, 2, 1))
+
+    def test_reminders_are_queued_in_batches_of_constant_query_cost(self):
+        out = StringIO()
+        call_command('send_rent_reminders', batch_size=1, stdout=out)
+        self.assertIn('Queued 2 reminder batch(es).', out.getvalue())
+        one, two = Task.objects.order_by('pk')
+        self.assertEqual(one.queue, 'notifications')
+
+        costs = []
+        for item in (one, two):
+            with CaptureQueriesContext(connection) as ctx:
+                tasks.execute(item)
+            costs.append(len(ctx.captured_queries))
+        more = [Payment.objects.create(lease=make_lease(make_unit(make_property(self.landlord), f'B{i}'),
+                                                         make_tenant(f'bulk{i}')),
+                                       amount_due=Decimal('5000'), due_date=date.today()) for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            notify.rent_reminders([payment.pk for payment in more])
+        self.assertLessEqual(len(ctx.captured_queries), max(costs))
+        self.assertEqual(MessageDelivery.objects.filter(channel='email').count(), 22)
+
+    @override_settings(TWILIO_AUTH_TOKEN='secret', TWILIO_STATUS_CALLBACK='https://hostflow.test/webhooks/twilio/status/')
+    def test_status_callbacks_are_signed_and_only_move_forward(self):
+        from twilio.request_validator import RequestValidator
+        notify.dispatch([notify.rent_due_message(self.payments[0])])
+        delivery = MessageDelivery.objects.get(channel='sms')
+
+        def callback(status, signature=None):
+            params = {'MessageSid': delivery.provider_id, 'MessageStatus': status}
+            signature = signature or RequestValidator('secret').compute_signature(settings.TWILIO_STATUS_CALLBACK, params)
+            return self.client.post(reverse('twilio_status'), params, HTTP_X_TWILIO_SIGNATURE=signature)
+
+        self.assertEqual(callback('delivered', signature='forged').status_code, 403)
+        self.assertEqual(callback('delivered').status_code, 204)
+        self.assertEqual(callback('sent').status_code, 204)  # arrived late
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, 'delivered')
+
+    @override_settings(TWILIO_ACCOUNT_SID='AC' + '0' * 32, TWILIO_AUTH_TOKEN='secret', SMS_CONCURRENCY=24)
+    def test_twilio_client_is_shared_and_pooled(self):
+        self.addCleanup(setattr, notify.TwilioTransport, '_client', None)
+        client = notify.TwilioTransport.client()
+        self.assertIs(notify.TwilioTransport().client(), client)
+        self.assertEqual(client.http_client.session.get_adapter('https://api.twilio.com')._pool_maxsize, 24)
+
+    def test_users_choose_their_channels(self):
+        self.client.force_login(self.other)
+        self.client.post(reverse('notification_list'), {'sms': 'on', 'whatsapp': 'on'})
+        self.assertEqual(NotificationPreference.objects.get(user=self.other).channels(), ['sms', 'whatsapp'])
+
+
+# ── Statement Tests ────────────────────────────────────────────────────────────
+
+class StatementTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        cache.clear()
+
+        self.landlord = make_landlord()
+        self.tenant = make_tenant()
+        self.unit = make_unit(make_property(self.landlord))
+        self.lease = self.make_lease(self.unit, self.tenant)
+        for due, late_fee, paid, paid_date in [
+            (date(2026, 1, 5), 0, 5000, date(2026, 1, 4)),
+            (date(2026, 2, 5), 200, 3000, date(2026, 2, 10)),
+            (date(2026, 3, 5), 0, 7200, date(2026, 3, 6)),
+        ]:
+            payment = Payment.objects.create(lease=self.lease, amount_due=Decimal('5000'), due_date=due)
+            Payment.all_objects.filter(pk=payment.pk).update(  # save() would recompute the late fee for today
+                late_fee=late_fee, amount_paid=paid, paid_date=paid_date, status='paid' if paid >= 5000 else 'partial'
+            )
+
+    def make_lease(self, unit, tenant):
+        lease = make_lease(unit, tenant)
+        Lease.all_objects.filter(pk=lease.pk).update(start_date=date(2026, 1, 1), end_date=date(2026, 12, 31))
+        return lease
+
+    def test_balances_and_file(self):
+        stats = statements.generate(date(2026, 2, 14), processes=0)
+        self.assertEqual((stats['statements'], stats['lines']), (1, 1))
+        feb = Statement.objects.get(lease=self.lease)
+        self.assertEqual(feb.month, date(2026, 2, 1))
+        self.assertEqual(
+            [feb.opening_balance, feb.charges, feb.late_fees, feb.payments, feb.closing_balance],
+            [Decimal('0'), Decimal('5000'), Decimal('200'), Decimal('3000'), Decimal('2200')],
+        )
+        statements.generate(date(2026, 3, 1), processes=0)
+        march = Statement.objects.get(lease=self.lease, month=date(2026, 3, 1))
+        self.assertEqual((march.opening_balance, march.closing_balance), (Decimal('2200'), Decimal('0')))
+        text = march.file.read().decode()
+        self.assertIn('HOSTFLOW STATEMENT – March 2026', text)
+        self.assertIn('Paid 06 Mar', text)
+
+    def test_reruns_skip_done_leases_unless_forced(self):
+        statements.generate(date(2026, 3, 1), processes=0)
+        self.make_lease(make_unit(self.unit.property, 'A2'), make_tenant('tenant2'))
+        self.assertEqual(statements.generate(date(2026, 3, 1), processes=0)['statements'], 1)
+        out = StringIO()
+        call_command('generate_statements', month=date(2026, 3, 1), processes=0, force=True, stdout=out)
+        self.assertIn('March 2026: 2 statements', out.getvalue())
+        self.assertEqual(Statement.objects.count(), 2)
+        self.assertEqual(len(os.listdir(os.path.join(self.media.name, 'statements', '2026-03'))), 2)
+
+    def test_chunks_cost_the_same_queries_however_many_leases(self):
+        start, end = statements.month_bounds(date(2026, 3, 1))
+        with CaptureQueriesContext(connection) as one:
+            statements.load_chunk(start, end)
+        for i in range(10):
+            lease = self.make_lease(make_unit(self.unit.property, f'B{i}'), make_tenant(f'bulk{i}'))
+            Payment.objects.create(lease=lease, amount_due=Decimal('5000'), due_date=date(2026, 3, 5))
+        with CaptureQueriesContext(connection) as eleven:
+            self.assertEqual(len(statements.load_chunk(start, end)), 11)
+        self.assertEqual(len(eleven.captured_queries), len(one.captured_queries))
+
+    def test_process_pool_renders_the_same_files(self):
+        statements.generate(date(2026, 3, 1), processes=0)
+        name = Statement.objects.get().file.name
+        with open(os.path.join(self.media.name, name)) as fh:
+            expected = fh.read()
+        self.assertEqual(statements.generate(date(2026, 3, 1), processes=2, force=True)['statements'], 1)
+        with open(os.path.join(self.media.name, name)) as fh:
+            self.assertEqual(fh.read(), expected)
+
+    def test_tenant_downloads_own_statement(self):
+        self.client.force_login(self.tenant)
+        self.assertNotContains(self.client.get(reverse('tenant_portal')), 'March 2026')  # ledger now cached
+        statements.generate(date(2026, 3, 1), processes=0)
+        name = Statement.objects.get().file.name
+        response = self.client.get(reverse('tenant_portal'))
+        self.assertContains(response, 'March 2026')
+        self.assertEqual(self.client.get(reverse('protected_media', args=[name])).status_code, 200)
+        self.client.force_login(make_tenant('stranger'))
+        self.assertEqual(self.client.get(reverse('protected_media', args=[name])).status_code, 404)
+
+
+# ── Arrears Aging Tests ────────────────────────────────────────────────────────
+
+class ArrearsAgingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.today = timezone.localdate()
+        prop = make_property(self.landlord)
+        self.tenants = [make_tenant(), make_tenant('tenant2')]
+        self.units = [make_unit(prop, 'A1'), make_unit(prop, 'A2')]
+        leases = [make_lease(unit, tenant) for unit, tenant in zip(self.units, self.tenants)]
+        # (lease, days past due, amount due, late fee, paid, status)
+        for lease, days, due, fee, paid, status in [
+            (0, -3, 5000, 0, 0, 'pending'),
+            (0, 10, 5000, 500, 2000, 'partial'),
+            (0, 45, 5000, 0, 0, 'overdue'),
+            (1, 75, 4000, 100, 0, 'overdue'),
+            (1, 120, 4000, 0, 0, 'overdue'),
+            (1, 200, 4000, 0, 4000, 'paid'),
+        ]:
+            payment = Payment.objects.create(lease=leases[lease], amount_due=Decimal('1'), due_date=self.today)
+            Payment.all_objects.filter(pk=payment.pk).update(
+                due_date=self.today - timedelta(days=days), amount_due=due, late_fee=fee, amount_paid=paid, status=status,
+            )
+        other = make_landlord('landlord2')
+        Payment.objects.create(lease=make_lease(make_unit(make_property(other)), make_tenant('tenant3')),
+                               amount_due=Decimal('9999'), due_date=self.today - timedelta(days=5))
+
+    def test_buckets(self):
+        totals = arrears.totals(self.landlord)
+        self.assertEqual(
+            [totals[key] for key, *_ in arrears.BUCKETS] + [totals['total']],
+            [Decimal('5000'), Decimal('3500'), Decimal('5000'), Decimal('4100'), Decimal('4000'), Decimal('21600')],
+        )
+        by_tenant = list(arrears.aging(self.landlord, 'tenant'))
+        self.assertEqual([(row['tenant_name'], row['total']) for row in by_tenant],
+                         [('tenant1', Decimal('13500')), ('tenant2', Decimal('8100'))])
+        self.assertEqual(arrears.add_up(by_tenant), totals)
+
+    def test_grouped_rows_cost_one_query(self):
+        for level in arrears.GROUPS:
+            with self.assertNumQueries(1):
+                list(arrears.aging(self.landlord, level))
+
+    def test_drill_down(self):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('arrears_report'))
+        self.assertWithinQueryBudget(response)
+        self.assertContains(response, '₹21600')
+        self.assertNotContains(response, '9999')
+
+        response = self.client.get(reverse('arrears_report') + response.context['rows'][0]['url'])
+        self.assertEqual([row['unit_number'] for row in response.context['rows']], ['A1', 'A2'])
+        response = self.client.get(reverse('arrears_report') + response.context['rows'][1]['url'])
+        self.assertWithinQueryBudget(response)
+        self.assertEqual([row['bucket'] for row in response.context['rows']], ['90+ days', '61–90 days'])
+
+    def test_csv_is_streamed(self):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('arrears_csv'), {'by': 'payment', 'tenant': self.tenants[0].pk})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        balance, bucket = lines[1].split(',')[-2:]
+        self.assertEqual((Decimal(balance), bucket), (Decimal('5000'), '31–60 days'))
+        self.client.force_login(self.tenants[0])
+        self.assertNotEqual(self.client.get(reverse('arrears_csv')).status_code, 200)
+
+
+# ── Cash-Flow Forecast Tests ───────────────────────────────────────────────────
+
+class CashFlowForecastTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.months = forecast.horizon(timezone.localdate())
+        first = self.months[0]
+        self.prop = make_property(self.landlord)
+        self.monthly = make_unit(self.prop, 'A1', rent=5000)
+        self.daily = make_unit(self.prop, 'D1', rent=100)
+        Unit.objects.filter(pk=self.daily.pk).update(rent_type='daily')
+        self.lease = make_lease(self.monthly, make_tenant())
+        stay = make_lease(self.daily, make_tenant('tenant2'))
+        Lease.all_objects.filter(pk=self.lease.pk).update(end_date=self.months[2] + timedelta(days=10))
+        Lease.all_objects.filter(pk=stay.pk).update(start_date=first + timedelta(days=9),
+                                                   end_date=first + timedelta(days=18))
+        last_month = timezone.localdate().replace(day=1) - relativedelta(months=1)
+        payment = Payment.objects.create(lease=self.lease, amount_due=Decimal('5000'), due_date=last_month)
+        Payment.all_objects.filter(pk=payment.pk).update(amount_paid=4000, status='partial')
+
+    def test_leases_are_expanded_into_charges_at_the_collection_rate(self):
+        result = forecast.cash_flow(self.landlord, 12)
+        self.assertEqual(len(result['months']), 12)
+        prop, = result['properties']
+        self.assertEqual(prop['rate'], Decimal('0.8'))
+        self.assertEqual(prop['charges'][:4], [Decimal('6000'), Decimal('5000'), Decimal('5000'), Decimal('0')])
+        self.assertEqual(prop['expected'][:4], [Decimal('4800'), Decimal('4000'), Decimal('4000'), Decimal('0')])
+        self.assertEqual(result['expected'][0], Decimal('4800'))
+        self.assertEqual(prop['expected_total'], Decimal('12800'))
+        self.assertEqual(len(forecast.cash_flow(self.landlord, 24)['charges']), 24)
+
+    def test_cached_until_leases_or_rents_change(self):
+        forecast.cash_flow(self.landlord)
+        with self.assertNumQueries(0):
+            forecast.cash_flow(self.landlord)
+
+        self.monthly.refresh_from_db()
+        self.monthly.rent_amount = Decimal('6000')
+        self.monthly.save()
+        self.assertEqual(forecast.cash_flow(self.landlord)['properties'][0]['charges'][1], Decimal('6000'))
+
+        self.lease.refresh_from_db()
+        self.lease.status = 'terminated'
+        self.lease.save()
+        self.assertEqual(forecast.cash_flow(self.landlord)['properties'][0]['charges'][1], Decimal('0'))
+
+    def test_report_view(self):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('forecast_report'), {'months': 24})
+        self.assertWithinQueryBudget(response)
+        self.assertContains(response, '₹4800')
+        self.assertContains(response, '80%')
+
+
+# ── Rent Revision Tests ────────────────────────────────────────────────────────
+
+class RentRevisionTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.prop = make_property(self.landlord)
+        self.units = [make_unit(self.prop, f'A{i}', rent=5000 + i * 1000) for i in range(3)]
+        other = make_property(self.landlord)
+        Property.objects.filter(pk=other.pk).update(city='Pune')
+        self.pune = make_unit(other, 'P1', rent=8000)
+        self.today = timezone.localdate()
+
+    def rents(self):
+        return dict(Unit.objects.order_by('pk').values_list('unit_number', 'rent_amount'))
+
+    def test_percent_revision_updates_rents_and_writes_history(self):
+        units = rent.select_units(self.landlord, city='delhi')
+        revision = rent.revise(self.landlord, units, 'percent', Decimal('7.5'), self.today)
+        self.assertEqual(revision.unit_count, 3)
+        self.assertEqual(self.rents(), {'A0': Decimal('5375.00'), 'A1': Decimal('6450.00'),
+                                        'A2': Decimal('7525.00'), 'P1': Decimal('8000.00')})
+        history = RentHistory.objects.filter(revision=revision).order_by('unit__unit_number')
+        self.assertEqual(list(history.values_list('previous_amount', 'rent_amount', 'applied'))[0],
+                         (Decimal('5000.00'), Decimal('5375.00'), True))
+        self.assertEqual(Task.objects.filter(name='hostflow.rent.reindex_units').count(), 1)
+
+    def test_fixed_revision_never_goes_below_zero(self):
+        rent.revise(self.landlord, rent.select_units(self.landlord, property=self.prop), 'fixed',
+                    Decimal('-5500'), self.today)
+        self.assertEqual(self.rents()['A0'], Decimal('0.00'))
+        self.assertEqual(self.rents()['A1'], Decimal('500.00'))
+
+    def test_statement_count_does_not_grow_with_units(self):
+        units = rent.select_units(self.landlord)
+        with CaptureQueriesContext(connection) as few:
+            rent.revise(self.landlord, units, 'percent', Decimal('5'), self.today)
+        for i in range(20):
+            make_unit(self.prop, f'B{i}')
+        with CaptureQueriesContext(connection) as many:
+            rent.revise(self.landlord, units, 'percent', Decimal('5'), self.today)
+        self.assertEqual(len(few), len(many))
+
+    def test_future_revision_waits_and_billing_uses_rent_in_force(self):
+        next_month = (self.today.replace(day=1) + relativedelta(months=1))
+        lease = make_lease(self.units[0], make_tenant())
+        rent.revise(self.landlord, rent.select_units(self.landlord, property=self.prop), 'fixed',
+                    Decimal('500'), next_month)
+        self.assertEqual(self.rents()['A0'], Decimal('5000.00'))
+        self.assertEqual(rent.apply_due(self.today), 0)
+
+        generate_rent()
+        self.assertEqual(Payment.all_objects.get(lease=lease).amount_due, Decimal('5000.00'))
+
+        self.assertEqual(rent.apply_due(next_month), 3)
+        self.assertEqual(self.rents()['A0'], Decimal('5500.00'))
+        self.assertFalse(RentHistory.objects.filter(applied=False).exists())
+        billed = Lease.all_objects.filter(pk=lease.pk).annotate(rent=rent.effective_rent(next_month))
+        self.assertEqual(billed.get().rent, Decimal('5500.00'))
+
+    def test_unit_edit_records_history(self):
+        self.client.force_login(self.landlord)
+        self.client.post(reverse('unit_edit', args=[self.units[0].pk]), {
+            'unit_number': 'A0', 'rent_type': 'monthly', 'rent_amount': '5200', 'status': 'vacant',
+        })
+        change = RentHistory.objects.get(unit=self.units[0])
+        self.assertEqual((change.previous_amount, change.rent_amount, change.revision), (Decimal('5000.00'), Decimal('5200.00'), None))
+
+    def test_revision_view(self):
+        self.client.force_login(self.landlord)
+        response = self.client.post(reverse('rent_revision'), {
+            'city': 'Pune', 'kind': 'percent', 'value': '10', 'effective_from': self.today.isoformat(), 'note': '',
+        }, follow=True)
+        self.assertWithinQueryBudget(response)
+        self.assertContains(response, 'Rent revised for 1 unit,')
+        self.assertEqual(self.rents()['P1'], Decimal('8800.00'))
+        self.assertEqual(self.client.post(reverse('rent_revision'), {
+            'kind': 'percent', 'value': '500', 'effective_from': self.today.isoformat(),
+        }).status_code, 200)
+        self.assertEqual(RentRevision.objects.count(), 1)
+
+
+# ── Payment Capture Tests ──────────────────────────────────────────────────────
+
+class PaymentCaptureTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.landlord, self.tenant = make_landlord(), make_tenant()
+        self.lease = make_lease(make_unit(make_property(self.landlord)), self.tenant)
+        self.payment = Payment.objects.create(lease=self.lease, amount_due=Decimal('5000'),
+                                              due_date=timezone.localdate() + timedelta(days=5))
+
+    def test_partial_captures_add_up_and_settle(self):
+        first = payments.capture(self.payment.pk, 'k1', Decimal('2000'))
+        self.assertEqual((first.amount, first.replayed), (Decimal('2000'), False))
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.amount_paid, self.payment.status), (Decimal('2000'), 'partial'))
+
+        self.assertEqual(payments.capture(self.payment.pk, 'k2').amount, Decimal('3000'))
+        self.assertEqual(payments.capture(self.payment.pk, 'k3').amount, Decimal('0'))
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.amount_paid, self.payment.status), (Decimal('5000'), 'paid'))
+        self.assertEqual(self.payment.paid_date, timezone.now().date())
+
+    def test_repeated_key_is_replayed(self):
+        payments.capture(self.payment.pk, 'same', Decimal('1000'))
+        again = payments.capture(self.payment.pk, 'same', Decimal('1000'))
+        self.assertTrue(again.replayed)
+        self.assertEqual(Payment.all_objects.get(pk=self.payment.pk).amount_paid, Decimal('1000'))
+        other = Payment.objects.create(lease=self.lease, amount_due=Decimal('5000'), due_date=timezone.localdate())
+        with self.assertRaises(ValueError):
+            payments.capture(other.pk, 'same')
+
+    def test_late_fee_is_charged_on_capture(self):
+        Payment.all_objects.filter(pk=self.payment.pk).update(due_date=timezone.now().date() - timedelta(days=3))
+        self.assertEqual(payments.capture(self.payment.pk, 'late').amount, Decimal('5150'))
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.late_fee, self.payment.status), (Decimal('150'), 'paid'))
+
+    def test_ledger_and_index_catch_up_on_commit(self):
+        cache.clear()
+        self.assertEqual(ledger.get_ledger(self.tenant)['balance_due'], Decimal('5000'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            payments.capture(self.payment.pk, 'k1', Decimal('2000'))
+            # nothing is dropped while the capture could still roll back
+            self.assertEqual(ledger.get_ledger(self.tenant)['balance_due'], Decimal('5000'))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ledger.get_ledger(self.tenant)['balance_due'], Decimal('3000'))
+        self.assertIn('Partial', SearchEntry.objects.get(kind='payment').subtitle)
+
+    def test_pay_rent_double_submit_pays_once(self):
+        self.client.force_login(self.tenant)
+        url = reverse('pay_rent', args=[self.payment.pk])
+        key = self.client.get(url).context['idempotency_key']
+        for _ in range(2):
+            response = self.client.post(url, {'idempotency_key': key})
+            self.assertWithinQueryBudget(response)
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.amount_paid, self.payment.status), (Decimal('5000'), 'paid'))
+        self.assertEqual(PaymentCapture.objects.get().source, 'tenant')
+
+    def test_landlord_records_onto_oldest_open_payment(self):
+        self.client.force_login(self.landlord)
+        url = reverse('payment_add', args=[self.lease.pk])
+        data = {'amount_paid': '1500', 'notes': 'cash', 'idempotency_key': 'counter-1'}
+        for _ in range(2):
+            response = self.client.post(url, data)
+            self.assertWithinQueryBudget(response)
+        self.assertEqual(Payment.all_objects.get().amount_paid, Decimal('1500'))
+
+        Payment.all_objects.update(amount_paid=5000, status='paid')
+        self.client.post(url, {**data, 'idempotency_key': 'counter-2'})
+        new = Payment.all_objects.latest('pk')
+        self.assertEqual((new.amount_due, new.amount_paid, new.status), (Decimal('5000'), Decimal('1500'), 'partial'))
+        self.assertEqual(PaymentCapture.objects.filter(payment=new).get().note, 'cash')
+
+
+class PaymentCaptureConcurrencyTests(TransactionTestCase):
+    """Captures racing on one payment, each thread on its own connection."""
+    SUBMISSIONS = 100
+
+    def setUp(self):
+        lease = make_lease(make_unit(make_property(make_landlord())), make_tenant())
+        self.payment = Payment.objects.create(lease=lease, amount_due=Decimal('10000'),
+                                              due_date=timezone.localdate() + timedelta(days=5))
+
+    def race(self, submit):
+        start, results, errors = threading.Barrier(self.SUBMISSIONS), [], []
+
+        def run(i):
+            try:
+                start.wait()
+                results.append(submit(i))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.SUBMISSIONS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.payment.refresh_from_db()
+        return results
+
+    def test_partial_payments_are_never_lost(self):
+        self.race(lambda i: payments.capture(self.payment.pk, f'part-{i}', Decimal('100')))
+        self.assertEqual((self.payment.amount_paid, self.payment.status), (Decimal('10000'), 'paid'))
+        self.assertEqual(PaymentCapture.objects.count(), self.SUBMISSIONS)
+
+    def test_one_key_pays_once(self):
+        results = self.race(lambda i: payments.capture(self.payment.pk, 'double-click'))
+        self.assertEqual(self.payment.amount_paid, Decimal('10000'))
+        self.assertEqual(PaymentCapture.objects.count(), 1)
+        self.assertEqual(sum(not r.replayed for r in results), 1)
+
+    def test_pay_in_full_from_many_requests_pays_once(self):
+        self.race(lambda i: payments.capture(self.payment.pk, f'full-{i}'))
+        self.assertEqual(self.payment.amount_paid, Decimal('10000'))
+        self.assertEqual(PaymentCapture.objects.aggregate(total=Sum('amount'))['total'], Decimal('10000'))
+
+
+# ── JSON API Tests ─────────────────────────────────────────────────────────────
+
+class JsonApiTests(TestCase):
+    def setUp(self):
+        self.landlord, self.tenant = make_landlord(), make_tenant()
+        self.unit = make_unit(make_property(self.landlord))
+        self.lease = make_lease(self.unit, self.tenant)
+        self.payments = [
+            Payment.objects.create(lease=self.lease, amount_due=Decimal('5000'),
+                                   due_date=date.today() + timedelta(days=30 * i))
+            for i in range(5)
+        ]
+        MaintenanceTicket.objects.create(unit=self.unit, submitted_by=self.tenant, title='Leak', description='Sink')
+        Notification.objects.create(recipient=self.tenant, title='Rent due', message='Pay up')
+        other = make_landlord('landlord2')
+        make_lease(make_unit(make_property(other), 'B1'), make_tenant('tenant2'))
+
+    def get(self, name, user=None, **params):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {api.issue_token(user or self.landlord)}'}
+        return self.client.get(reverse(name), params, **headers)
+
+    def test_token_endpoint(self):
+        User.objects.filter(pk=self.tenant.pk).update(is_verified=True)
+        response = self.client.post(reverse('api_token'), {'username': 'tenant1', 'password': 'testpass123'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        token = response.json()['token']
+        response = self.client.get(reverse('api_payments'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(self.client.post(reverse('api_token'), {'username': 'tenant1', 'password': 'nope'}).status_code, 401)
+
+        # a password change revokes the tokens issued before it
+        self.tenant.set_password('changed-pass-456')
+        self.tenant.save()
+        response = self.client.get(reverse('api_payments'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_is_not_used(self):
+        self.client.force_login(self.landlord)
+        response = self.client.get(reverse('api_properties'))
+        self.assertEqual((response.status_code, response['WWW-Authenticate']), (401, 'Bearer'))
+        expired = jwt.encode({'sub': str(self.landlord.pk), 'aud': api.AUDIENCE, 'exp': int(time.time()) - 1},
+                             api.signing_key(), algorithm='HS256')
+        self.assertEqual(self.client.get(reverse('api_properties'), HTTP_AUTHORIZATION=f'Bearer {expired}').status_code, 401)
+
+    def test_each_endpoint_is_two_queries(self):
+        # the token's user, then the page
+        for name, count in [('properties', 1), ('units', 1), ('leases', 1), ('payments', 5), ('tickets', 1)]:
+            with self.assertNumQueries(2):
+                self.assertEqual(len(self.get(f'api_{name}').json()['results']), count)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.get('api_notifications', self.tenant).json()['results']), 1)
+
+    def test_includes_cost_one_query_each(self):
+        with self.assertNumQueries(4):
+            rows = self.get('api_leases', include='unit,tenant').json()['results']
+        self.assertEqual((rows[0]['unit']['unit_number'], rows[0]['tenant']['username']), ('A1', 'tenant1'))
+        with self.assertNumQueries(3):
+            rows = self.get('api_payments', include='lease', fields='amount_due').json()['results']
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {'id', 'amount_due', 'lease'})
+        self.assertEqual(rows[0]['lease']['unit_id'], self.unit.pk)
+
+    def test_sparse_fields_and_filters(self):
+        rows = self.get('api_units', fields='unit_number,rent_amount').json()['results']
+        self.assertEqual(rows, [{'id': self.unit.pk, 'unit_number': 'A1', 'rent_amount': '5000.00'}])
+        self.assertEqual(self.get('api_units', fields='owner').status_code, 400)
+        self.assertEqual(self.get('api_payments', include='tenant').status_code, 400)
+        self.assertEqual(len(self.get('api_payments', lease=self.lease.pk).json()['results']), 5)
+        self.assertEqual(self.get('api_payments', status='paid').json()['results'], [])
+
+    def test_cursor_pages_through_everything_once(self):
+        seen, params = [], {'limit': 2, 'fields': 'id'}
+        while True:
+            page = self.get('api_payments', **params).json()
+            seen += [row['id'] for row in page['results']]
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(seen, sorted((p.pk for p in self.payments), reverse=True))
+        self.assertEqual(self.get('api_payments', cursor='!!').status_code, 400)
+
+    def test_etag_conditional_response(self):
+        response = self.get('api_payments')
+        etag = response['ETag']
+        again = self.client.get(reverse('api_payments'), HTTP_AUTHORIZATION=f'Bearer {api.issue_token(self.landlord)}',
+                                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((again.status_code, again.content), (304, b''))
+        Payment.all_objects.filter(pk=self.payments[0].pk).update(amount_paid=100)
+        self.assertEqual(self.client.get(reverse('api_payments'), HTTP_IF_NONE_MATCH=etag,
+                                         HTTP_AUTHORIZATION=f'Bearer {api.issue_token(self.landlord)}').status_code, 200)
+
+    def test_rows_are_scoped_to_the_token_user(self):
+        self.assertEqual(len(self.get('api_properties', self.tenant).json()['results']), 1)
+        self.assertEqual(len(self.get('api_leases', make_tenant('tenant3')).json()['results']), 0)
+        url = reverse('api_payments_detail', args=[self.payments[0].pk])
+        outsider = api.issue_token(User.objects.get(username='landlord2'))
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {outsider}').status_code, 404)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {api.issue_token(self.tenant)}')
+        self.assertEqual(response.json()['amount_due'], '5000.00')
+
@@ -0,0 +1,95 @@
+"""
+HostFlow Login Throttle
+───────────────────────
+Failed sign-ins are counted per username and per client IP in sliding
+windows (see ratelimit.py). login_view asks check() *before* calling
+authenticate(), so a refused attempt costs two cache reads instead of a
+full password hash.
+
+* After LOGIN_DELAY_AFTER failures on a username, each further attempt has
+  to wait twice as long as the last (1 s, 2 s, 4 s, …) since the previous
+  failure. The wait is enforced by refusing early attempts, never by
+  sleeping in the worker.
+* LOGIN_FAILURES_PER_USER failures within LOGIN_FAILURE_WINDOW lock the
+  username until the window slides past them; the account holder gets an
+  in-app notice the moment it happens.
+* LOGIN_FAILURES_PER_IP failures lock out the client address, whichever
+  usernames it tries.
+
+A successful sign-in clears the username's failures. Setting
+LOGIN_THROTTLE_ENABLED = False turns the whole layer off.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User, Notification
+from .ratelimit import SlidingWindow, cache_key
+
+
+def _enabled():
+    return getattr(settings, 'LOGIN_THROTTLE_ENABLED', True)
+
+
+def _user_window():
+    return SlidingWindow('login-user', settings.LOGIN_FAILURES_PER_USER, settings.LOGIN_FAILURE_WINDOW)
+
+
+def _ip_window():
+    return SlidingWindow('login-ip', settings.LOGIN_FAILURES_PER_IP, settings.LOGIN_FAILURE_WINDOW)
+
+
+def _last_failure_key(username):
+    return cache_key('login-last', 'user', username)
+
+
+def _delay(failures):
+    """Seconds an attempt must wait after the previous failure."""
+    over = math.floor(failures) - settings.LOGIN_DELAY_AFTER
+    return 0 if over < 0 else 2 ** over
+
+
+def check(username, ip):
+    """0 if this attempt may be checked against the password, else seconds to wait."""
+    if not _enabled():
+        return 0
+    users, ips = _user_window(), _ip_window()
+    wait = max(users.retry_after(username), ips.retry_after(ip))
+    if wait:
+        return wait
+    last = cache.get(_last_failure_key(username))
+    if last is not None:
+        return max(0, math.ceil(last + _delay(users.count(username)) - time.time()))
+    return 0
+
+
+def failed(username, ip):
+    """Record a failed attempt; True if it has just locked the username."""
+    if not _enabled():
+        return False
+    users = _user_window()
+    _ip_window().hit(ip)
+    failures = users.hit(username)
+    cache.set(_last_failure_key(username), time.time(), settings.LOGIN_FAILURE_WINDOW)
+    locked = failures >= users.limit > failures - 1
+    if locked:
+        _notify_lockout(username)
+    return locked
+
+
+def succeeded(username):
+    _user_window().reset(username)
+    cache.delete(_last_failure_key(username))
+
+
+def _notify_lockout(username):
+    user = User.objects.filter(username__iexact=username).only('pk').first()
+    if user:
+        Notification.objects.create(
+            recipient=user, title='Sign-in locked',
+            message=(f"Sign-in to your account was paused after {settings.LOGIN_FAILURES_PER_USER} "
+                     f"failed attempts. If this wasn't you, consider changing your password."),
+        )
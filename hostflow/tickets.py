@@ -0,0 +1,104 @@
+"""
+HostFlow Ticket Board
+─────────────────────
+Filtered, keyset-paginated maintenance ticket queries in SLA-priority order.
+
+A ticket's SLA score is its age plus a head start for its priority, so a
+high-priority ticket ranks like a low one filed three days earlier. Because
+every ticket ages at the same rate, ordering by score is the same as
+ordering by ``created_at - head start`` (``sla_key``), which is computed in
+SQL and never changes — so it works as a stable keyset cursor.
+"""
+
+import base64
+from datetime import datetime, timedelta
+
+from django.db.models import Case, DateTimeField, DurationField, ExpressionWrapper, F, Prefetch, Q, Value, When
+from django.utils import timezone
+
+from .models import MaintenanceTicket, TicketComment
+
+PRIORITY_HEAD_START = {
+    'high': timedelta(hours=72),
+    'medium': timedelta(hours=24),
+    'low': timedelta(0),
+}
+
+STATUS_FILTERS = {
+    'active': ['open', 'in_progress'],
+    'open': ['open'],
+    'in_progress': ['in_progress'],
+    'resolved': ['resolved'],
+    'all': None,
+}
+STATUS_FILTER_CHOICES = [
+    ('active', 'Active'), ('open', 'Open'), ('in_progress', 'In Progress'),
+    ('resolved', 'Resolved'), ('all', 'All'),
+]
+
+PAGE_SIZE = 50
+LATEST_COMMENTS = 3
+
+
+def sla_key():
+    head_start = Case(
+        *[When(priority=p, then=Value(delta)) for p, delta in PRIORITY_HEAD_START.items()],
+        default=Value(timedelta(0)),
+        output_field=DurationField(),
+    )
+    return ExpressionWrapper(F('created_at') - head_start, output_field=DateTimeField())
+
+
+def encode_cursor(ticket):
+    raw = f"{ticket.sla_key.isoformat()}|{ticket.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (sla_key, pk) from a cursor; ValueError if it is malformed."""
+    try:
+        key, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(key), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def board_queryset(landlord, status='active', priority=None, property_id=None):
+    """Landlord's tickets, filtered, with unit/property/submitter joined in."""
+    tickets = MaintenanceTicket.objects.filter(owner=landlord, unit__property__deleted_at__isnull=True)
+    statuses = STATUS_FILTERS.get(status, STATUS_FILTERS['active'])
+    if statuses:
+        tickets = tickets.filter(status__in=statuses)
+    if priority in PRIORITY_HEAD_START:
+        tickets = tickets.filter(priority=priority)
+    if property_id:
+        tickets = tickets.filter(unit__property_id=property_id)
+    return tickets.select_related('unit__property', 'submitted_by').annotate(
+        sla_key=sla_key()
+    ).order_by('sla_key', 'pk')
+
+
+def latest_comments_prefetch():
+    return Prefetch(
+        'comments',
+        queryset=TicketComment.objects.select_related('author').order_by('-created_at', '-pk')[:LATEST_COMMENTS],
+        to_attr='latest_comments',
+    )
+
+
+def board_page(landlord, cursor=None, page_size=PAGE_SIZE, **filters):
+    """One page of the board: (tickets, next_cursor or None)."""
+    tickets = board_queryset(landlord, **filters)
+    if cursor:
+        key, pk = decode_cursor(cursor)
+        tickets = tickets.filter(Q(sla_key__gt=key) | Q(sla_key=key, pk__gt=pk))
+    page = list(tickets.prefetch_related(latest_comments_prefetch())[:page_size + 1])
+
+    now = timezone.now()
+    for ticket in page:
+        ticket.sla_score = round((now - ticket.sla_key).total_seconds() / 3600, 1)
+
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # ── LANDING & OTP ──────────────────────────────────────────
@@ -25,14 +25,23 @@ urlpatterns = [
     path('properties/<int:property_pk>/units/', views.unit_list, name='unit_list'),
     path('properties/<int:property_pk>/units/add/', views.unit_add, name='unit_add'),
     path('units/<int:pk>/edit/', views.unit_edit, name='unit_edit'),
+    path('units/rent-revision/', views.rent_revision, name='rent_revision'),
 
     # ── LEASES ─────────────────────────────────────────────────
     path('leases/', views.lease_list, name='lease_list'),
     path('leases/add/<int:unit_pk>/', views.lease_add, name='lease_add'),
     path('leases/<int:pk>/terminate/', views.lease_terminate, name='lease_terminate'),
 
+    # ── AVAILABILITY & BOOKINGS ────────────────────────────────
+    path('availability/', views.availability_view, name='availability'),
+    path('availability/search.json', views.availability_api, name='availability_api'),
+    path('availability/calendar.json', views.availability_calendar_api, name='availability_calendar_api'),
+    path('units/<int:unit_pk>/bookings/add/', views.booking_add, name='booking_add'),
+    path('bookings/<int:pk>/cancel/', views.booking_cancel, name='booking_cancel'),
+
     # ── TENANTS ────────────────────────────────────────────────
     path('tenants/add/', views.add_tenant, name='add_tenant'),
+    path('tenants/autocomplete.json', views.tenant_autocomplete, name='tenant_autocomplete'),
 
     # ── PAYMENTS ───────────────────────────────────────────────
     path('pay/<int:payment_pk>/', views.pay_rent, name='pay_rent'),
@@ -42,19 +51,43 @@ urlpatterns = [
 
     # ── MAINTENANCE ────────────────────────────────────────────
     path('tickets/', views.ticket_list, name='ticket_list'),
+    path('tickets/board.json', views.ticket_board_api, name='ticket_board_api'),
     path('tickets/<int:pk>/', views.ticket_detail, name='ticket_detail'),
 
     # ── NOTIFICATIONS ──────────────────────────────────────────
     path('notifications/', views.notification_list, name='notification_list'),
+    path('webhooks/twilio/status/', views.twilio_status, name='twilio_status'),
 
     # ── REPORTS ────────────────────────────────────────────────
     path('reports/', views.reports, name='reports'),
     path('reports/export/csv/', views.export_payments_csv, name='export_csv'),
+    path('reports/arrears/', views.arrears_report, name='arrears_report'),
+    path('reports/arrears.csv', views.export_arrears_csv, name='arrears_csv'),
+    path('reports/forecast/', views.forecast_report, name='forecast_report'),
 
     # ── AUDIT ──────────────────────────────────────────────────
     path('audit/', views.audit_log_list, name='audit_logs'),
 
     # ── TENANT PORTAL ──────────────────────────────────────────
     path('tenant/', views.tenant_portal, name='tenant_portal'),
+    path('tenant/ledger.json', views.tenant_ledger_api, name='tenant_ledger_api'),
     path('tenant/maintenance/submit/', views.tenant_submit_ticket, name='submit_ticket'),
+
+    # ── SEARCH ─────────────────────────────────────────────────
+    path('search/', views.search_view, name='search'),
+    path('search.json', views.search_api, name='search_api'),
+
+    # ── MEDIA ──────────────────────────────────────────────────
+    path('media/<path:name>', views.protected_media, name='protected_media'),
+
+    # ── JSON API ───────────────────────────────────────────────
+    path('api/v1/token/', views.api_token, name='api_token'),
+    *[path(f'api/v1/{name}/', views.api_list, {'resource': name}, name=f'api_{name}') for name in api.ENDPOINTS],
+    *[path(f'api/v1/{name}/<int:pk>/', views.api_detail, {'resource': name}, name=f'api_{name}_detail')
+      for name in api.ENDPOINTS],
+
+    # ── METRICS & HEALTH ───────────────────────────────────────
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
 ]
\ No newline at end of file
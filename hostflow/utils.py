@@ -27,15 +27,9 @@ def send_notification_email(recipient_email, subject, message):
 
 
 def notify_rent_due(payment):
-    tenant = payment.lease.tenant
-    subject = f"[HostFlow] Rent Due – ₹{payment.amount_due}"
-    message = (
-        f"Hi {tenant.get_full_name() or tenant.username},\n\n"
-        f"Your rent of ₹{payment.amount_due} is due on {payment.due_date}.\n"
-        f"Please pay on time to avoid late fees.\n\n"
-        f"– HostFlow"
-    )
-    send_notification_email(tenant.email, subject, message)
+    """Queue the reminder for every channel the tenant chose. Import here to avoid circular imports."""
+    from .notify import rent_reminders
+    rent_reminders.enqueue([payment.pk])
 
 
 def notify_late_payment(payment):
@@ -1,46 +1,83 @@
-from django.core.mail import send_mail
 from django.conf import settings
-import json, random, csv
+import json, math, csv
 from datetime import date, timedelta
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from urllib.parse import urlencode
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.core.cache import cache
+import logging
+import time
 from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
+from django.template.defaultfilters import pluralize
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.utils.crypto import constant_time_compare
 
 from .models import (
     User, Property, Unit, Lease, Payment,
-    MaintenanceTicket, TicketComment, Notification, AuditLog
+    MaintenanceTicket, TicketComment, Notification, NotificationPreference, AuditLog, Booking, DeletionJob,
+    RentRevision,
 )
 from .forms import *
 from .utils import log_action
+from . import tickets as tickets_board
+from . import search as search_index
+from . import ledger as tenant_ledger
+from . import arrears
+from . import forecast as cash_forecast
+from . import rent as rent_revisions
+from . import availability
+from . import tenants as tenant_directory
+from . import deletion
+from . import otp as email_otp
+from . import throttle as login_throttle
+from . import media as protected
+from . import notify
+from . import api as json_api
+from . import payments as payment_capture
+from .ratelimit import client_ip
+from .routing import use_replica
+from .metrics import query_budget, registry
+
+logger = logging.getLogger(__name__)
 
 def update_lease_status():
     today = timezone.now().date()
-    Lease.objects.filter(end_date__lt=today, status='active').update(status='expired')
+    expired = Lease.all_objects.filter(end_date__lt=today, status='active')
+    tenant_ids = list(expired.values_list('tenant_id', flat=True))
+    if tenant_ids:
+        expired.update(status='expired')
+        for tenant_id in set(tenant_ids):
+            tenant_ledger.invalidate(tenant_id)
 def generate_rent():
     today = timezone.now().date()
 
-    leases = Lease.objects.filter(status='active')
+    billed = Payment.all_objects.filter(
+        due_date__month=today.month,
+        due_date__year=today.year
+    ).values('lease_id')
 
+    rent_revisions.apply_due(today)
+    leases = Lease.all_objects.filter(status='active').exclude(pk__in=billed).select_related('unit').annotate(
+        rent=rent_revisions.effective_rent(today.replace(day=1))  # the rent in force for this billing month
+    )
     for lease in leases:
-        exists = Payment.objects.filter(
+        Payment.all_objects.create(
             lease=lease,
-            due_date__month=today.month,
-            due_date__year=today.year
-        ).exists()
-
-        if not exists:
-            Payment.objects.create(
-                lease=lease,
-                amount_due=lease.unit.rent_amount,
-                due_date=today.replace(day=5)
-            )
+            amount_due=lease.rent,
+            due_date=today.replace(day=5)
+        )
 # ── LANDING & AUTH ──────────────────────────────────────────────────────────
 
 def landing_page(request):
@@ -66,56 +103,48 @@ def tenant_required(view_func):
     wrapper.__name__ = view_func.__name__
     return wrapper
 
-from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-from django.core.mail import send_mail
-from django.conf import settings
-import json, random
-
+def _otp_payload(request):
+    try:
+        data = json.loads(request.body)
+        email = str(data.get('email', '')).strip()
+        validate_email(email)
+    except (ValueError, AttributeError, ValidationError):
+        return None, None
+    return data, email
 
+@query_budget(2)
 @csrf_exempt
+@require_POST
 def send_email_otp(request):
-    if request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            email = data.get('email')
-
-            if not email:
-                return JsonResponse({'status': 'fail', 'error': 'No email'})
-
-            otp = str(random.randint(100000, 999999))
-
-            request.session['email'] = email
-            request.session['email_otp'] = otp
-            request.session['email_verified'] = False
-
-            try:
-                send_mail(
-                    'HostFlow OTP',
-                    f'Your OTP is {otp}',
-                    settings.EMAIL_HOST_USER,
-                    [email],
-                    fail_silently=True,   # 🔥 IMPORTANT
-                )
-                print("OTP sent:", otp)
-
-            except Exception as e:
-                print("EMAIL ERROR:", str(e))
-
-            return JsonResponse({'status': 'success'})
-
-        except Exception as e:
-            print("GENERAL ERROR:", str(e))
-            return JsonResponse({'status': 'fail'})
-
+    data, email = _otp_payload(request)
+    if email is None:
+        return JsonResponse({'status': 'fail', 'message': 'Enter a valid email address.'}, status=400)
+    result, detail = email_otp.issue(email, client_ip(request))
+    if result == email_otp.RATE_LIMITED:
+        response = JsonResponse({'status': 'fail', 'message': f'Too many codes requested; try again in {detail}s.'},
+                                status=429)
+        response['Retry-After'] = str(detail)
+        return response
+    return JsonResponse({'status': 'success', 'expires_in': settings.OTP_EXPIRY_SECONDS})
+
+@query_budget(4)
 @csrf_exempt
+@require_POST
 def verify_email_otp(request):
-    if request.method == "POST":
-        data = json.loads(request.body)
-        if data.get('otp') == request.session.get('email_otp'):
-            request.session['email_verified'] = True
-            return JsonResponse({'status': 'success'})
-    return JsonResponse({'status': 'fail'})
+    data, email = _otp_payload(request)
+    if email is None:
+        return JsonResponse({'status': 'fail', 'message': 'Enter a valid email address.'}, status=400)
+    result = email_otp.verify(email, data.get('otp', ''))
+    if result == email_otp.VERIFIED:
+        request.session['email'] = email
+        request.session['email_verified'] = True
+        return JsonResponse({'status': 'success'})
+    message = {
+        email_otp.INVALID: 'Invalid code.',
+        email_otp.EXPIRED: 'Code expired; request a new one.',
+        email_otp.LOCKED: 'Too many wrong codes; request a new one.',
+    }[result]
+    return JsonResponse({'status': 'fail', 'message': message}, status=400)
 
 def register_view(request):
     if request.method == 'POST':
@@ -124,6 +153,9 @@ def register_view(request):
             return redirect('register')
         form = LandlordRegisterForm(request.POST)
         if form.is_valid():
+            if form.cleaned_data['email'].lower() != request.session.get('email', '').lower():
+                messages.error(request, "Register with the email address you verified.")
+                return redirect('register')
             user = form.save(commit=False)
             user.set_password(request.POST.get('password'))
             user.role, user.is_verified, user.is_active = 'landlord', True, True
@@ -133,15 +165,28 @@ def register_view(request):
 
 def login_view(request):
     if request.method == 'POST':
-        u, p = request.POST.get('username'), request.POST.get('password')
+        u, p = request.POST.get('username', ''), request.POST.get('password')
+        ip = client_ip(request)
+        wait = login_throttle.check(u, ip)
+        if wait:
+            minutes = math.ceil(wait / 60)
+            messages.error(request, f"Too many failed sign-ins. Try again in {wait} seconds." if wait < 60
+                           else f"Too many failed sign-ins. Try again in {minutes} minute{pluralize(minutes)}.")
+            response = render(request, 'hostflow/login.html', status=429)
+            response['Retry-After'] = str(wait)
+            return response
         user = authenticate(request, username=u, password=p)
         if user:
+            login_throttle.succeeded(u)
             if not getattr(user, 'is_verified', True):
                 messages.error(request, "Account not verified.")
                 return redirect('register')
             login(request, user)
             return redirect('tenant_portal' if user.role == 'tenant' else 'dashboard')
-        messages.error(request, "Invalid username or password.")
+        if login_throttle.failed(u, ip):
+            messages.error(request, "Too many failed sign-ins. This account is locked for a while.")
+        else:
+            messages.error(request, "Invalid username or password.")
     return render(request, 'hostflow/login.html')
 
 @login_required
@@ -151,15 +196,21 @@ def logout_view(request):
 
 # ── LANDLORD DASHBOARD ───────────────────────────────────────────────────────
 
+@query_budget(16)
 @login_required
 @landlord_required
 def dashboard(request):
+    # the sweep decides what to write from what it reads, so it reads the primary, never a lagging replica
     update_lease_status()
     generate_rent()
+    with use_replica(request.user):
+        return _dashboard(request)
+
+def _dashboard(request):
     props = Property.objects.filter(owner=request.user)
-    units = Unit.objects.filter(property__in=props)
-    leases = Lease.objects.filter(unit__in=units)
-    payments = Payment.objects.filter(lease__unit__property__owner=request.user)
+    leases = Lease.objects.filter(owner=request.user, unit__property__deleted_at__isnull=True).select_related(
+        'tenant', 'unit__property')
+    payments = Payment.objects.filter(owner=request.user).exclude(lease__unit__property__in=Property.all_objects.pending_deletion(request.user))
 
     today = timezone.now().date()
 
@@ -169,16 +220,20 @@ def dashboard(request):
         paid_date__month=today.month
     ).aggregate(total=Sum('amount_paid'))['total'] or 0
 
+    counts = props.aggregate(properties=Count('pk'), units=Sum('unit_count'), occupied=Sum('occupied_count'))
+    total_units, occupied_units = counts['units'] or 0, counts['occupied'] or 0
+
     context = {
-        'total_properties': props.count(),
-        'total_units': units.count(),
-        'occupied_units': units.filter(status='occupied').count(),
-        'vacant_units': units.filter(status='vacant').count(),
+        'total_properties': counts['properties'],
+        'total_units': total_units,
+        'occupied_units': occupied_units,
+        'vacant_units': total_units - occupied_units,
         'active_tenants': leases.filter(status='active').count(),
         'monthly_income': monthly_income,
         'overdue_payments': payments.filter(due_date__lt=today, status__in=['pending', 'partial']).count(),
-        'open_tickets': MaintenanceTicket.objects.filter(unit__in=units, status='open').count(),
-        'recent_payments': payments.order_by('-created_at')[:5],
+        'open_tickets': MaintenanceTicket.objects.filter(
+            owner=request.user, status='open', unit__property__deleted_at__isnull=True).count(),
+        'recent_payments': payments.select_related('lease__tenant', 'lease__unit').order_by('-created_at')[:5],
         'notifications': Notification.objects.filter(recipient=request.user).order_by('-created_at')[:5],
         'total_overdue': payments.filter(status='overdue').count(),
         'expiring_soon': [l for l in leases if today <= l.end_date <= today + timedelta(days=30)],
@@ -189,11 +244,16 @@ def dashboard(request):
 
 # ── PROPERTY & UNIT MANAGEMENT ───────────────────────────────────────────────
 
+@query_budget(4)
 @login_required
 @landlord_required
 def property_list(request):
-    return render(request, 'hostflow/property_list.html', {'properties': Property.objects.filter(owner=request.user)})
+    return render(request, 'hostflow/property_list.html', {
+        'properties': Property.objects.filter(owner=request.user),
+        'deletions': DeletionJob.objects.filter(requested_by=request.user).exclude(status='done').order_by('created_at'),
+    })
 
+@query_budget(8)
 @login_required
 @landlord_required
 def property_add(request):
@@ -204,6 +264,7 @@ def property_add(request):
             return redirect('property_list')
     return render(request, 'hostflow/property_form.html', {'form': PropertyForm(), 'action': 'Add'})
 
+@query_budget(13)
 @login_required
 @landlord_required
 def property_edit(request, pk):
@@ -213,19 +274,25 @@ def property_edit(request, pk):
         if form.is_valid(): form.save(); return redirect('property_list')
     return render(request, 'hostflow/property_form.html', {'form': PropertyForm(instance=prop), 'action': 'Edit'})
 
+@query_budget(12)
 @login_required
 @landlord_required
 def property_delete(request, pk):
     prop = get_object_or_404(Property, pk=pk, owner=request.user)
-    if request.method == 'POST': prop.delete(); return redirect('property_list')
+    if request.method == 'POST':
+        deletion.schedule_property_deletion(prop, requested_by=request.user)
+        messages.success(request, f"{prop.name} is being deleted in the background.")
+        return redirect('property_list')
     return render(request, 'hostflow/confirm_delete.html', {'object': prop})
 
+@query_budget(4)
 @login_required
 @landlord_required
 def unit_list(request, property_pk):
     prop = get_object_or_404(Property, pk=property_pk, owner=request.user)
     return render(request, 'hostflow/unit_list.html', {'property': prop, 'units': prop.units.all()})
 
+@query_budget(9)
 @login_required
 @landlord_required
 def unit_add(request, property_pk):
@@ -237,22 +304,46 @@ def unit_add(request, property_pk):
             return redirect('unit_list', property_pk=prop.pk)
     return render(request, 'hostflow/unit_form.html', {'form': UnitForm(), 'property': prop, 'action': 'Add'})
 
+@query_budget(10)
 @login_required
 @landlord_required
 def unit_edit(request, pk):
     unit = get_object_or_404(Unit, pk=pk, property__owner=request.user)
     if request.method == 'POST':
+        previous_rent = unit.rent_amount
         form = UnitForm(request.POST, instance=unit)
-        if form.is_valid(): form.save(); return redirect('unit_list', property_pk=unit.property.pk)
+        if form.is_valid():
+            form.save(); rent_revisions.record_change(unit, previous_rent)
+            return redirect('unit_list', property_pk=unit.property.pk)
     return render(request, 'hostflow/unit_form.html', {'form': UnitForm(instance=unit), 'property': unit.property, 'action': 'Edit'})
 
+@query_budget(12)
+@login_required
+@landlord_required
+def rent_revision(request):
+    form = RentRevisionForm(request.POST or None, landlord=request.user)
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        units = rent_revisions.select_units(request.user, data['property'], data['city'], data['rent_type'])
+        revision = rent_revisions.revise(request.user, units, data['kind'], data['value'], data['effective_from'],
+                                         note=data['note'])
+        log_action(request.user, 'rent_revision', 'RentRevision', revision.pk, str(revision))
+        messages.success(request, f"Rent revised for {revision.unit_count} unit{pluralize(revision.unit_count)}, "
+                                  f"effective {revision.effective_from:%d %b %Y}.")
+        return redirect('rent_revision')
+    return render(request, 'hostflow/rent_revision.html', {
+        'form': form,
+        'revisions': RentRevision.objects.filter(owner=request.user).order_by('-created_at')[:20],
+    })
+
 # ── LEASE MANAGEMENT ─────────────────────────────────────────────────────────
 
+@query_budget(3)
 @login_required
 @landlord_required
 def lease_list(request):
-    units = Unit.objects.filter(property__owner=request.user)
-    leases = Lease.objects.filter(unit__in=units).select_related('tenant', 'unit')
+    leases = Lease.objects.filter(owner=request.user, unit__property__deleted_at__isnull=True).select_related(
+        'tenant', 'unit__property')
 
     today = date.today()
 
@@ -269,12 +360,13 @@ def lease_list(request):
 
     return render(request, 'hostflow/lease_list.html', {'leases': leases})
 
+@query_budget(20)
 @login_required
 @landlord_required
 def lease_add(request, unit_pk):
-    unit = get_object_or_404(Unit, pk=unit_pk, property__owner=request.user)
+    unit = get_object_or_404(Unit.objects.select_related('property'), pk=unit_pk, property__owner=request.user)
     if request.method == 'POST':
-        form = LeaseForm(request.POST, request.FILES)
+        form = LeaseForm(request.POST, request.FILES, landlord=request.user)
         if form.is_valid():
             tenant = form.cleaned_data['tenant']
             Lease.objects.filter(unit=unit, tenant=tenant, status='terminated').delete()
@@ -284,25 +376,41 @@ def lease_add(request, unit_pk):
             l = form.save(commit=False); l.unit = unit; l.save()
             unit.status = 'occupied'; unit.save()
             return redirect('lease_list')
-    return render(request, 'hostflow/lease_form.html', {'form': LeaseForm(), 'unit': unit})
+    else:
+        form = LeaseForm(landlord=request.user)
+    return render(request, 'hostflow/lease_form.html', {'form': form, 'unit': unit})
 
+@query_budget(12)
 @login_required
 @landlord_required
 def lease_terminate(request, pk):
-    lease = get_object_or_404(Lease, pk=pk, unit__property__owner=request.user)
+    lease = get_object_or_404(Lease.objects.select_related('unit__property'), pk=pk, owner=request.user)
     if request.method == 'POST':
         lease.status = 'terminated'; lease.save()
         lease.unit.status = 'vacant'; lease.unit.save()
         return redirect('lease_list')
     return render(request, 'hostflow/confirm_delete.html', {'object': lease, 'action_label': 'Terminate'})
 
+@query_budget(3)
+@login_required
+@landlord_required
+def tenant_autocomplete(request):
+    results = tenant_directory.autocomplete(request.user, request.GET.get('q', ''))
+    for tenant in results:
+        tenant['label'] = tenant_directory.label(tenant)
+    return JsonResponse({'results': results})
+
 # ── PAYMENTS & LATE FEES ─────────────────────────────────────────────────────
 
+@query_budget(3)
 @login_required
 @landlord_required
 def payment_list(request):
-    units = Unit.objects.filter(property__owner=request.user)
-    payments = Payment.objects.filter(lease__unit__in=units).order_by('-due_date')
+    payments = Payment.objects.filter(owner=request.user).exclude(
+        lease__unit__property__in=Property.all_objects.pending_deletion(request.user)
+    ).select_related(
+        'lease__tenant', 'lease__unit'
+    ).order_by('-due_date')
 
     today = timezone.now().date()
 
@@ -314,22 +422,25 @@ def payment_list(request):
 
     return render(request, 'hostflow/payment_list.html', {'payments': payments})
 
+@query_budget(20)
 @login_required
 @landlord_required
 def payment_add(request, lease_pk):
-    lease = get_object_or_404(Lease, pk=lease_pk, unit__property__owner=request.user)
-    if request.method == 'POST':
-        form = ManualPaymentForm(request.POST)
-        if form.is_valid():
-            p = form.save(commit=False); p.lease = lease
-            p.amount_due = lease.unit.rent_amount; p.due_date = date.today(); p.save()
-            return redirect('payment_list')
-    return render(request, 'hostflow/payment_form.html', {'form': ManualPaymentForm(), 'lease': lease})
-
+    lease = get_object_or_404(Lease.objects.select_related('unit', 'tenant'), pk=lease_pk, owner=request.user)
+    form = ManualPaymentForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        payment_capture.record(lease, data['idempotency_key'], data['amount_paid'], by=request.user,
+                               paid_on=data['paid_date'], note=data['notes'])
+        return redirect('payment_list')
+    return render(request, 'hostflow/payment_form.html', {'form': form, 'lease': lease})
+
+@query_budget(14)
 @login_required
 @landlord_required
+@use_replica()
 def reports(request):
-    payments = Payment.objects.filter(lease__unit__property__owner=request.user)
+    payments = Payment.objects.filter(owner=request.user).exclude(lease__unit__property__in=Property.all_objects.pending_deletion(request.user))
 
     monthly_data = []
 
@@ -348,31 +459,38 @@ def reports(request):
             'total': float(total)
         })
 
-    prop_revenue = []
-    for prop in Property.objects.filter(owner=request.user):
-        rev = Payment.objects.filter(
-            lease__unit__property=prop,
-            status='paid'
-        ).aggregate(t=Sum('amount_paid'))['t'] or 0
+    prop_revenue = [
+        {'name': prop.name, 'revenue': float(prop.rev or 0)}
+        for prop in Property.objects.filter(owner=request.user).annotate(
+            rev=Sum('units__leases__payments__amount_paid', filter=Q(units__leases__payments__status='paid'))
+        )
+    ]
 
-        prop_revenue.append({'name': prop.name, 'revenue': float(rev)})
+    counts = Property.objects.filter(owner=request.user).aggregate(
+        units=Sum('unit_count'), occupied=Sum('occupied_count')
+    )
 
     context = {
-        'monthly_data': json.dumps(monthly_data),
-        'prop_revenue': json.dumps(prop_revenue),
+        'monthly_data': monthly_data,
+        'prop_revenue': prop_revenue,
         'total_collected': payments.filter(status='paid').aggregate(t=Sum('amount_paid'))['t'] or 0,
         'occupancy_rate': round(
-            Unit.objects.filter(property__owner=request.user, status='occupied').count()
-            / max(Unit.objects.filter(property__owner=request.user).count(), 1) * 100, 1
+            (counts['occupied'] or 0) / max(counts['units'] or 0, 1) * 100, 1
         ),
     }
 
     return render(request, 'hostflow/reports.html', context)
 
+@query_budget(3)
 @login_required
 @landlord_required
+@use_replica()
 def export_payments_csv(request):
-    payments = Payment.objects.filter(lease__unit__property__owner=request.user).order_by('-due_date')
+    payments = Payment.objects.filter(owner=request.user).exclude(
+        lease__unit__property__in=Property.all_objects.pending_deletion(request.user)
+    ).select_related(
+        'lease__tenant', 'lease__unit'
+    ).order_by('-due_date')
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="payments.csv"'
     writer = csv.writer(response)
@@ -381,8 +499,69 @@ def export_payments_csv(request):
         writer.writerow([p.lease.tenant.username, p.lease.unit.unit_number, p.amount_due, p.amount_paid, p.status])
     return response
 
+@query_budget(4)
+@login_required
+@landlord_required
+@use_replica()
+def forecast_report(request):
+    months = 24 if request.GET.get('months') == '24' else 12
+    return render(request, 'hostflow/forecast.html', {'forecast': cash_forecast.cash_flow(request.user, months)})
+
+class _Echo:
+    def write(self, value):
+        return value
+
+@query_budget(4)
+@login_required
+@landlord_required
+@use_replica()
+def arrears_report(request):
+    level, filters = arrears.params(request.GET)
+    rows = list(arrears.report(request.user, level, **filters)[:arrears.ROW_LIMIT + 1])
+    if level in arrears.GROUPS and len(rows) <= arrears.ROW_LIMIT:
+        totals = arrears.add_up(rows)  # every group is on the page
+    else:
+        totals = arrears.totals(request.user, **filters)
+    buckets = {key: label for key, label, *_ in arrears.BUCKETS}
+    drill = arrears.DRILL_DOWN.get(level)
+    for row in rows:
+        if drill:
+            row['amounts'] = [row[key] for key in buckets]
+            row['url'] = '?' + urlencode({**filters, 'by': drill, level: row['key']})
+        else:
+            row['bucket'] = buckets[row['bucket']]
+    return render(request, 'hostflow/arrears.html', {
+        'level': level,
+        'levels': list(arrears.GROUPS),
+        'filtered': bool(filters),
+        'rows': rows[:arrears.ROW_LIMIT],
+        'truncated': len(rows) > arrears.ROW_LIMIT,
+        'totals': [(label, totals[key]) for key, label in buckets.items()],
+        'total': totals['total'],
+        'query': urlencode({**filters, 'by': level}),
+    })
+
+@query_budget(3)
+@login_required
+@landlord_required
+def export_arrears_csv(request):
+    level, filters = arrears.params(request.GET)
+    rows = arrears.report(request.user, level, **filters)
+
+    def stream():
+        writer = csv.writer(_Echo())
+        yield writer.writerow(arrears.export_header(level))
+        with use_replica(request.user):  # the rows are read after the view has returned
+            for row in arrears.export_rows(rows, level):
+                yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="arrears-{level}.csv"'
+    return response
+
 # ── AUDIT, TICKETS & NOTIFICATIONS ───────────────────────────────────────────
 
+@query_budget(3)
 @login_required
 @landlord_required
 def audit_log_list(request):
@@ -390,60 +569,277 @@ def audit_log_list(request):
     logs = AuditLog.objects.filter(performed_by=request.user).order_by('-created_at')
     return render(request, 'hostflow/audit_logs.html', {'logs': logs})
 
+@query_budget(6)
 @login_required
 def notification_list(request):
+    preference = NotificationPreference.objects.filter(user=request.user).first() or NotificationPreference(user=request.user)
+    if request.method == 'POST':
+        form = NotificationPreferenceForm(request.POST, instance=preference)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Notification settings saved.")
+            return redirect('notification_list')
     notifs = Notification.objects.filter(recipient=request.user).order_by('-created_at')
     notifs.filter(is_read=False).update(is_read=True)
-    return render(request, 'hostflow/notification_list.html', {'notifications': notifs})
+    return render(request, 'hostflow/notification_list.html', {
+        'notifications': notifs, 'preference_form': NotificationPreferenceForm(instance=preference),
+    })
 
+@query_budget(1)
+@csrf_exempt
+@require_POST
+def twilio_status(request):
+    """Twilio's delivery-status callback (TWILIO_STATUS_CALLBACK points here)."""
+    from twilio.request_validator import RequestValidator
+    if not settings.TWILIO_AUTH_TOKEN:
+        return HttpResponseForbidden()
+    # Twilio signs the exact callback URL it was given, whatever the proxy in front rewrote
+    url = settings.TWILIO_STATUS_CALLBACK or request.build_absolute_uri()
+    signature = request.headers.get('X-Twilio-Signature', '')
+    if not RequestValidator(settings.TWILIO_AUTH_TOKEN).validate(url, request.POST.dict(), signature):
+        return HttpResponseForbidden()
+    notify.record_status(request.POST.get('MessageSid', ''), request.POST.get('MessageStatus', ''),
+                         request.POST.get('ErrorCode', ''))
+    return HttpResponse(status=204)
+
+def _ticket_filters(request):
+    return {
+        'status': request.GET.get('status', 'active'),
+        'priority': request.GET.get('priority') or None,
+        'property_id': request.GET.get('property') or None,
+    }
+
+def _ticket_json(ticket):
+    return {
+        'id': ticket.pk,
+        'title': ticket.title,
+        'priority': ticket.priority,
+        'status': ticket.status,
+        'unit': ticket.unit.unit_number,
+        'property': ticket.unit.property.name,
+        'submitted_by': ticket.submitted_by.username,
+        'created_at': ticket.created_at.isoformat(),
+        'sla_score': ticket.sla_score,
+        'latest_comments': [
+            {'author': c.author.username, 'content': c.content, 'created_at': c.created_at.isoformat()}
+            for c in ticket.latest_comments
+        ],
+    }
+
+@query_budget(5)
 @login_required
+@landlord_required
 def ticket_list(request):
-    units = Unit.objects.filter(property__owner=request.user)
-    return render(request, 'hostflow/ticket_list.html', {'tickets': MaintenanceTicket.objects.filter(unit__in=units)})
+    filters = _ticket_filters(request)
+    try:
+        tickets, next_cursor = tickets_board.board_page(request.user, cursor=request.GET.get('cursor'), **filters)
+    except ValueError:
+        return redirect('ticket_list')
+    query = request.GET.copy(); query.pop('cursor', None)
+    return render(request, 'hostflow/ticket_list.html', {
+        'tickets': tickets,
+        'next_cursor': next_cursor,
+        'filters': filters,
+        'filter_query': query.urlencode(),
+        'properties': Property.objects.filter(owner=request.user).only('pk', 'name'),
+        'status_filters': tickets_board.STATUS_FILTER_CHOICES,
+        'priorities': MaintenanceTicket.PRIORITY_CHOICES,
+    })
 
+@query_budget(4)
+@login_required
+@landlord_required
+def ticket_board_api(request):
+    try:
+        tickets, next_cursor = tickets_board.board_page(request.user, cursor=request.GET.get('cursor'), **_ticket_filters(request))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({'results': [_ticket_json(t) for t in tickets], 'next_cursor': next_cursor})
+
+@query_budget(9)
 @login_required
 def ticket_detail(request, pk):
-    ticket = get_object_or_404(MaintenanceTicket, pk=pk)
+    if request.user.role == 'landlord':
+        visible = MaintenanceTicket.objects.filter(owner=request.user)
+    else:
+        visible = MaintenanceTicket.objects.filter(submitted_by=request.user)
+    ticket = get_object_or_404(visible.select_related('unit__property', 'submitted_by'), pk=pk)
     if request.method == 'POST':
         if 'add_comment' in request.POST:
             form = TicketCommentForm(request.POST)
             if form.is_valid():
                 c = form.save(commit=False); c.ticket = ticket; c.author = request.user; c.save()
-        elif 'update_status' in request.POST:
+        elif 'update_status' in request.POST and request.user.role == 'landlord':
             form = TicketStatusForm(request.POST, instance=ticket)
             if form.is_valid(): form.save()
         return redirect('ticket_detail', pk=pk)
-    return render(request, 'hostflow/ticket_detail.html', {'ticket': ticket, 'comment_form': TicketCommentForm(), 'status_form': TicketStatusForm(instance=ticket)})
+    comments = ticket.comments.select_related('author').order_by('created_at')
+    return render(request, 'hostflow/ticket_detail.html', {'ticket': ticket, 'comments': comments, 'comment_form': TicketCommentForm(), 'status_form': TicketStatusForm(instance=ticket)})
+
+# ── AVAILABILITY & BOOKINGS (DAILY UNITS) ────────────────────────────────────
+
+def _property_param(request):
+    value = request.GET.get('property', '')
+    return int(value) if value.isdigit() else None
+
+@query_budget(5)
+@login_required
+@landlord_required
+def availability_view(request):
+    check_in, check_out = request.GET.get('check_in', ''), request.GET.get('check_out', '')
+    property_id, units, error = _property_param(request), None, None
+    if check_in or check_out:
+        try:
+            start, end = availability.parse_range(check_in, check_out)
+            units = list(availability.available_units(request.user, start, end, property_id))
+        except ValueError as exc:
+            error = str(exc)
+    upcoming = Booking.objects.filter(
+        unit__property__owner=request.user, unit__property__deleted_at__isnull=True,
+        check_out__gt=timezone.now().date()
+    ).exclude(status='cancelled').select_related('unit__property').order_by('check_in')[:20]
+    return render(request, 'hostflow/availability.html', {
+        'check_in': check_in, 'check_out': check_out, 'property_id': property_id,
+        'units': units, 'error': error, 'upcoming': upcoming,
+        'properties': Property.objects.filter(owner=request.user).only('pk', 'name').order_by('name'),
+    })
+
+@query_budget(3)
+@login_required
+@landlord_required
+def availability_api(request):
+    try:
+        start, end = availability.parse_range(request.GET.get('check_in'), request.GET.get('check_out'))
+    except ValueError as exc:  # parse_range's own, readable messages
+        return JsonResponse({'error': str(exc)}, status=400)
+    try:
+        limit = max(0, min(int(request.GET.get('limit', 100)), 500))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number.'}, status=400)
+    nights = (end - start).days
+    units = availability.available_units(request.user, start, end, _property_param(request))[:limit]
+    return JsonResponse({'check_in': start, 'check_out': end, 'nights': nights, 'units': [
+        {'id': u.pk, 'unit': u.unit_number, 'property': u.property.name, 'property_id': u.property_id,
+         'rent_amount': u.rent_amount, 'total': u.rent_amount * nights,
+         'book_url': reverse('booking_add', args=[u.pk])}
+        for u in units
+    ]})
+
+@query_budget(4)
+@login_required
+@landlord_required
+def availability_calendar_api(request):
+    try:
+        start = date.fromisoformat(request.GET.get('start') or timezone.now().date().isoformat())
+        days = int(request.GET.get('days', availability.CALENDAR_DAYS))
+    except ValueError:
+        return JsonResponse({'error': 'start must be YYYY-MM-DD and days a number.'}, status=400)
+    days = max(1, min(days, availability.MAX_CALENDAR_DAYS))
+    unit_ids = [int(pk) for pk in request.GET.get('units', '').split(',') if pk.isdigit()]
+    return JsonResponse(availability.calendar(
+        request.user, start, days, unit_ids=unit_ids, property_id=_property_param(request)
+    ))
+
+@query_budget(10)
+@login_required
+@landlord_required
+def booking_add(request, unit_pk):
+    unit = get_object_or_404(Unit.objects.select_related('property'), pk=unit_pk,
+                             property__owner=request.user, rent_type='daily')
+    if request.method == 'POST':
+        form = BookingForm(request.POST, unit=unit)
+        if form.is_valid():
+            booking = form.save(commit=False); booking.unit = unit
+            try:
+                with transaction.atomic():
+                    booking.save()
+            except IntegrityError:
+                # lost a race with another booking; the database refused the overlap
+                form.add_error(None, "The unit was just booked for some of these nights.")
+            else:
+                messages.success(request, f"Booked {unit} for {booking.nights} night(s).")
+                return redirect(f"{reverse('availability')}?check_in={booking.check_in}&check_out={booking.check_out}")
+    else:
+        form = BookingForm(unit=unit, initial={
+            'check_in': request.GET.get('check_in'), 'check_out': request.GET.get('check_out'),
+        })
+    return render(request, 'hostflow/booking_form.html', {'form': form, 'unit': unit})
+
+@query_budget(7)
+@login_required
+@landlord_required
+def booking_cancel(request, pk):
+    booking = get_object_or_404(Booking.objects.select_related('unit__property'), pk=pk,
+                                unit__property__owner=request.user)
+    if request.method == 'POST':
+        booking.status = 'cancelled'; booking.save(update_fields=['status'])
+        return redirect('availability')
+    return render(request, 'hostflow/confirm_delete.html', {'object': booking, 'action_label': 'Cancel'})
+
+# ── SEARCH ───────────────────────────────────────────────────────────────────
+
+SEARCH_LINKS = {
+    'tenant': lambda pk: reverse('lease_list'),
+    'property': lambda pk: reverse('unit_list', args=[pk]),
+    'unit': lambda pk: reverse('unit_edit', args=[pk]),
+    'ticket': lambda pk: reverse('ticket_detail', args=[pk]),
+    'payment': lambda pk: reverse('download_receipt', args=[pk]),
+}
+
+def _search_results(request):
+    query = request.GET.get('q', '').strip()
+    kinds = request.GET.getlist('kind') or None
+    results = search_index.search(request.user, query, kinds=kinds) if query else []
+    for r in results:
+        r.url = SEARCH_LINKS[r.kind](r.object_id)
+    return query, results
+
+@query_budget(3)
+@login_required
+@landlord_required
+def search_view(request):
+    query, results = _search_results(request)
+    return render(request, 'hostflow/search.html', {'query': query, 'results': results})
+
+@query_budget(3)
+@login_required
+@landlord_required
+def search_api(request):
+    query, results = _search_results(request)
+    return JsonResponse({'query': query, 'results': [
+        {'kind': r.kind, 'id': r.object_id, 'title': r.title, 'subtitle': r.subtitle, 'url': r.url}
+        for r in results
+    ]})
 
 # ── TENANT PORTAL ────────────────────────────────────────────────────────────
 
+@query_budget(7)
 @login_required
 @tenant_required
 def tenant_portal(request):
-    leases = Lease.objects.filter(tenant=request.user, status='active')
-    payments = Payment.objects.filter(lease__in=leases).order_by('-due_date')
-
-    for p in payments:
-        p.late_fee = p.calculate_late_fee()
+    return render(request, 'hostflow/tenant_portal.html', {'ledger': tenant_ledger.get_ledger(request.user)})
 
-    tickets = MaintenanceTicket.objects.filter(submitted_by=request.user).order_by('-created_at')
+@query_budget(7)
+@login_required
+@tenant_required
+def tenant_ledger_api(request):
+    return JsonResponse(tenant_ledger.get_ledger(request.user))
 
-    return render(request, 'hostflow/tenant_portal.html', {
-        'leases': leases,
-        'payments': payments,
-        'tickets': tickets
-    })
+@query_budget(9)
 @login_required
 @tenant_required
 def tenant_submit_ticket(request):
-    lease = Lease.objects.filter(tenant=request.user, status='active').first()
+    lease = Lease.objects.filter(tenant=request.user, status='active').select_related('unit__property').first()
     if request.method == 'POST':
         form = MaintenanceTicketForm(request.POST, request.FILES)
         if form.is_valid():
             t = form.save(commit=False); t.unit = lease.unit; t.submitted_by = request.user; t.save()
+            if t.image:
+                protected.process_ticket_image.enqueue(t.pk)
             return redirect('tenant_portal')
     return render(request, 'hostflow/ticket_form.html', {'form': MaintenanceTicketForm()})
 
+@query_budget(7)
 @login_required
 def download_receipt(request, payment_pk):
     payment = get_object_or_404(Payment, pk=payment_pk)
@@ -477,44 +873,163 @@ Status      : {payment.get_status_display()}
     """)
     return response
 
+@query_budget(7)
 @login_required
 @landlord_required
 def add_tenant(request):
     if request.method == 'POST':
         form = TenantRegisterForm(request.POST)
         if form.is_valid():
-            form.save(); messages.success(request, "Tenant created."); return redirect('lease_list')
+            tenant = form.save(commit=False); tenant.created_by = request.user; tenant.save()
+            messages.success(request, "Tenant created."); return redirect('lease_list')
         else:
             for field, errors in form.errors.items():
                 for error in errors: messages.error(request, f"{field}: {error}")
     return render(request, 'hostflow/add_tenant.html', {'form': TenantRegisterForm()})
+@query_budget(12)
 @login_required
 @tenant_required
 def pay_rent(request, payment_pk):
-    payment = get_object_or_404(Payment, pk=payment_pk, lease__tenant=request.user)
+    payment = get_object_or_404(Payment.objects.select_related('lease'), pk=payment_pk, lease__tenant=request.user)
 
     if payment.status == 'paid':
         messages.warning(request, "Already paid.")
         return redirect('tenant_portal')
 
-    today = timezone.now().date()
-
     # Calculate late fee
     late_fee = payment.calculate_late_fee()
     total_due = payment.amount_due + late_fee
 
     if request.method == 'POST':
-        payment.amount_paid = total_due
-        payment.late_fee = late_fee
-        payment.paid_date = today
-        payment.status = 'paid'
-        payment.save()
-
-        messages.success(request, "Payment successful!")
+        # the form's key makes a double submit or a retried request pay once
+        key = request.POST.get('idempotency_key') or request.headers.get('Idempotency-Key') or payment_capture.new_key()
+        try:
+            captured = payment_capture.capture(payment.pk, key, by=request.user)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('pay_rent', payment_pk=payment.pk)
+        if captured.amount or captured.replayed:
+            messages.success(request, "Payment successful!")
+        else:
+            messages.warning(request, "Already paid.")
         return redirect('tenant_portal')
 
     return render(request, 'hostflow/pay_rent.html', {
         'payment': payment,
         'late_fee': late_fee,
-        'total_due': total_due
-    })
\ No newline at end of file
+        'total_due': total_due,
+        'idempotency_key': payment_capture.new_key(),
+    })
+
+# ── PROTECTED MEDIA ──────────────────────────────────────────────────────────
+
+@query_budget(3)
+def protected_media(request, name):
+    valid_for = protected.check_signature(name, request.GET.get('exp', ''), request.GET.get('sig', ''))
+    if not valid_for:
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if not protected.can_access(request.user, name):
+            raise Http404
+    return protected.serve(request, name, max_age=valid_for)
+
+# ── METRICS ──────────────────────────────────────────────────────────────────
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    bearer = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (bearer or (request.user.is_authenticated and request.user.is_staff)):
+        return HttpResponse("Forbidden", status=403)
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4')
+
+# ── HEALTH ───────────────────────────────────────────────────────────────────
+# Probes for the load balancer / orchestrator. Neither touches the session or
+# any table: /healthz only proves the process answers, /readyz adds one
+# `SELECT 1` and one cache round trip.
+
+@query_budget(0)
+def healthz(request):
+    return HttpResponse("ok", content_type='text/plain')
+
+def _probe(check):
+    started = time.perf_counter()
+    try:
+        check()
+        ok = True
+    except Exception:
+        # the details (hosts, users, driver errors) go to the log, never to the unauthenticated caller
+        logger.exception("Readiness check %s failed", check.__name__)
+        ok = False
+    return {'ok': ok, 'ms': round((time.perf_counter() - started) * 1000, 2)}
+
+def _check_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+def _check_cache():
+    token = str(time.monotonic_ns())
+    cache.set('hostflow:readyz', token, 10)
+    if cache.get('hostflow:readyz') != token:
+        raise RuntimeError("cache read did not return the value just written")
+
+@query_budget(1)
+def readyz(request):
+    checks = {'database': _probe(_check_database), 'cache': _probe(_check_cache)}
+    ready = all(check['ok'] for check in checks.values())
+    return JsonResponse({'status': 'ok' if ready else 'unavailable', 'checks': checks}, status=200 if ready else 503)
+
+# ── JSON API (v1) ────────────────────────────────────────────────────────────
+# Bearer-token auth via ApiTokenMiddleware; see hostflow/api.py.
+
+def api_token_required(view_func):
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_api.error(request, "Authentication required.", status=401)
+        return view_func(request, *args, **kwargs)
+    wrapper.__name__ = view_func.__name__
+    return wrapper
+
+@query_budget(2)
+@csrf_exempt
+@require_POST
+def api_token(request):
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+        username, password = str(data.get('username', '')), str(data.get('password', ''))
+    except (ValueError, AttributeError):
+        return json_api.error(request, "Send a username and password.")
+    ip = client_ip(request)
+    wait = login_throttle.check(username, ip)
+    if wait:
+        response = json_api.error(request, f"Too many failed sign-ins. Try again in {wait} seconds.", status=429)
+        response['Retry-After'] = str(wait)
+        return response
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        login_throttle.failed(username, ip)
+        return json_api.error(request, "Invalid username or password.", status=401)
+    login_throttle.succeeded(username)
+    if not getattr(user, 'is_verified', True):
+        return json_api.error(request, "Account not verified.", status=403)
+    response = JsonResponse({'token': json_api.issue_token(user), 'token_type': 'Bearer',
+                             'expires_in': settings.API_TOKEN_TTL})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@query_budget(4)
+@api_token_required
+def api_list(request, resource):
+    try:
+        return json_api.respond(request, json_api.list_rows(request.user, resource, request.GET))
+    except json_api.ApiError as e:
+        return json_api.error(request, str(e), status=e.status)
+
+@query_budget(4)
+@api_token_required
+def api_detail(request, resource, pk):
+    try:
+        return json_api.respond(request, json_api.detail_row(request.user, resource, pk, request.GET))
+    except json_api.ApiError as e:
+        return json_api.error(request, str(e), status=e.status)
+
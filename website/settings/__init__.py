@@ -0,0 +1,21 @@
+"""
+HostFlow – Django Settings
+==========================
+DJANGO_SETTINGS_MODULE stays ``website.settings``; DJANGO_ENV picks the
+profile layered over base.py:
+
+    dev   DEBUG on, plain-HTTP cookies                    (default locally)
+    prod  DEBUG off, persistent DB connections, cached    (default on Render)
+          templates, HTTPS behind the proxy
+"""
+
+import os
+
+ENVIRONMENT = os.environ.get('DJANGO_ENV') or ('prod' if os.environ.get('RENDER') else 'dev')
+
+if ENVIRONMENT == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif ENVIRONMENT == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImportError(f"Unknown DJANGO_ENV {ENVIRONMENT!r}; expected 'dev' or 'prod'.")
@@ -0,0 +1,280 @@
+"""
+HostFlow – Django Settings: shared by every profile (see __init__.py)
+"""
+
+from pathlib import Path
+import os
+import dj_database_url
+
+# ── BASE DIR ────────────────────────────────────────────
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# ── SECURITY ────────────────────────────────────────────
+SECRET_KEY = os.environ.get('SECRET_KEY', 'fallback-secret-key')
+
+DEBUG = False
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',')
+
+
+# CSRF for Render (IMPORTANT)
+CSRF_TRUSTED_ORIGINS = ['https://*.onrender.com']
+
+
+# ── INSTALLED APPS ──────────────────────────────────────
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+
+    'hostflow',
+]
+
+
+# ── MIDDLEWARE ──────────────────────────────────────────
+MIDDLEWARE = [
+    'hostflow.middleware.RequestMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+
+    'django.middleware.csrf.CsrfViewMiddleware',
+
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hostflow.middleware.ApiTokenMiddleware',
+    'hostflow.middleware.ReplicaPinMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+
+    'hostflow.middleware.TenantIsolationMiddleware',
+]
+
+
+# ── URLS / WSGI ─────────────────────────────────────────
+ROOT_URLCONF = 'website.urls'
+WSGI_APPLICATION = 'website.wsgi.application'
+
+
+# ── TEMPLATES ───────────────────────────────────────────
+TEMPLATES = [
+    {
+        'BACKEND': 'hostflow.metrics.InstrumentedDjangoTemplates',
+        'DIRS': [BASE_DIR / 'hostflow' / 'templates'],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+
+# ── DATABASE (Render PostgreSQL) ────────────────────────
+# Connections are opened per request here; prod.py keeps them open.
+DATABASES = {
+    'default': dj_database_url.parse(
+        os.environ.get("DATABASE_URL")
+    )
+}
+
+# Read replicas for the reporting views (hostflow/routing.py), e.g.
+# DATABASE_REPLICA_URLS=postgres://…@replica-a/hostflow,postgres://…@replica-b/hostflow
+DATABASE_REPLICAS = []
+for _n, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica_{_n}'] = {**dj_database_url.parse(_url.strip()), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{_n}')
+DATABASE_ROUTERS = ['hostflow.routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 10))
+REPLICA_CHECK_INTERVAL = 5
+
+
+# ── CACHE ───────────────────────────────────────────────
+# Per-process memory by default. Multi-worker deployments must set
+# CACHE_BACKEND/CACHE_LOCATION to a shared cache (Redis, memcached or
+# django.core.cache.backends.db.DatabaseCache) so invalidations reach
+# every worker; the prod profile refuses to start without one.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'hostflow'),
+    }
+}
+
+
+# ── AUTH ────────────────────────────────────────────────
+AUTH_USER_MODEL = 'hostflow.User'
+
+AUTH_PASSWORD_VALIDATORS = [
+    {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
+]
+
+# Changing the iteration count re-hashes each password at its next login
+# (hostflow/hashers.py); older hashes keep verifying meanwhile.
+PASSWORD_HASHERS = [
+    'hostflow.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'dashboard'
+LOGOUT_REDIRECT_URL = 'login'
+
+# Login throttling (hostflow/throttle.py): failures counted per username and
+# per client IP over a sliding window, refused before the password is hashed.
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_FAILURE_WINDOW = 15 * 60
+LOGIN_FAILURES_PER_USER = 10
+LOGIN_FAILURES_PER_IP = 50
+LOGIN_DELAY_AFTER = 3      # failures before each retry must wait 1 s, 2 s, 4 s, …
+
+# Lifetime of the JSON API's bearer tokens (hostflow/api.py), in seconds.
+API_TOKEN_TTL = int(os.environ.get('API_TOKEN_TTL', 12 * 60 * 60))
+
+
+# ── INTERNATIONAL ───────────────────────────────────────
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'Asia/Kolkata'
+
+USE_I18N = True
+USE_TZ = True
+
+
+# ── STATIC FILES ────────────────────────────────────────
+STATIC_URL = '/static/'
+
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STATICFILES_DIRS = [
+    BASE_DIR / "hostflow/static"
+]
+
+
+# ── MEDIA FILES ─────────────────────────────────────────
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Served only through hostflow.views.protected_media; see hostflow/media.py.
+DEFAULT_FILE_STORAGE = 'hostflow.media.ProtectedMediaStorage'
+MEDIA_URL_MAX_AGE = int(os.environ.get('MEDIA_URL_MAX_AGE', 900))
+# '' (the worker sends the file), 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+MEDIA_SERVER = os.environ.get('MEDIA_SERVER', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# ── EMAIL CONFIG (OTP - Gmail SMTP) ─────────────────────
+# ── EMAIL CONFIG ─────────────────────────────
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_PORT = 587
+EMAIL_USE_TLS = True
+
+EMAIL_HOST_USER = os.environ.get('EMAIL_USER')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASS')
+
+EMAIL_TIMEOUT = 5
+
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# ── OTP SETTINGS ────────────────────────────────────────
+# Codes live in the cache (see hostflow/otp.py), hashed, for OTP_EXPIRY_SECONDS.
+OTP_EXPIRY_SECONDS = 300   # 5 minutes
+OTP_RESEND_LIMIT = 3       # codes per email per OTP_EXPIRY_SECONDS
+OTP_MAX_ATTEMPTS = 5       # wrong guesses before a code is burnt
+OTP_IP_LIMIT = 20          # codes per client IP per hour
+
+# Render (and most PaaS) terminate TLS at a proxy that appends the client
+# address to X-Forwarded-For; rate limits key on it only when this is set.
+RATELIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATELIMIT_TRUST_FORWARDED_FOR', '') == '1'
+
+
+# ── TASK QUEUE ──────────────────────────────────────────
+# Background work is queued in the database (hostflow/tasks.py); run it with
+# `python manage.py run_workers --processes N` next to the web process.
+TASK_BATCH_SIZE = 10             # tasks a worker claims at once
+TASK_RETRY_BACKOFF = 10          # seconds before the first retry, doubling per attempt
+TASK_RETRY_BACKOFF_MAX = 3600
+TASK_VISIBILITY_TIMEOUT = 600    # a task running longer than this lost its worker
+TASK_QUEUES = {
+    'mail': {'concurrency': 2},           # SMTP connections open at once
+    'notifications': {'concurrency': 4},  # × SMS_CONCURRENCY requests to Twilio
+}
+TICKET_IMAGE_MAX_SIZE = 1600     # px; larger ticket photos are scaled down
+
+
+# ── NOTIFICATIONS ───────────────────────────────────────
+# Channels a user can switch on, in the order they are sent (hostflow/notify.py).
+NOTIFICATION_CHANNELS = {
+    'email': 'hostflow.notify.EmailChannel',
+    'sms': 'hostflow.notify.SmsChannel',
+    'whatsapp': 'hostflow.notify.WhatsAppChannel',
+    'in_app': 'hostflow.notify.InAppChannel',
+}
+NOTIFY_BATCH_SIZE = 500          # reminders per queued task
+
+TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
+TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
+TWILIO_FROM_NUMBER = os.environ.get('TWILIO_FROM_NUMBER', '')
+TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM', TWILIO_FROM_NUMBER)
+# public URL of the twilio_status view; Twilio posts delivery updates there
+TWILIO_STATUS_CALLBACK = os.environ.get('TWILIO_STATUS_CALLBACK', '')
+# without an account, messages collect in hostflow.notify.outbox
+SMS_TRANSPORT = 'hostflow.notify.TwilioTransport' if TWILIO_ACCOUNT_SID else 'hostflow.notify.LocmemTransport'
+SMS_CONCURRENCY = 16             # parallel requests per batch, over one pooled session
+SMS_DEFAULT_COUNTRY_CODE = '+91'  # for numbers stored without one
+
+
+# ── SESSION SETTINGS ────────────────────────────────────
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_COOKIE_AGE = 3600  # 1 hour
+
+
+# ── SECURITY (Render HTTPS) ─────────────────────────────
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+
+
+# ── METRICS ─────────────────────────────────────────────
+# /metrics/ is open to staff sessions, or to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hostflow.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# ── RAZORPAY ───────────────────────────────────────────
+RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID')
+RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET')
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+HostFlow – Django Settings: local development
+"""
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# runserver speaks plain HTTP
+SESSION_COOKIE_SECURE = False
+CSRF_COOKIE_SECURE = False
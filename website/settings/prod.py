@@ -0,0 +1,65 @@
+"""
+HostFlow – Django Settings: production (Render)
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import CACHES, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Render terminates TLS and forwards the scheme and client address
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+RATELIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATELIMIT_TRUST_FORWARDED_FOR', '1') == '1'
+
+
+# ── CACHE ───────────────────────────────────────────────
+# OTP codes, the rate-limit buckets and the login throttle live in the
+# cache, and web and task workers are separate processes: with a
+# per-process cache each would see its own, and codes would never verify.
+if CACHES['default']['BACKEND'] in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+):
+    raise ImproperlyConfigured(
+        "Production needs a shared cache: set CACHE_BACKEND and CACHE_LOCATION "
+        "(Redis, memcached or django.core.cache.backends.db.DatabaseCache)."
+    )
+
+
+# ── DATABASE CONNECTIONS ────────────────────────────────
+# Keep each worker's connection open between requests instead of paying a
+# TCP + TLS + auth handshake per request; health checks replace a connection
+# the server has dropped before a request uses it.
+#
+# PGBOUNCER=1: connecting through PgBouncer in transaction-pooling mode.
+# A transaction may land on a different server connection each time, so
+# server-side cursors (iterator() on PostgreSQL) have to be off.
+for _database in DATABASES.values():  # the primary and any replicas
+    _database.update({
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+    if os.environ.get('PGBOUNCER') == '1':
+        _database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+# ── TEMPLATES ───────────────────────────────────────────
+# Parse each template once per process.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+# ── STATIC FILES ────────────────────────────────────────
+# collectstatic writes content-hashed copies (app.3f2a9c….css) with .gz and,
+# with the Brotli package installed, .br siblings; WhiteNoise serves those
+# pre-compressed and marks hashed names "immutable" with a ten-year max-age.
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -5,8 +5,3 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('hostflow.urls')),  
 ]
-from django.conf import settings
-from django.conf.urls.static import static
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file